@@ -0,0 +1,164 @@
+import os
+import csv
+import math
+import argparse
+from statistics import NormalDist
+
+import pandas as pd
+
+from srtt_cleaning import DEFAULT_CLEANING
+
+PRECISION_MS = 20  # Pre-registered 95% CI half-width of the learning effect that ends a session (ms)
+MIN_BLOCKS = 4  # Never stop before this many blocks have been run
+CONFIDENCE = 0.95
+BLOCK_TYPES = ['structured', 'random']
+LOG_FIELDS = ['block', 'block_type', 'n_structured', 'n_random', 'structured_rt', 'random_rt',
+              'learning_effect', 'standard_error', 'half_width', 'decision']
+
+class RunningStats:
+    """Welford's running mean and variance; each update is O(1)"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+class AdaptiveStopping:
+    """Running learning-effect estimate with a pre-registered precision stopping rule
+
+    Every trial's first response is added to the running statistics of its
+    block type, using the same exclusions as the default cleaning (errors,
+    timeouts, dropped frames and RTs outside the absolute cutoffs). After each
+    block, the session stops once at least min_blocks blocks were run, the
+    last pair of blocks is complete (so both types are equally represented)
+    and the confidence-interval half-width of random - structured RT is at
+    most precision_ms. The standard error treats trials as independent, so the
+    rule controls the precision of the estimate, not a significance test.
+    """
+
+    def __init__(self, precision_ms=PRECISION_MS, min_blocks=MIN_BLOCKS, confidence=CONFIDENCE):
+        self.precision_ms = precision_ms
+        self.min_blocks = max(2, min_blocks)
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.stats = {block_type: RunningStats() for block_type in BLOCK_TYPES}
+        self.checkpoints = []
+        self.stopped_after = None
+
+    def add_trial(self, first_response):
+        """Update the estimate with the first recorded response of a trial"""
+        rt = first_response['reaction_time']
+        # timed_out and frame_dropped are missing (NaN once concatenated) in older sessions
+        if (not first_response['correct'] or first_response.get('timed_out') == True
+                or first_response.get('frame_dropped') == True
+                or rt < DEFAULT_CLEANING['min_rt'] or rt > DEFAULT_CLEANING['max_rt']):
+            return
+        self.stats[first_response['block_type']].add(rt)
+
+    def estimate(self):
+        """Learning effect (random - structured RT), its standard error and the CI half-width"""
+        structured, random_ = self.stats['structured'], self.stats['random']
+        effect = random_.mean - structured.mean if structured.n and random_.n else math.nan
+        standard_error = math.sqrt(structured.variance / structured.n + random_.variance / random_.n) \
+            if structured.n > 1 and random_.n > 1 else math.nan
+        return effect, standard_error, self.z * standard_error
+
+    def end_block(self, block, block_type):
+        """Check the stopping rule after a block (1-based); returns True to end the session"""
+        effect, standard_error, half_width = self.estimate()
+        stop = False
+        if block < self.min_blocks:
+            decision = 'too_early'
+        elif block % 2:
+            decision = 'incomplete_pair'
+        else:
+            stop = half_width <= self.precision_ms  # NaN never satisfies the rule
+            decision = 'stop' if stop else 'continue'
+
+        self.checkpoints.append({
+            'block': block,
+            'block_type': block_type,
+            'n_structured': self.stats['structured'].n,
+            'n_random': self.stats['random'].n,
+            'structured_rt': round(self.stats['structured'].mean, 2),
+            'random_rt': round(self.stats['random'].mean, 2),
+            'learning_effect': round(effect, 2),
+            'standard_error': round(standard_error, 2),
+            'half_width': round(half_width, 2),
+            'decision': decision
+        })
+        if stop:
+            self.stopped_after = block
+        return stop
+
+    def save_log(self, filename, planned_blocks):
+        """Write the per-block checkpoints and the final decision"""
+        directory = os.path.dirname(filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(filename, 'w', newline='') as csvfile:
+            csvfile.write(f"# precision_ms={self.precision_ms};min_blocks={self.min_blocks};"
+                          f"planned_blocks={planned_blocks};stopped_after={self.stopped_after or ''}\n")
+            writer = csv.DictWriter(csvfile, fieldnames=LOG_FIELDS)
+            writer.writeheader()
+            for checkpoint in self.checkpoints:
+                writer.writerow(checkpoint)
+        return filename
+
+def replay(df, precision_ms=PRECISION_MS, min_blocks=MIN_BLOCKS):
+    """Run the stopping rule over a finished session; returns the rule with its checkpoints"""
+    rule = AdaptiveStopping(precision_ms, min_blocks)
+    df = df.sort_values(['block', 'trial', 'attempt'], kind='stable')
+    first = df.drop_duplicates(['block', 'trial'])
+    for block, rows in first.groupby('block', sort=True):
+        for row in rows.to_dict('records'):
+            rule.add_trial(row)
+        if rule.end_block(int(block), rows['block_type'].iloc[0]):
+            break
+    return rule
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files, load_sessions
+
+    parser = argparse.ArgumentParser(description="Replay finished sessions under the adaptive stopping rule")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--precision-ms', type=float, default=PRECISION_MS)
+    parser.add_argument('--min-blocks', type=int, default=MIN_BLOCKS)
+    args = parser.parse_args()
+
+    file_paths = find_result_files(args.results_dir)
+    if not file_paths:
+        print(f"No result files found in: {args.results_dir}")
+        return
+
+    rows = []
+    for session, df in load_sessions(file_paths).groupby('session', sort=True):
+        rule = replay(df, args.precision_ms, args.min_blocks)
+        last = rule.checkpoints[-1]
+        rows.append({'session': session, 'blocks_run': int(df['block'].max()),
+                     'stopped_after': rule.stopped_after, 'learning_effect': last['learning_effect'],
+                     'half_width': last['half_width']})
+
+    summary = pd.DataFrame(rows)
+    print(summary.to_string(index=False))
+    stopped = summary['stopped_after'] < summary['blocks_run']
+    if stopped.any():
+        saved = (summary['blocks_run'] - summary['stopped_after'])[stopped].sum()
+        print(f"\n{int(stopped.sum())} of {len(summary)} sessions would have stopped early, "
+              f"saving {int(saved)} blocks in total")
+    else:
+        print(f"\nNo session would have stopped before its last block at {args.precision_ms:g} ms")
+
+if __name__ == "__main__":
+    main()
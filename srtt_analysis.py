@@ -1,9 +1,17 @@
 import os
 import csv
+import argparse
+from datetime import datetime
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from tkinter import Tk, filedialog
+from srtt_permutation import permutation_test
+from srtt_learning_curves import fit_learning_curves, learning_curve_columns
+from srtt_cleaning import clean_trials, print_cleaning_report, TIMEOUT_RT
+from srtt_archive import ArchiveReader, ARCHIVE_EXTENSION, session_name
+from srtt_profiling import PhaseProfiler, PROFILE_MODES
+from srtt_trials import reconstruct_trials, trial_statistics
 
 def select_result_file():
     """Open a file dialog to select a result file"""
@@ -13,15 +21,21 @@ def select_result_file():
     # Ask the user to select a file
     file_path = filedialog.askopenfilename(
         title="Selecione o arquivo de resultados SRTT",
-        filetypes=[("CSV Files", "*.csv")],
+        filetypes=[("CSV Files", "*.csv"), ("SRTT Archives", f"*{ARCHIVE_EXTENSION}")],
         initialdir="./results" if os.path.exists("./results") else "."
     )
     
     root.destroy()
     return file_path
 
-def load_data(file_path):
-    """Load data from CSV file"""
+def load_data(file_path, participant_id=None):
+    """Load data from CSV file (or from an archive, optionally for one participant)"""
+    if file_path.endswith(ARCHIVE_EXTENSION):
+        reader = ArchiveReader(file_path)
+        df = reader.read_all() if participant_id is None else reader.read_participant(participant_id)
+        # The session column keeps sessions of the same participant apart (attempts, trial records)
+        return df.to_dict('records')
+    
     data = []
     
     with open(file_path, 'r', newline='') as csvfile:
@@ -33,20 +47,83 @@ def load_data(file_path):
             row['trial'] = int(row['trial'])
             row['position'] = int(row['position'])
             row['correct'] = row['correct'].lower() == 'true'
+            row['session'] = session_name(file_path)
             
             data.append(row)
     
     return data
 
+def find_result_files(results_dir='results'):
+    """List the result CSV files and archives in a results directory"""
+    if not os.path.isdir(results_dir):
+        return []
+
+    return sorted(os.path.join(results_dir, name) for name in os.listdir(results_dir)
+                  if (name.startswith('srtt_participant_') and name.endswith('.csv'))
+                  or name.endswith(ARCHIVE_EXTENSION))
+
+def load_sessions(file_paths):
+    """Load several result files or archives into a single DataFrame, one session per file
+    
+    A session that is both in an archive and still on disk as a CSV is loaded once.
+    """
+    frames = []
+    loaded = set()
+
+    for file_path in file_paths:
+        if file_path.endswith(ARCHIVE_EXTENSION):
+            reader = ArchiveReader(file_path)
+            names = [name for name in reader.sessions() if name not in loaded]
+            frames.extend(reader.iter_sessions(names))
+            loaded.update(names)
+            continue
+
+        name = session_name(file_path)
+        if name in loaded:
+            continue
+
+        df = pd.read_csv(file_path, dtype={'participant_id': str})
+        df['correct'] = df['correct'].astype(str).str.lower() == 'true'
+        df['session'] = name
+        frames.append(df)
+        loaded.add(name)
+
+    if not frames:
+        return pd.DataFrame(columns=['participant_id', 'block', 'block_type', 'trial', 'position',
+                                     'reaction_time', 'correct', 'attempt', 'timestamp', 'session'])
+
+    return pd.concat(frames, ignore_index=True)
+
+def attempt_statistics(data):
+    """Mean number of attempts per trial, by block and by block type
+    
+    Result files store the attempt number of each response in 'attempt'; a
+    trial's attempts are the highest attempt number recorded for it.
+    """
+    df = pd.DataFrame(data)
+    
+    if 'attempt' in df.columns:
+        attempts = pd.to_numeric(df['attempt'])
+    elif 'attempts' in df.columns:
+        # Older exports stored the count directly
+        attempts = pd.to_numeric(df['attempts'])
+    else:
+        attempts = pd.Series(1, index=df.index)
+    
+    keys = [column for column in ['session', 'block', 'block_type', 'trial'] if column in df.columns]
+    trials = df[keys].assign(attempts=attempts).groupby(keys, sort=False)['attempts'].max().reset_index()
+    
+    return {
+        'attempts_by_block': trials.groupby(['block', 'block_type'])['attempts'].mean().reset_index(),
+        'structured_attempts': trials[trials['block_type'] == 'structured']['attempts'].mean(),
+        'random_attempts': trials[trials['block_type'] == 'random']['attempts'].mean()
+    }
+
 def analyze_data(data):
     """Analyze SRTT data"""
     # Convert to DataFrame for easier analysis
     df = pd.DataFrame(data)
     
-    # Ensure attempts field exists (for backward compatibility)
-    if 'attempts' not in df.columns:
-        df['attempts'] = 1
-    
     # Calculate mean RT by block and block type (only correct responses)
     rt_by_block = df[df['correct']].groupby(['block', 'block_type'])['reaction_time'].mean().reset_index()
     
@@ -54,29 +131,25 @@ def analyze_data(data):
     accuracy_by_block = df.groupby(['block', 'block_type'])['correct'].mean().reset_index()
     accuracy_by_block['accuracy'] = accuracy_by_block['correct'] * 100
     
-    # Calculate mean attempts by block
-    attempts_by_block = df.groupby(['block', 'block_type'])['attempts'].mean().reset_index()
+    # Calculate mean attempts per trial by block and block type
+    attempts = attempt_statistics(df)
     
     # Calculate learning effect (difference between random and structured blocks)
     structured_rt = df[(df['block_type'] == 'structured') & df['correct']]['reaction_time'].mean()
     random_rt = df[(df['block_type'] == 'random') & df['correct']]['reaction_time'].mean()
     learning_effect = random_rt - structured_rt
     
-    # Calculate mean attempts for structured vs random
-    structured_attempts = df[df['block_type'] == 'structured']['attempts'].mean()
-    random_attempts = df[df['block_type'] == 'random']['attempts'].mean()
-    
     # Get participant ID
-    participant_id = data[0]['participant_id'] if data else "Unknown"
+    participant_id = df['participant_id'].iloc[0] if len(df) else "Unknown"
     
     return {
         'rt_by_block': rt_by_block,
         'accuracy_by_block': accuracy_by_block,
-        'attempts_by_block': attempts_by_block,
+        'attempts_by_block': attempts['attempts_by_block'],
         'structured_rt': structured_rt,
         'random_rt': random_rt,
-        'structured_attempts': structured_attempts,
-        'random_attempts': random_attempts,
+        'structured_attempts': attempts['structured_attempts'],
+        'random_attempts': attempts['random_attempts'],
         'learning_effect': learning_effect,
         'participant_id': participant_id
     }
@@ -212,10 +285,22 @@ def print_summary(results):
     print(f"  Random blocks: {results['random_rt']:.2f} ms")
     print(f"  Learning effect: {results['learning_effect']:.2f} ms")
     
+    if 'permutation' in results:
+        permutation = results['permutation']
+        method = 'exact' if permutation['exact'] else 'Monte Carlo'
+        print(f"  Permutation p-value: {permutation['p_value']:.4f} "
+              f"({method}, {permutation['n_permutations']} block relabellings)")
+    
     print(f"\nMean Number of Attempts:")
     print(f"  Structured blocks: {results['structured_attempts']:.2f}")
     print(f"  Random blocks: {results['random_attempts']:.2f}")
     
+    if 'structured_errors_per_trial' in results:
+        print(f"\nPer-trial records (errors / timeout rate / time to correct response):")
+        for block_type in ['structured', 'random']:
+            print(f"  {block_type.capitalize()} blocks: {results[f'{block_type}_errors_per_trial']:.2f} / "
+                  f"{results[f'{block_type}_timeout_rate']:.1%} / {results[f'{block_type}_time_to_correct']:.2f} ms")
+    
     if results['learning_effect'] > 0:
         print("\nA positive learning effect indicates implicit learning of the sequence pattern.")
     else:
@@ -234,18 +319,8 @@ def print_summary(results):
     print("Analysis complete. Visualizations have been saved to the 'analysis' folder.")
     print("=" * 50)
 
-def export_summary(results, original_file_path):
-    """Export a summary of the analysis results to a CSV file"""
-    # Create analysis directory if it doesn't exist
-    if not os.path.exists('analysis'):
-        os.makedirs('analysis')
-    
-    # Get base filename without extension and directory
-    base_filename = os.path.splitext(os.path.basename(original_file_path))[0]
-    
-    # Create summary filename
-    summary_file = f"analysis/{base_filename}_summary.csv"
-    
+def summary_row(results):
+    """Build the summary columns (one row) for a set of analysis results"""
     # Prepare summary data
     summary_data = {
         'participant_id': [results['participant_id']],
@@ -256,6 +331,22 @@ def export_summary(results, original_file_path):
         'random_attempts_mean': [results.get('random_attempts', 1)]
     }
     
+    # Add per-trial record summaries if available
+    for block_type in ['structured', 'random']:
+        for measure in ['errors_per_trial', 'timeout_rate', 'time_to_correct']:
+            if f'{block_type}_{measure}' in results:
+                summary_data[f'{block_type}_{measure}'] = [results[f'{block_type}_{measure}']]
+    
+    # Add permutation test results if available
+    if 'permutation' in results:
+        summary_data['learning_effect_p'] = [results['permutation']['p_value']]
+        summary_data['learning_effect_p_exact'] = [results['permutation']['exact']]
+    
+    # Add trial counts removed by the cleaning stage if available
+    if 'cleaning' in results:
+        for rule, count in results['cleaning'].items():
+            summary_data[f'cleaning_{rule}'] = [count]
+    
     # Add block-specific data
     block_data = results['rt_by_block']
     for index, row in block_data.iterrows():
@@ -284,17 +375,45 @@ def export_summary(results, original_file_path):
             
             summary_data[f'block_{block_num}_{block_type}_attempts'] = [attempts]
     
+    # Add learning-curve parameters if available
+    if 'learning_curves' in results:
+        curve_data = learning_curve_columns(results['learning_curves'])
+        for column in curve_data.columns.drop(['participant_id', 'session'], errors='ignore'):
+            summary_data[column] = [curve_data[column].iloc[0]]
+    
+    return summary_data
+
+def export_summary(results, original_file_path):
+    """Export a summary of the analysis results to a CSV file"""
+    # Create analysis directory if it doesn't exist
+    if not os.path.exists('analysis'):
+        os.makedirs('analysis')
+    
+    # Get base filename without extension and directory
+    base_filename = os.path.splitext(os.path.basename(original_file_path))[0]
+    
+    # Create summary filename
+    summary_file = f"analysis/{base_filename}_summary.csv"
+    
     # Write to CSV
-    pd.DataFrame(summary_data).to_csv(summary_file, index=False)
+    pd.DataFrame(summary_row(results)).to_csv(summary_file, index=False)
     
     print(f"\nSummary exported to: {summary_file}")
 
 def main():
+    parser = argparse.ArgumentParser(description="SRTT Analysis Tool")
+    parser.add_argument('file', nargs='?', help="Result file or archive (opens a file dialog if omitted)")
+    parser.add_argument('--profile', nargs='?', const='sampling', default=None, choices=PROFILE_MODES,
+                        help="Profile the load, clean, analyze, export and plot stages (sampling or cprofile)")
+    parser.add_argument('--timeout-ms', type=float, default=TIMEOUT_RT,
+                        help="Timeout RT of files saved without a timed_out column (the experiment's --timeout-ms)")
+    args = parser.parse_args()
+    
     print("SRTT Analysis Tool")
     print("=================")
     
     # Select result file
-    file_path = select_result_file()
+    file_path = args.file or select_result_file()
     
     if not file_path:
         print("No file selected. Exiting.")
@@ -302,26 +421,67 @@ def main():
     
     print(f"Loading data from: {file_path}")
     
-    # Load and analyze data
-    data = load_data(file_path)
-    
-    if not data:
-        print("No data found or file format invalid.")
-        return
-    
-    print(f"Loaded {len(data)} trials. Analyzing...")
-    
-    # Analyze data
-    results = analyze_data(data)
+    # Archives can hold many participants; analyze one at a time
+    participant_id = None
+    if file_path.endswith(ARCHIVE_EXTENSION):
+        participants = ArchiveReader(file_path).participants()
+        if len(participants) > 1:
+            print(f"Participants in archive: {', '.join(participants)}")
+            participant_id = input("Participant ID to analyze: ").strip()
     
-    # Print summary
-    print_summary(results)
+    profiler = PhaseProfiler(args.profile)
     
-    # Export summary
-    export_summary(results, file_path)
-    
-    # Generate visualizations
-    generate_visualizations(results)
+    try:
+        # Load and analyze data
+        with profiler.phase("load"):
+            data = load_data(file_path, participant_id)
+        
+        if not data:
+            print("No data found or file format invalid.")
+            return
+        
+        print(f"Loaded {len(data)} trials. Analyzing...")
+        
+        # Attempts and trial records are built from the raw data, since cleaning keeps only first attempts
+        attempts = attempt_statistics(data)
+        attempts.update(trial_statistics(reconstruct_trials(data, args.timeout_ms)))
+        
+        # Remove timeouts, retries and outliers before aggregation
+        with profiler.phase("clean"):
+            data, cleaning_report = clean_trials(data, {'timeout_rt': args.timeout_ms})
+        print_cleaning_report(cleaning_report)
+        
+        if len(data) == 0:
+            print("No trials left after cleaning.")
+            return
+        
+        with profiler.phase("analyze"):
+            # Analyze data
+            results = analyze_data(data)
+            results.update(attempts)
+            results['cleaning'] = cleaning_report
+            
+            # Block-level permutation test for the learning effect
+            results['permutation'] = permutation_test(data)
+            
+            # Power-law and exponential learning curves by block type
+            results['learning_curves'] = fit_learning_curves(data)
+        
+        # Print summary
+        print_summary(results)
+        
+        # Export summary
+        with profiler.phase("export"):
+            export_summary(results, file_path)
+        
+        # Generate visualizations (includes the time the plot windows stay open)
+        with profiler.phase("plot"):
+            generate_visualizations(results)
+    finally:
+        if profiler.enabled:
+            base_filename = os.path.splitext(os.path.basename(file_path))[0]
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            profiler.report(os.path.join('analysis', 'profile', f"{base_filename}_{timestamp}"))
 
 if __name__ == "__main__":
     main()
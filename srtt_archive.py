@@ -0,0 +1,330 @@
+import os
+import io
+import sys
+import json
+import time
+import zlib
+import struct
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ARCHIVE_EXTENSION = '.srtta'
+MAGIC = b'SRTTARC1'
+FOOTER = struct.Struct('<QQ8s')  # index offset, index length, magic
+COMPRESSION_LEVEL = 6
+COPY_BLOCK_SIZE = 1 << 20  # bytes copied at a time when appending to an archive
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+MISSING_TIMESTAMP = -2 ** 31
+BLOCK_TYPES = ['structured', 'random']
+
+# Fixed-width encoding of each column inside a session chunk
+COLUMN_DTYPES = {
+    'block': '<u2',
+    'block_type': 'u1',  # index into BLOCK_TYPES
+    'trial': '<u4',
+    'position': 'u1',
+    'reaction_time': '<i4',  # hundredths of a millisecond (RTs are saved with 2 decimals)
+    'correct': 'u1',
+    'attempt': '<u2',
+    'timestamp': '<i4',  # seconds since the session's first timestamp
+    'onset_time': '<f8',
+    'onset_interval': '<f8',
+    'frame_dropped': 'u1',
+    'timed_out': 'u1'
+}
+REQUIRED_COLUMNS = ['block', 'block_type', 'trial', 'position', 'reaction_time', 'correct']
+
+def session_name(file_path):
+    """Session name used in archives and DataFrames (file name without extension)"""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def _as_bool(series):
+    if series.dtype == bool:
+        return series
+    return series.astype(str).str.lower() == 'true'
+
+def encode_session(df):
+    """Encode one session as compressed columnar bytes plus its index metadata"""
+    columns = [column for column in COLUMN_DTYPES if column in df.columns]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    base_timestamp = None
+    buffer = io.BytesIO()
+
+    for column in columns:
+        values = df[column]
+        if column == 'block_type':
+            values = values.map({name: code for code, name in enumerate(BLOCK_TYPES)})
+            if values.isna().any():
+                raise ValueError("Unknown block_type values")
+        elif column == 'reaction_time':
+            values = np.round(values.astype(np.float64) * 100)
+        elif column in ('correct', 'frame_dropped', 'timed_out'):
+            values = _as_bool(values)
+        elif column == 'timestamp':
+            moments = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors='coerce')
+            base = moments.min()
+            base_timestamp = None if pd.isna(base) else base.strftime(TIMESTAMP_FORMAT)
+            offsets = (moments - base).dt.total_seconds()
+            values = offsets.fillna(MISSING_TIMESTAMP)
+        buffer.write(np.ascontiguousarray(values.to_numpy(), dtype=COLUMN_DTYPES[column]).tobytes())
+
+    raw = buffer.getvalue()
+    meta = {
+        'participant_id': str(df['participant_id'].iloc[0]) if len(df) else '',
+        'n_rows': len(df),
+        'columns': columns,
+        'base_timestamp': base_timestamp,
+        'raw_length': len(raw),
+        'crc32': zlib.crc32(raw)
+    }
+    return zlib.compress(raw, COMPRESSION_LEVEL), meta
+
+def decode_session(payload, meta, session):
+    """Decode a session chunk back into the result-file columns"""
+    raw = zlib.decompress(payload)
+    if zlib.crc32(raw) != meta['crc32']:
+        raise ValueError(f"Corrupted chunk for session {session}")
+
+    n_rows = meta['n_rows']
+    data = {'participant_id': np.full(n_rows, meta['participant_id'], dtype=object)}
+    offset = 0
+
+    for column in meta['columns']:
+        dtype = np.dtype(COLUMN_DTYPES[column])
+        values = np.frombuffer(raw, dtype=dtype, count=n_rows, offset=offset)
+        offset += dtype.itemsize * n_rows
+
+        if column == 'block_type':
+            values = np.array(BLOCK_TYPES, dtype=object)[values]
+        elif column == 'reaction_time':
+            values = values / 100
+        elif column in ('correct', 'frame_dropped', 'timed_out'):
+            values = values.astype(bool)
+        elif column == 'timestamp':
+            if meta['base_timestamp'] is None:
+                values = np.full(n_rows, '', dtype=object)
+            else:
+                # Sessions span few distinct seconds: format each one once
+                offsets, inverse = np.unique(values, return_inverse=True)
+                base = pd.Timestamp(meta['base_timestamp'])
+                moments = base + pd.to_timedelta(np.where(offsets == MISSING_TIMESTAMP, 0, offsets), unit='s')
+                labels = np.where(offsets == MISSING_TIMESTAMP, '', moments.strftime(TIMESTAMP_FORMAT))
+                values = labels.astype(object)[inverse]
+        data[column] = values
+
+    df = pd.DataFrame(data)
+    df['session'] = session
+    return df
+
+class ArchiveReader:
+    """Random access to the sessions of an archive; only the index is read up front"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not an SRTT archive: {path}")
+            f.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, index_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Truncated SRTT archive: {path}")
+            f.seek(index_offset)
+            self.index = json.loads(zlib.decompress(f.read(index_length)).decode('utf-8'))
+        self.index_offset = index_offset
+
+    def sessions(self):
+        return list(self.index['sessions'])
+
+    def participants(self):
+        return sorted({meta['participant_id'] for meta in self.index['sessions'].values()})
+
+    def read_session(self, session):
+        meta = self.index['sessions'][session]
+        with open(self.path, 'rb') as f:
+            f.seek(meta['offset'])
+            payload = f.read(meta['length'])
+        return decode_session(payload, meta, session)
+
+    def iter_sessions(self, sessions=None):
+        """Yield one DataFrame per session, reading chunks in file order"""
+        names = self.sessions() if sessions is None else list(sessions)
+        names.sort(key=lambda name: self.index['sessions'][name]['offset'])
+        with open(self.path, 'rb') as f:
+            for name in names:
+                meta = self.index['sessions'][name]
+                f.seek(meta['offset'])
+                yield decode_session(f.read(meta['length']), meta, name)
+
+    def read_participant(self, participant_id):
+        """Decompress only the chunks that belong to one participant"""
+        names = [name for name, meta in self.index['sessions'].items()
+                 if meta['participant_id'] == str(participant_id)]
+        return self._concat(self.iter_sessions(names))
+
+    def read_all(self):
+        return self._concat(self.iter_sessions())
+
+    @staticmethod
+    def _concat(frames):
+        frames = list(frames)
+        if not frames:
+            return pd.DataFrame(columns=['participant_id'] + list(COLUMN_DTYPES) + ['session'])
+        return pd.concat(frames, ignore_index=True)
+
+def pack_sessions(file_paths, archive_path, append=False):
+    """Pack result CSV files into an archive, one compressed chunk per session
+
+    With append=True new sessions are added after the existing chunks and the
+    index is rewritten; sessions already in the archive are skipped. The archive
+    is written to a temporary file and swapped in with os.replace, so a crash
+    mid-write leaves the previous archive intact.
+    """
+    index = {'version': 1, 'sessions': {}}
+    existing = None
+
+    if append and os.path.exists(archive_path):
+        reader = ArchiveReader(archive_path)
+        index = reader.index
+        existing = reader.index_offset
+
+    directory = os.path.dirname(archive_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    added = 0
+    fd, tmp_path = tempfile.mkstemp(suffix=ARCHIVE_EXTENSION + '.tmp', dir=directory or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if existing is None:
+                f.write(MAGIC)
+            else:
+                # Existing chunks keep their offsets; only the old index and footer are dropped
+                with open(archive_path, 'rb') as src:
+                    remaining = existing
+                    while remaining:
+                        block = src.read(min(remaining, COPY_BLOCK_SIZE))
+                        if not block:
+                            raise ValueError(f"Truncated SRTT archive: {archive_path}")
+                        f.write(block)
+                        remaining -= len(block)
+
+            for file_path in file_paths:
+                name = session_name(file_path)
+                if name in index['sessions']:
+                    continue
+
+                df = pd.read_csv(file_path, dtype={'participant_id': str})
+                payload, meta = encode_session(df)
+                meta.update({'offset': f.tell(), 'length': len(payload)})
+                f.write(payload)
+                index['sessions'][name] = meta
+                added += 1
+
+            # Index and footer go after the last chunk
+            index_bytes = zlib.compress(json.dumps(index).encode('utf-8'), COMPRESSION_LEVEL)
+            index_offset = f.tell()
+            f.write(index_bytes)
+            f.write(FOOTER.pack(index_offset, len(index_bytes), MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return added
+
+def benchmark(file_paths):
+    """Compare archive size and read throughput against the raw CSV files"""
+    csv_bytes = sum(os.path.getsize(path) for path in file_paths)
+
+    start = time.perf_counter()
+    frames = [pd.read_csv(path, dtype={'participant_id': str}) for path in file_paths]
+    csv_rows = sum(len(frame) for frame in frames)
+    csv_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_path = os.path.join(tmp, 'benchmark' + ARCHIVE_EXTENSION)
+
+        start = time.perf_counter()
+        pack_sessions(file_paths, archive_path)
+        pack_seconds = time.perf_counter() - start
+        archive_bytes = os.path.getsize(archive_path)
+
+        reader = ArchiveReader(archive_path)
+        start = time.perf_counter()
+        archive_rows = len(reader.read_all())
+        archive_seconds = time.perf_counter() - start
+
+        participant = reader.participants()[0]
+        start = time.perf_counter()
+        reader.read_participant(participant)
+        participant_seconds = time.perf_counter() - start
+
+    return {
+        'sessions': len(file_paths),
+        'rows': csv_rows,
+        'csv_mb': round(csv_bytes / 1e6, 3),
+        'archive_mb': round(archive_bytes / 1e6, 3),
+        'compression_ratio': round(csv_bytes / archive_bytes, 2),
+        'csv_read_rows_per_s': round(csv_rows / csv_seconds),
+        'archive_read_rows_per_s': round(archive_rows / archive_seconds),
+        'pack_seconds': round(pack_seconds, 3),
+        'single_participant_read_ms': round(participant_seconds * 1000, 2)
+    }
+
+def main():
+    # Imported here because srtt_analysis imports this module
+    from srtt_analysis import find_result_files
+
+    parser = argparse.ArgumentParser(description="Compressed SRTT result archives")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack = subparsers.add_parser('pack', help="Pack result CSV files into an archive")
+    pack.add_argument('results_dir')
+    pack.add_argument('-o', '--output', required=True)
+    pack.add_argument('--append', action='store_true', help="Add new sessions to an existing archive")
+
+    listing = subparsers.add_parser('list', help="List the sessions in an archive")
+    listing.add_argument('archive')
+
+    extract = subparsers.add_parser('extract', help="Write one participant's trials to CSV")
+    extract.add_argument('archive')
+    extract.add_argument('participant_id')
+    extract.add_argument('-o', '--output')
+
+    bench = subparsers.add_parser('benchmark', help="Compare archive and CSV size and read speed")
+    bench.add_argument('results_dir')
+
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        file_paths = [path for path in find_result_files(args.results_dir) if path.endswith('.csv')]
+        added = pack_sessions(file_paths, args.output, append=args.append)
+        print(f"{added} sessions packed into {args.output}")
+    elif args.command == 'list':
+        reader = ArchiveReader(args.archive)
+        for name, meta in reader.index['sessions'].items():
+            print(f"{meta['participant_id']:<20} {name:<50} {meta['n_rows']:>8} rows  {meta['length']:>10} bytes")
+    elif args.command == 'extract':
+        df = ArchiveReader(args.archive).read_participant(args.participant_id)
+        output = args.output or f"srtt_participant_{args.participant_id}_extracted.csv"
+        df.drop(columns='session').to_csv(output, index=False)
+        print(f"{len(df)} rows written to {output}")
+    elif args.command == 'benchmark':
+        file_paths = [path for path in find_result_files(args.results_dir) if path.endswith('.csv')]
+        if not file_paths:
+            print(f"No result files found in: {args.results_dir}")
+            sys.exit(1)
+        for key, value in benchmark(file_paths).items():
+            print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
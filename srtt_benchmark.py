@@ -0,0 +1,205 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]  # Trials per synthetic dataset
+SEQUENCE_SIZES = [10000, 100000]  # Trials per block for generate_block_sequence
+DRAW_FRAMES = 500  # Frames timed for draw_stimuli + flip
+DEFAULT_BASELINE = 'analysis/benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.25  # Relative slowdown that counts as a regression
+TIME_BUDGET = 1.0  # Seconds spent repeating each fast case (best run is kept)
+
+def synthetic_trials(n_trials, blocks=8, positions=4, seed=0):
+    """Result-file rows for one synthetic participant
+
+    Blocks alternate structured/random like the experiment (last block
+    random), RTs are lognormal with a small structured-block advantage and
+    about 5% of responses are errors followed by a retry row.
+    """
+    rng = np.random.default_rng(seed)
+    n_first = max(int(n_trials / 1.05), blocks)
+    block = np.arange(n_first) * blocks // n_first + 1
+    block_type = np.where((block % 2 == 1) & (block != blocks), 'structured', 'random')
+    trial = np.arange(n_first) - np.searchsorted(block, block, side='left') + 1
+
+    correct = rng.random(n_first) >= 0.05
+    rt = rng.lognormal(np.log(450), 0.3, n_first) - np.where(block_type == 'structured', 40, 0)
+
+    # Every error is followed by a correct retry of the same trial
+    repeat = np.where(correct, 1, 2)
+    index = np.repeat(np.arange(n_first), repeat)
+    attempt = np.ones(len(index), dtype=np.int64)
+    attempt[1:][index[1:] == index[:-1]] = 2
+    row_correct = np.where(attempt == 2, True, correct[index])
+
+    return pd.DataFrame({
+        'participant_id': 'bench',
+        'block': block[index],
+        'block_type': block_type[index],
+        'trial': trial[index],
+        'position': rng.integers(1, positions + 1, n_first)[index],
+        'reaction_time': np.round(rt[index], 2),
+        'correct': row_correct,
+        'attempt': attempt,
+        'timestamp': '2025-01-01 12:00:00'
+    })
+
+def best_time(func, budget=TIME_BUDGET, max_repeats=20):
+    """Best wall time of repeated calls within a time budget (at least one call)"""
+    times = []
+    spent = 0.0
+    while not times or (spent < budget and len(times) < max_repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        spent += elapsed
+    return min(times)
+
+def analysis_cases(sizes, work_dir):
+    """Yield (name, seconds) for the analysis hot paths"""
+    # Imported here because srtt_analysis pulls in the plotting stack
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from srtt_analysis import load_data, analyze_data, export_summary, generate_visualizations
+
+    for size in sizes:
+        csv_path = os.path.join(work_dir, f"srtt_participant_bench_{size}.csv")
+        synthetic_trials(size).to_csv(csv_path, index=False)
+
+        yield f"load_data[{size}]", best_time(lambda: load_data(csv_path))
+        data = load_data(csv_path)
+        yield f"analyze_data[{size}]", best_time(lambda: analyze_data(data))
+        results = analyze_data(data)
+        # export_summary reports every file it writes
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = best_time(lambda: export_summary(results, csv_path))
+        yield f"export_summary[{size}]", seconds
+
+        def visualize():
+            generate_visualizations(results)
+            plt.close('all')
+        yield f"generate_visualizations[{size}]", best_time(visualize, max_repeats=3)
+
+def experiment_cases(sequence_sizes, frames):
+    """Yield (name, seconds) for sequence generation and per-frame drawing"""
+    # The dummy driver must be chosen before srtt_experiment opens the display
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from srtt_experiment import SRTTExperiment
+
+    experiment = SRTTExperiment()
+    for size in sequence_sizes:
+        experiment.trials_per_block = size
+        for block_type, structured in (('structured', True), ('random', False)):
+            experiment.is_structured_block = structured
+            yield (f"generate_block_sequence[{block_type},{size}]",
+                   best_time(experiment.generate_block_sequence))
+
+    def draw_frames():
+        for frame in range(frames):
+            experiment.current_position = frame % experiment.positions
+            experiment.draw_stimuli()
+            pygame.display.flip()
+
+    # Reported per frame
+    yield "draw_stimuli+flip[per_frame]", best_time(draw_frames, max_repeats=5) / frames
+
+def run_benchmarks(sizes=DEFAULT_SIZES, sequence_sizes=SEQUENCE_SIZES, frames=DRAW_FRAMES, suites=('analysis', 'experiment')):
+    """Run the selected suites and return {case name: seconds}"""
+    timings = {}
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # export_summary and generate_visualizations write into ./analysis
+        os.chdir(work_dir)
+        try:
+            if 'analysis' in suites:
+                for name, seconds in analysis_cases(sizes, work_dir):
+                    timings[name] = seconds
+                    print(f"{name:<45} {seconds * 1000:>12.3f} ms")
+            if 'experiment' in suites:
+                for name, seconds in experiment_cases(sequence_sizes, frames):
+                    timings[name] = seconds
+                    print(f"{name:<45} {seconds * 1000:>12.3f} ms")
+        finally:
+            os.chdir(cwd)
+
+    return timings
+
+def compare(timings, baseline, threshold=DEFAULT_THRESHOLD):
+    """Cases slower than the baseline by more than threshold, as (name, baseline, current, ratio)"""
+    regressions = []
+    for name, seconds in timings.items():
+        reference = baseline.get('timings', {}).get(name)
+        if reference and seconds > reference * (1 + threshold):
+            regressions.append((name, reference, seconds, seconds / reference))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="SRTT benchmark suite with stored baselines")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Trials per synthetic dataset for the analysis benchmarks")
+    parser.add_argument('--sequence-sizes', type=int, nargs='+', default=SEQUENCE_SIZES)
+    parser.add_argument('--frames', type=int, default=DRAW_FRAMES)
+    parser.add_argument('--suite', choices=['analysis', 'experiment'], action='append',
+                        help="Run only this suite (can be repeated)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these timings as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown flagged as a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    timings = run_benchmarks(args.sizes, args.sequence_sizes, args.frames,
+                             args.suite or ('analysis', 'experiment'))
+
+    if args.save_baseline:
+        directory = os.path.dirname(args.baseline)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # Cases that were not run keep their previous baseline
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as f:
+                stored = json.load(f).get('timings', {})
+        stored.update(timings)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'machine': platform.platform(),
+                'python': platform.python_version(),
+                'timings': stored
+            }, f, indent=2)
+        print(f"\nBaseline saved to: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare(timings, baseline, args.threshold)
+    if not regressions:
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+        return
+
+    print(f"\nRegressions beyond {args.threshold:.0%}:")
+    for name, reference, seconds, ratio in regressions:
+        print(f"  {name:<45} {reference * 1000:>10.3f} -> {seconds * 1000:>10.3f} ms  ({ratio:.2f}x)")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+TIMEOUT_RT = 5000  # Reaction time recorded by present_trial when no key is pressed in time
+MAD_SCALE = 1.4826  # Makes the MAD a consistent estimator of the SD for normal data
+
+# Default cleaning pipeline (rules run in this order; None disables a rule)
+DEFAULT_CLEANING = {
+    'drop_timeouts': True,  # Remove the synthetic timeout rows
+    'timeout_rt': TIMEOUT_RT,  # Timeout RT of files saved without a timed_out column (the experiment's --timeout-ms)
+    'first_attempt_only': True,  # Keep only the first response of each trial
+    'drop_dropped_frames': True,  # Remove trials whose stimulus onset missed a frame
+    'min_rt': 100,  # Absolute cutoffs in milliseconds
+    'max_rt': 3000,
+    'trim_method': 'sd',  # 'sd', 'mad' or None
+    'trim_threshold': 2.5,  # Number of SDs (or scaled MADs) from the centre
+    'trim_groups': ['participant_id', 'block']
+}
+
+def _attempt_column(df):
+    """Name of the attempt column ('attempt' in result files, 'attempts' in older code)"""
+    if 'attempt' in df.columns:
+        return 'attempt'
+    if 'attempts' in df.columns:
+        return 'attempts'
+    return None
+
+def timeout_rows(df, timeout_rt=TIMEOUT_RT):
+    """Boolean array marking the synthetic timeout rows
+
+    Result files record timeouts in the timed_out column. Files saved before it
+    existed (or rows of such files mixed into a larger table) fall back to an
+    incorrect response with RT >= timeout_rt.
+    """
+    rt = pd.to_numeric(df['reaction_time']).to_numpy(np.float64)
+    correct = df['correct'].to_numpy(dtype=bool)
+    inferred = (rt >= timeout_rt) & ~correct
+    if 'timed_out' not in df.columns:
+        return inferred
+    recorded = df['timed_out']
+    flagged = recorded.to_numpy(dtype=bool) if recorded.dtype == bool else \
+        (recorded.astype(str).str.lower() == 'true').to_numpy()
+    return np.where(recorded.notna().to_numpy(), flagged, inferred)
+
+def _trim_mask(df, keep, method, threshold, groups):
+    """Rows whose RT lies within threshold spreads of their group's centre
+
+    Centre and spread come from the correct, still-kept responses of each group.
+    """
+    rt = df['reaction_time'].where(keep & df['correct'])
+    grouped = rt.groupby([df[column] for column in groups], sort=False)
+
+    if method == 'sd':
+        centre = grouped.transform('mean')
+        spread = grouped.transform('std')
+    elif method == 'mad':
+        centre = grouped.transform('median')
+        deviation = (rt - centre).abs()
+        spread = deviation.groupby([df[column] for column in groups], sort=False).transform('median') * MAD_SCALE
+    else:
+        raise ValueError(f"Unknown trimming method: {method}")
+
+    distance = (df['reaction_time'] - centre).abs()
+    # Groups without a usable spread (too few correct responses) are left untouched
+    return ~(distance > threshold * spread).to_numpy()
+
+def clean_trials(data, config=None):
+    """Apply the cleaning rules before aggregation
+
+    Returns the cleaned DataFrame and an ordered dict with the number of rows
+    removed by each rule. Every rule is a vectorized mask over the whole table.
+    """
+    settings = dict(DEFAULT_CLEANING)
+    if config:
+        settings.update(config)
+
+    df = pd.DataFrame(data)
+    keep = np.ones(len(df), dtype=bool)
+    report = {'input_rows': len(df)}
+
+    def apply(rule, mask):
+        nonlocal keep
+        removed = keep & ~mask
+        report[rule] = int(removed.sum())
+        keep = keep & mask
+
+    if len(df) == 0:
+        report['remaining_rows'] = 0
+        return df, report
+
+    rt = df['reaction_time'].to_numpy(dtype=np.float64)
+
+    if settings['drop_timeouts']:
+        apply('timeouts', ~timeout_rows(df, settings['timeout_rt']))
+
+    attempt_column = _attempt_column(df)
+    if settings['first_attempt_only'] and attempt_column:
+        apply('retry_attempts', pd.to_numeric(df[attempt_column]).to_numpy() == 1)
+
+    if settings['drop_dropped_frames'] and 'frame_dropped' in df.columns:
+        dropped = df['frame_dropped'].astype(str).str.lower() == 'true'
+        apply('dropped_frames', ~dropped.to_numpy())
+
+    if settings['min_rt'] is not None:
+        apply('below_min_rt', rt >= settings['min_rt'])
+
+    if settings['max_rt'] is not None:
+        apply('above_max_rt', rt <= settings['max_rt'])
+
+    if settings['trim_method']:
+        groups = [column for column in settings['trim_groups'] if column in df.columns]
+        rule = f"{settings['trim_method']}_trim"
+        apply(rule, _trim_mask(df, pd.Series(keep, index=df.index), settings['trim_method'],
+                               settings['trim_threshold'], groups))
+
+    report['remaining_rows'] = int(keep.sum())
+    return df[keep].reset_index(drop=True), report
+
+def print_cleaning_report(report):
+    """Print how many rows each cleaning rule removed"""
+    print(f"\nCleaning: {report['input_rows']} rows in, {report['remaining_rows']} rows kept")
+    for rule, removed in report.items():
+        if rule not in ('input_rows', 'remaining_rows'):
+            print(f"  {rule}: {removed} removed")
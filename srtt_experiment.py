@@ -4,7 +4,17 @@ import random
 import time
 import csv
 import os
+import gc
+import argparse
 from datetime import datetime
+from srtt_monitor import TrialPublisher, MONITOR_PORT
+from srtt_timing import TimingMode
+from srtt_profiling import PhaseProfiler, PROFILE_MODES
+from srtt_sketches import save_session_sketch
+from srtt_manifest import record_session
+from srtt_adaptive import AdaptiveStopping, PRECISION_MS, MIN_BLOCKS
+from srtt_validation import valid_participant_id
+from srtt_sequences import generate_structured_sequence, generate_block_sequence
 
 # Initialize Pygame
 pygame.init()
@@ -17,8 +27,15 @@ STIMULUS_COLOR = (0, 0, 255)
 STIMULUS_ACTIVE_COLOR = (255, 0, 0)
 STIMULUS_SIZE = 50
 STIMULUS_DISTANCE = 120  # Space between stimuli
-SEQUENCE_LENGTH = 10  # Length of the structured sequence
 FEEDBACK_DURATION = 500  # Feedback duration in milliseconds
+FEEDBACK_CORRECT_DURATION = 100  # Pause after a correct response (ms)
+FEEDBACK_ERROR_DURATION = 200  # Pause after an incorrect response (ms)
+RESPONSE_TIMEOUT = 5000  # Time without response before a timeout is recorded (ms)
+INTER_TRIAL_INTERVAL = 0  # Blank response-stimulus interval after feedback (ms)
+CALIBRATION_FRAMES = 120  # Flips used to measure the refresh interval
+NOMINAL_FRAME_INTERVAL = 1000 / 60  # Assumed refresh interval when flips do not wait for vsync (ms)
+DROPPED_FRAME_FACTOR = 1.5  # Onset later than this many frames after the sync flip is a dropped frame
+WARMUP_FRAMES = 60  # Invisible trial-screen frames drawn and flipped before the first block
 
 # Default experiment settings (modifiable)
 DEFAULT_POSITIONS = 4  # Default number of stimulus positions
@@ -40,20 +57,28 @@ KEY_MAPPING = {
     pygame.K_0: 9
 }
 
-# Create screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+# Create screen (requesting vsync, which SDL only offers for scaled/OpenGL displays)
+try:
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+except pygame.error:
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Tarefa de Tempo de Reação em Série (SRTT)")
 
 # Font setup
 font = pygame.font.SysFont(None, 28)
 small_font = pygame.font.SysFont(None, 22)
 
-# Create structured sequence (with second-order dependencies)
-# This is a 10-item sequence with balanced transitions
-DEFAULT_STRUCTURED_SEQUENCE = [0, 2, 1, 0, 3, 1, 2, 3, 0, 1]
+def first_and_steady(name, times):
+    """First value and median of the remaining ones (milliseconds)"""
+    if not times:
+        return {}
+    steady = sorted(times[1:]) or times
+    return {f"{name}_first": round(times[0], 3), f"{name}_steady": round(steady[len(steady) // 2], 3)}
 
 class SRTTExperiment:
-    def __init__(self):
+    def __init__(self, monitor_port=None, response_timeout=RESPONSE_TIMEOUT,
+                 inter_trial_interval=INTER_TRIAL_INTERVAL, timing_mode=False, profile=None,
+                 adaptive=None, warmup=True):
         self.participant_id = None
         self.results = []
         self.current_block = 0
@@ -75,33 +100,51 @@ class SRTTExperiment:
         self.blocks = DEFAULT_BLOCKS
         self.trials_per_block = DEFAULT_TRIALS_PER_BLOCK
         
+        # Trial timing (milliseconds)
+        self.response_timeout = response_timeout
+        self.feedback_correct_duration = FEEDBACK_CORRECT_DURATION
+        self.feedback_error_duration = FEEDBACK_ERROR_DURATION
+        self.inter_trial_interval = inter_trial_interval
+        
+        # Display timing, measured by calibrate_display
+        self.frame_interval = NOMINAL_FRAME_INTERVAL
+        self.vsync = False
+        self.last_flip_time = None
+        self.onset_time = 0
+        self.onset_interval = 0
+        self.frame_dropped = False
+        
+        # Timestamped phase transitions of every trial
+        self.clock_start = time.perf_counter()
+        self.phase_events = []
+        
+        # Optional real-time tuning (GC control, priority, CPU affinity)
+        self.timing = TimingMode() if timing_mode else None
+        
+        # Optional live stream of trial records for the experimenter monitor
+        self.publisher = TrialPublisher(monitor_port) if monitor_port else None
+        
+        # Optional per-phase profiler (a no-op unless a mode is given)
+        self.profiler = PhaseProfiler(profile)
+        
+        # Optional adaptive early stopping (an AdaptiveStopping rule)
+        self.adaptive = adaptive
+        
+        # Pre-rendered stimulus rows (one per active position, plus none), built by warm_up
+        self.warmup = warmup
+        self.stimulus_layers = {}
+        self.stimulus_layer_settings = None  # (positions, top) the layers were rendered for
+        self.warmup_report = {}
+        
+    def record_result(self, result):
+        """Store a response record and publish it to the live monitor"""
+        self.results.append(result)
+        if self.publisher:
+            self.publisher.publish(result)
+        
     def generate_structured_sequence(self):
         """Generate a structured sequence for the current number of positions"""
-        if self.positions <= 4:
-            # Para posições <= 4, adaptar a sequência padrão
-            if self.positions == 2:
-                # Para 2 posições, usar apenas valores 0 e 1
-                return [0, 1, 0, 1, 0, 1, 0, 1, 0, 1]
-            elif self.positions == 3:
-                # Para 3 posições, usar apenas valores 0, 1 e 2
-                return [0, 2, 1, 0, 2, 1, 2, 0, 1, 2]
-            else:
-                # Para 4 posições, usar a sequência padrão
-                return DEFAULT_STRUCTURED_SEQUENCE
-        else:
-            # For more positions, create a new balanced sequence
-            seq = []
-            for i in range(SEQUENCE_LENGTH):
-                # Avoid consecutive repetitions
-                if i > 0:
-                    options = list(range(self.positions))
-                    if seq:
-                        options.remove(seq[-1])  # Don't repeat last position
-                    pos = random.choice(options)
-                else:
-                    pos = random.randint(0, self.positions - 1)
-                seq.append(pos)
-            return seq
+        return generate_structured_sequence(self.positions)
             
     def get_experiment_settings(self):
         """Display settings screen for configuration"""
@@ -224,51 +267,7 @@ class SRTTExperiment:
 
     def generate_block_sequence(self):
         """Generate the sequence for the current block"""
-        if self.is_structured_block:
-            # For structured blocks, repeat the predefined sequence as needed
-            structured_sequence = self.generate_structured_sequence()
-            repetitions = self.trials_per_block // SEQUENCE_LENGTH
-            remainder = self.trials_per_block % SEQUENCE_LENGTH
-            sequence = (structured_sequence * repetitions) + structured_sequence[:remainder]
-            
-            # Garantir que todas as posições na sequência são válidas
-            for i in range(len(sequence)):
-                if sequence[i] >= self.positions:
-                    sequence[i] = sequence[i] % self.positions
-            
-            # Modify the sequence to ensure no immediate repetitions
-            for i in range(1, len(sequence)):
-                if sequence[i] == sequence[i-1]:
-                    # Find a non-repeating value
-                    options = list(range(self.positions))  # Usar apenas posições válidas
-                    if len(options) > 1:  # Garantir que temos opções
-                        options.remove(sequence[i-1])
-                        sequence[i] = random.choice(options)
-                        
-            return sequence
-        else:
-            # For random blocks, generate a pseudo-random sequence
-            random_sequence = []
-            last_position = None
-            
-            for _ in range(self.trials_per_block):
-                # Generate new positions ensuring no immediate repetitions
-                available_positions = list(range(self.positions))  # Garantir apenas posições válidas
-                
-                if last_position is not None and last_position in available_positions:
-                    if len(available_positions) > 1:  # Se houver mais de uma opção
-                        available_positions.remove(last_position)
-                
-                if available_positions:  # Make sure we have options
-                    new_position = random.choice(available_positions)
-                else:
-                    # Fallback para quando há apenas uma posição
-                    new_position = 0
-                    
-                random_sequence.append(new_position)
-                last_position = new_position
-                    
-            return random_sequence
+        return generate_block_sequence(self.positions, self.trials_per_block, self.is_structured_block)
     
     def collect_participant_info(self):
         """Collect participant information using a simple input dialog"""
@@ -294,12 +293,13 @@ class SRTTExperiment:
                     color = color_active if active else color_inactive
                 if event.type == pygame.KEYDOWN:
                     if active:
-                        if event.key == pygame.K_RETURN:
+                        if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                             if text:
                                 done = True
                         elif event.key == pygame.K_BACKSPACE:
                             text = text[:-1]
-                        else:
+                        elif valid_participant_id(event.unicode):
+                            # The ID becomes part of the result file name: letters, digits, '-' and '_' only
                             text += event.unicode
             
             screen.fill(BACKGROUND_COLOR)
@@ -347,7 +347,8 @@ class SRTTExperiment:
         instructions += [
             "",
             "Mantenha seus dedos posicionados nas teclas numéricas durante todo o experimento.",
-            f"O experimento consiste em {self.blocks} blocos de {self.trials_per_block} estímulos cada.",
+            f"O experimento consiste em {'até ' if self.adaptive else ''}{self.blocks} blocos "
+            f"de {self.trials_per_block} estímulos cada.",
             "",
             "Pressione ESPAÇO para iniciar o experimento."
         ]
@@ -374,6 +375,10 @@ class SRTTExperiment:
         
         pygame.display.flip()
         
+        # Warm up the drawing, flip and event paths while the instructions are on screen
+        if self.warmup:
+            self.warm_up()
+        
         waiting_for_input = True
         while waiting_for_input:
             for event in pygame.event.get():
@@ -408,6 +413,10 @@ class SRTTExperiment:
         
         pygame.display.flip()
         
+        # Run the garbage collection deferred during the block while the participant rests
+        if self.timing:
+            self.timing.collect()
+        
         waiting_for_input = True
         while waiting_for_input:
             for event in pygame.event.get():
@@ -417,27 +426,195 @@ class SRTTExperiment:
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                     waiting_for_input = False
     
-    def draw_stimuli(self):
-        """Draw all stimulus positions and highlight the active one"""
+    def calibrate_display(self, n_frames=CALIBRATION_FRAMES):
+        """Measure the refresh interval from repeated flips"""
+        screen.fill(BACKGROUND_COLOR)
+        text = font.render("Calibrando a tela...", True, (0, 0, 0))
+        screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, SCREEN_HEIGHT//2))
+        
+        flip_times = []
+        for _ in range(n_frames + 1):
+            pygame.display.flip()
+            flip_times.append(time.perf_counter())
+            pygame.event.pump()
+        
+        intervals = sorted((b - a) * 1000 for a, b in zip(flip_times, flip_times[1:]))
+        median = intervals[len(intervals) // 2]
+        
+        # Flips that return almost immediately are not synchronized to the display
+        self.vsync = median >= 3.0
+        self.frame_interval = median if self.vsync else NOMINAL_FRAME_INTERVAL
+        self.last_flip_time = flip_times[-1]
+        
+        calibration = {
+            "vsync": self.vsync,
+            "frame_interval_ms": round(self.frame_interval, 3),
+            "measured_median_ms": round(median, 3),
+            "measured_p95_ms": round(intervals[int(len(intervals) * 0.95) - 1], 3)
+        }
+        print(f"Display calibration: {calibration}")
+        return calibration
+    
+    def wait_for_frame(self):
+        """Block until the next frame boundary and return its time"""
+        if self.vsync:
+            # Re-flip the unchanged screen: returns at the next vertical blank
+            pygame.display.flip()
+            self.last_flip_time = time.perf_counter()
+            return self.last_flip_time
+        
+        # Without vsync, follow the frame grid predicted from the last flip
+        interval = self.frame_interval / 1000
+        now = time.perf_counter()
+        if self.last_flip_time is None:
+            self.last_flip_time = now
+        frames = int((now - self.last_flip_time) / interval) + 1
+        boundary = self.last_flip_time + frames * interval
+        while time.perf_counter() < boundary:
+            pass
+        return boundary
+    
+    def flip_on_frame(self, sync_time):
+        """Flip on the frame after sync_time and return the measured flip time"""
+        if not self.vsync:
+            target = sync_time + self.frame_interval / 1000
+            while time.perf_counter() < target:
+                pass
+        
+        pygame.display.flip()
+        self.last_flip_time = time.perf_counter()
+        return self.last_flip_time
+    
+    def warm_up(self, n_frames=WARMUP_FRAMES):
+        """Exercise the trial code paths before the first block, without showing them
+        
+        Pre-renders the stimulus states, then draws every trial screen into the
+        back buffer, restores the current screen over it and flips on the frame
+        grid, so drawing, frame sync, flip and event polling have all run before
+        the first real trial. The first warm-up frame pays the one-time costs;
+        its time against the median of the rest is reported as the spike.
+        """
+        frame = screen.copy()
+        
+        start = time.perf_counter()
+        self.prerender_stimuli()
+        prerender_ms = (time.perf_counter() - start) * 1000
+        
+        saved = (self.current_position, self.current_block, self.current_trial)
+        work_times = []
+        onset_intervals = []
+        for i in range(n_frames):
+            self.current_position = i % self.positions
+            sync_time = self.wait_for_frame()
+            start = time.perf_counter()
+            self.draw_trial_screen(show_active=i % 2 == 0)
+            
+            # Same per-response work as present_trial, with the records discarded
+            pygame.event.pump()
+            pygame.event.peek(pygame.KEYDOWN)
+            self.validate_response(pygame.K_1)
+            self.make_result(0.0, False, 1)
+            self.session_time_ms()
+            
+            screen.blit(frame, (0, 0))
+            work_times.append((time.perf_counter() - start) * 1000)
+            onset_intervals.append((self.flip_on_frame(sync_time) - sync_time) * 1000)
+        self.current_position, self.current_block, self.current_trial = saved
+        
+        # Start the first block with no garbage left over from setup
+        gc.collect()
+        
+        self.warmup_report = {
+            'frames': n_frames,
+            'prerender_ms': round(prerender_ms, 3),
+            **first_and_steady('warmup_frame_ms', work_times),
+            **first_and_steady('warmup_onset_interval_ms', onset_intervals)
+        }
+        print(f"Warm-up: {self.warmup_report}")
+        return self.warmup_report
+    
+    def save_warmup_report(self, timestamp):
+        """Save the warm-up measurements with the first vs steady onset intervals of the session"""
+        timing_dir = os.path.join('results', 'timing')
+        if not os.path.exists(timing_dir):
+            os.makedirs(timing_dir)
+        
+        # First response row of every trial of the first block, in trial order
+        first_block = {}
+        for result in self.results:
+            if result["block"] == 1:
+                first_block.setdefault(result["trial"], result["onset_interval"])
+        report = dict(self.warmup_report, warmup=self.warmup)
+        onset_intervals = [first_block[trial] for trial in sorted(first_block)]
+        report.update(first_and_steady('trial_onset_interval_ms', onset_intervals))
+        
+        filename = os.path.join(timing_dir, f"srtt_warmup_{self.participant_id}_{timestamp}.csv")
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["measure", "value"])
+            for key, value in report.items():
+                writer.writerow([key, value])
+        
+        print(f"First trial vs steady state: {report}")
+        return filename
+    
+    def draw_stimulus_row(self, surface, y, active):
+        """Draw the stimulus circles and their numbers centred on row y; active is an index or None"""
         # Calculate the starting position
         start_x = SCREEN_WIDTH // 2 - ((self.positions - 1) * STIMULUS_DISTANCE) // 2
         
         for i in range(self.positions):
             x = start_x + i * STIMULUS_DISTANCE
-            y = SCREEN_HEIGHT // 2
             
             # Determinar cor do círculo - SEMPRE vermelho para a posição atual
-            if i == self.current_position:
+            if i == active:
                 color = STIMULUS_ACTIVE_COLOR  # Vermelho para a posição atual
             else:
                 color = STIMULUS_COLOR  # Azul para as outras posições
             
             # Desenhar o círculo
-            pygame.draw.circle(screen, color, (x, y), STIMULUS_SIZE // 2)
+            pygame.draw.circle(surface, color, (x, y), STIMULUS_SIZE // 2)
             
             # Desenhar número da posição embaixo do círculo
             position_text = font.render(str(i + 1), True, (0, 0, 0))
-            screen.blit(position_text, (x - position_text.get_width()//2, y + STIMULUS_SIZE))
+            surface.blit(position_text, (x - position_text.get_width()//2, y + STIMULUS_SIZE))
+    
+    def prerender_stimuli(self):
+        """Render the stimulus row once for every state (each active position and none)"""
+        top = SCREEN_HEIGHT // 2 - STIMULUS_SIZE // 2
+        height = STIMULUS_SIZE // 2 + STIMULUS_SIZE + font.get_linesize()
+        
+        self.stimulus_layers = {}
+        self.stimulus_layer_settings = (self.positions, top)
+        for active in [None] + list(range(self.positions)):
+            # Display-format surfaces blit without per-pixel conversion
+            layer = pygame.Surface((SCREEN_WIDTH, height)).convert()
+            layer.fill(BACKGROUND_COLOR)
+            self.draw_stimulus_row(layer, SCREEN_HEIGHT // 2 - top, active)
+            self.stimulus_layers[active] = layer
+    
+    def draw_stimuli(self, show_active=True):
+        """Draw all stimulus positions and highlight the active one"""
+        active = self.current_position if show_active else None
+        
+        # Use the pre-rendered row when it matches the current settings
+        settings = self.stimulus_layer_settings
+        if settings is not None and settings[0] == self.positions and active in self.stimulus_layers:
+            screen.blit(self.stimulus_layers[active], (0, settings[1]))
+        else:
+            self.draw_stimulus_row(screen, SCREEN_HEIGHT // 2, active)
+    
+    def draw_trial_screen(self, show_active=True):
+        """Draw the block/trial header and the stimuli into the back buffer"""
+        screen.fill(BACKGROUND_COLOR)
+        
+        # Display block and trial info
+        block_info = font.render(f"Bloco: {self.current_block + 1}/{self.blocks}  Trial: {self.current_trial + 1}/{self.trials_per_block}", 
+                                 True, (0, 0, 0))
+        screen.blit(block_info, (10, 10))
+        
+        # Desenhar círculos (um será vermelho, exceto no intervalo entre trials)
+        self.draw_stimuli(show_active)
     
     def validate_response(self, key_pressed):
         """Check if the key pressed corresponds to the current position"""
@@ -445,8 +622,49 @@ class SRTTExperiment:
             return True
         return False
     
+    def session_time_ms(self, moment=None):
+        """Milliseconds since the session clock started"""
+        if moment is None:
+            moment = time.perf_counter()
+        return round((moment - self.clock_start) * 1000, 3)
+    
+    def log_phase(self, phase, moment=None, detail=""):
+        """Timestamp a trial phase transition"""
+        self.phase_events.append({
+            "participant_id": self.participant_id,
+            "block": self.current_block + 1,
+            "trial": self.current_trial + 1,
+            "phase": phase,
+            "time_ms": self.session_time_ms(moment),
+            "detail": detail
+        })
+    
+    def make_result(self, reaction_time, correct, attempt, timed_out=False):
+        """Build a response record for the current trial"""
+        return {
+            "participant_id": self.participant_id,
+            "block": self.current_block + 1,
+            "block_type": "structured" if self.is_structured_block else "random",
+            "trial": self.current_trial + 1,
+            "position": self.current_position + 1,
+            "reaction_time": reaction_time,
+            "correct": correct,
+            "attempt": attempt,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "onset_time": self.onset_time,
+            "onset_interval": self.onset_interval,
+            "frame_dropped": self.frame_dropped,
+            "timed_out": timed_out
+        }
+    
     def present_trial(self):
-        """Present a single trial"""
+        """Present a single trial as a state machine of timed phases
+        
+        stimulus -> response -> feedback -> inter-trial interval. After an error the
+        feedback phase returns to response with the same stimulus. Phase ends are
+        deadline checks on time.perf_counter(), the event queue is drained on every
+        pass, and every transition is timestamped in self.phase_events.
+        """
         # Verificar se ainda há posições válidas no bloco
         if self.current_trial < len(self.block_sequence):
             self.current_position = self.block_sequence[self.current_trial]
@@ -460,24 +678,29 @@ class SRTTExperiment:
             # Fallback: usar uma posição aleatória válida
             self.current_position = random.randint(0, self.positions - 1)
         
-        self.start_time = time.time()
-        
         # Reset for next trial
         self.reaction_time = 0
-        waiting_for_response = True
         incorrect_attempts = 0
+        phase = "stimulus"
+        deadline = None
         
-        while waiting_for_response and self.running:
-            screen.fill(BACKGROUND_COLOR)
-            
-            # Display block and trial info
-            block_info = font.render(f"Bloco: {self.current_block + 1}/{self.blocks}  Trial: {self.current_trial + 1}/{self.trials_per_block}", 
-                                     True, (0, 0, 0))
-            screen.blit(block_info, (10, 10))
-            
-            # Desenhar círculos (um será vermelho)
-            self.draw_stimuli()
-            pygame.display.flip()
+        while phase != "done" and self.running:
+            if phase == "stimulus":
+                # Show the stimulus on a frame boundary; reaction times are measured from this flip
+                sync_time = self.wait_for_frame()
+                self.draw_trial_screen()
+                self.start_time = self.flip_on_frame(sync_time)
+                
+                # An onset more than one frame after the sync point means a frame was dropped
+                self.onset_time = self.session_time_ms(self.start_time)
+                self.onset_interval = round((self.start_time - sync_time) * 1000, 3)
+                self.frame_dropped = self.onset_interval > DROPPED_FRAME_FACTOR * self.frame_interval
+                self.log_phase("stimulus", self.start_time,
+                               detail="frame_dropped" if self.frame_dropped else "")
+                
+                phase = "response"
+                deadline = self.start_time + self.response_timeout / 1000
+                continue
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -489,70 +712,77 @@ class SRTTExperiment:
                         self.running = False
                         return
                     
-                    # Check response keys - agora usando teclas numéricas
-                    if event.key in KEY_MAPPING:
-                        response_time = (time.time() - self.start_time) * 1000  # Convert to milliseconds
-                        correct = self.validate_response(event.key)
-                        
-                        # Record the reaction time (only record the time for the first attempt)
-                        if incorrect_attempts == 0:
-                            self.reaction_time = response_time
-                        
-                        # Incrementar total de respostas
-                        self.total_responses += 1
-                        
-                        # Record the response (both correct and incorrect)
-                        self.results.append({
-                            "participant_id": self.participant_id,
-                            "block": self.current_block + 1,
-                            "block_type": "structured" if self.is_structured_block else "random",
-                            "trial": self.current_trial + 1,
-                            "position": self.current_position + 1,
-                            "reaction_time": round(response_time, 2),
-                            "correct": correct,
-                            "attempt": incorrect_attempts + 1,
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        })
+                    if event.key not in KEY_MAPPING:
+                        continue
+                    
+                    event_time = time.perf_counter()
+                    
+                    # Keys pressed outside the response window are timestamped but not scored
+                    if phase != "response":
+                        self.log_phase("ignored_key", event_time, detail=f"{phase}:{KEY_MAPPING[event.key] + 1}")
+                        continue
+                    
+                    response_time = (event_time - self.start_time) * 1000  # Convert to milliseconds
+                    correct = self.validate_response(event.key)
+                    
+                    # Record the reaction time (only record the time for the first attempt)
+                    if incorrect_attempts == 0:
+                        self.reaction_time = response_time
+                    
+                    # Incrementar total de respostas
+                    self.total_responses += 1
+                    
+                    # Record the response (both correct and incorrect)
+                    self.record_result(self.make_result(round(response_time, 2), correct, incorrect_attempts + 1))
+                    
+                    if correct:
+                        self.correct_responses += 1
+                        # Registrar timestamp do acerto para cálculo do tempo entre acertos
+                        self.correct_timestamps.append(event_time)
                         
-                        if correct:
-                            # If correct, end trial and proceed
-                            self.correct_responses += 1
-                            # Registrar timestamp do acerto para cálculo do tempo entre acertos
-                            current_time = time.time()
-                            self.correct_timestamps.append(current_time)
-                            
-                            # Show feedback briefly
-                            pygame.display.flip()
-                            pygame.time.delay(100)  # Brief delay between trials
-                            waiting_for_response = False
-                        else:
-                            # For incorrect response, keep the same position but record the attempt
-                            incorrect_attempts += 1
-                            
-                            # Flash the stimulus briefly to indicate incorrect response
-                            pygame.display.flip()
-                            pygame.time.delay(200)
-                            pygame.display.flip()
-            
-            # If no response after 5 seconds, count as timeout but keep waiting for response
-            if time.time() - self.start_time > 5.0 and incorrect_attempts == 0:
-                # Record timeout as an incorrect attempt
-                incorrect_attempts += 1
-                self.total_responses += 1  # Também contar timeouts como respostas
-                self.results.append({
-                    "participant_id": self.participant_id,
-                    "block": self.current_block + 1,
-                    "block_type": "structured" if self.is_structured_block else "random",
-                    "trial": self.current_trial + 1,
-                    "position": self.current_position + 1,
-                    "reaction_time": 5000,  # Set to maximum RT
-                    "correct": False,
-                    "attempt": incorrect_attempts,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-                # Reset timer but keep waiting for response
-                self.start_time = time.time()
+                        phase = "feedback_correct"
+                        deadline = event_time + self.feedback_correct_duration / 1000
+                    else:
+                        # For incorrect response, keep the same position but record the attempt
+                        incorrect_attempts += 1
+                        phase = "feedback_error"
+                        deadline = event_time + self.feedback_error_duration / 1000
+                    self.log_phase(phase, event_time)
+            
+            now = time.perf_counter()
+            
+            if phase == "response":
+                # If no response before the timeout, count as timeout but keep waiting for response
+                if deadline is not None and now >= deadline and incorrect_attempts == 0:
+                    # Record timeout as an incorrect attempt
+                    incorrect_attempts += 1
+                    self.total_responses += 1  # Também contar timeouts como respostas
+                    self.record_result(self.make_result(self.response_timeout, False, incorrect_attempts, True))
+                    self.log_phase("timeout", now)
+                    
+                    # Reset timer but keep waiting for response
+                    self.start_time = now
+                    deadline = None
+            
+            elif phase == "feedback_error" and now >= deadline:
+                # Back to the same stimulus; the RT clock keeps running from onset
+                phase = "response"
+                deadline = None
+                self.log_phase("response", now)
+            
+            elif phase == "feedback_correct" and now >= deadline:
+                phase = "iti"
+                deadline = now + self.inter_trial_interval / 1000
+                if self.inter_trial_interval > 0:
+                    # Blank interval: no active stimulus until the next trial
+                    self.draw_trial_screen(show_active=False)
+                    pygame.display.flip()
+                    self.last_flip_time = time.perf_counter()
+                self.log_phase("iti", now)
+            
+            elif phase == "iti" and now >= deadline:
+                phase = "done"
+                self.log_phase("trial_end", now)
 
     def save_results(self):
         """Save results to a CSV file"""
@@ -566,7 +796,8 @@ class SRTTExperiment:
         
         with open(filename, 'w', newline='') as csvfile:
             fieldnames = ["participant_id", "block", "block_type", "trial", 
-                          "position", "reaction_time", "correct", "attempt", "timestamp"]
+                          "position", "reaction_time", "correct", "attempt", "timestamp",
+                          "onset_time", "onset_interval", "frame_dropped", "timed_out"]
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             
             writer.writeheader()
@@ -574,6 +805,61 @@ class SRTTExperiment:
                 writer.writerow(result)
                 
         print(f"Results saved to {filename}")
+        
+        # Index the session so batch tools can find it without opening the file
+        # Blocks actually run, which is fewer than planned after an adaptive stop
+        record_session(filename, self.participant_id, len(self.results),
+                       self.positions, self.current_block, self.trials_per_block,
+                       adaptive_stop=bool(self.adaptive and self.adaptive.stopped_after))
+        
+        # Quantile sketch of the session's RTs, mergeable into group-level percentiles
+        save_session_sketch(self.results, filename)
+        
+        # Save the timestamped trial phases alongside the results
+        self.save_phase_log(timestamp)
+        if self.timing:
+            self.save_timing_report(timestamp)
+        self.save_warmup_report(timestamp)
+        if self.adaptive:
+            log_file = os.path.join('results', 'timing', f"srtt_adaptive_{self.participant_id}_{timestamp}.csv")
+            self.adaptive.save_log(log_file, self.blocks)
+        return filename
+    
+    def save_phase_log(self, timestamp):
+        """Save the trial phase transitions to a CSV file in results/timing"""
+        timing_dir = os.path.join('results', 'timing')
+        if not os.path.exists(timing_dir):
+            os.makedirs(timing_dir)
+        
+        filename = os.path.join(timing_dir, f"srtt_phases_{self.participant_id}_{timestamp}.csv")
+        
+        with open(filename, 'w', newline='') as csvfile:
+            fieldnames = ["participant_id", "block", "trial", "phase", "time_ms", "detail"]
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            
+            writer.writeheader()
+            for event in self.phase_events:
+                writer.writerow(event)
+        
+        return filename
+    
+    def save_timing_report(self, timestamp):
+        """Save the per-block GC and context-switch report of timing mode"""
+        timing_dir = os.path.join('results', 'timing')
+        if not os.path.exists(timing_dir):
+            os.makedirs(timing_dir)
+        
+        filename = os.path.join(timing_dir, f"srtt_timing_{self.participant_id}_{timestamp}.csv")
+        
+        with open(filename, 'w', newline='') as csvfile:
+            fieldnames = ["block", "duration_ms", "gc_pauses", "gc_pause_total_ms", "gc_pause_max_ms",
+                          "voluntary_switches", "involuntary_switches"]
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            
+            writer.writeheader()
+            for report in self.timing.block_reports:
+                writer.writerow(report)
+        
         return filename
     
     def calculate_inter_hit_times(self):
@@ -671,11 +957,23 @@ class SRTTExperiment:
     def run(self):
         """Run the entire experiment"""
         try:
-            # Collect participant info
-            self.collect_participant_info()
+            with self.profiler.phase("setup"):
+                # Collect participant info
+                self.collect_participant_info()
+                
+                # Measure the display refresh interval
+                calibration = self.calibrate_display()
+                
+                if self.timing:
+                    self.timing.setup()
+                
+                # Show instructions
+                self.show_instructions()
             
-            # Show instructions
-            self.show_instructions()
+            # Phase timestamps are relative to the start of the first block
+            self.clock_start = time.perf_counter()
+            self.log_phase("calibration", self.clock_start,
+                           detail=";".join(f"{key}={value}" for key, value in calibration.items()))
             
             while self.running and self.current_block < self.blocks:
                 # Determine if this is a structured or random block (alternating)
@@ -687,13 +985,25 @@ class SRTTExperiment:
                 # Reset for new block
                 self.current_trial = 0
                 
+                if self.timing:
+                    self.timing.start_block()
+                
                 # Run trials for current block
-                while self.current_trial < self.trials_per_block and self.running:
-                    # Present trial
-                    self.present_trial()
-                    
-                    # Move to next trial
-                    self.current_trial += 1
+                with self.profiler.phase(f"block_{self.current_block + 1}"):
+                    while self.current_trial < self.trials_per_block and self.running:
+                        # Present trial
+                        first_row = len(self.results)
+                        self.present_trial()
+                        
+                        # Update the running learning-effect estimate with the trial's first response
+                        if self.adaptive and len(self.results) > first_row:
+                            self.adaptive.add_trial(self.results[first_row])
+                        
+                        # Move to next trial
+                        self.current_trial += 1
+                
+                if self.timing:
+                    print(f"Block timing: {self.timing.end_block(self.current_block + 1)}")
                 
                 # Calculate and store block statistics
                 self.calculate_block_statistics()
@@ -701,13 +1011,22 @@ class SRTTExperiment:
                 # Move to next block
                 self.current_block += 1
                 
+                # End the session early once the learning effect is estimated precisely enough
+                if self.adaptive and self.running and self.adaptive.end_block(
+                        self.current_block, "structured" if self.is_structured_block else "random"):
+                    self.log_phase("adaptive_stop", detail=f"blocks={self.current_block}")
+                    print(f"Adaptive stop after block {self.current_block}: {self.adaptive.checkpoints[-1]}")
+                    break
+                
                 # Show break between blocks (if not the last block)
                 if self.current_block < self.blocks and self.running:
-                    self.show_break()
+                    with self.profiler.phase(f"break_{self.current_block}"):
+                        self.show_break()
             
             if self.running:
                 # Save results to file
-                filename = self.save_results()
+                with self.profiler.phase("save"):
+                    filename = self.save_results()
                 
                 # Show completion screen
                 self.show_completion_screen(filename)
@@ -715,13 +1034,43 @@ class SRTTExperiment:
             # Lidar com exceções para evitar travamentos inesperados
             print(f"Erro durante o experimento: {e}")
         finally:
+            if self.publisher:
+                self.publisher.close()
+            if self.timing:
+                self.timing.restore()
+            if self.profiler.enabled:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                self.profiler.report(os.path.join("results", "timing", f"profile_{self.participant_id}_{timestamp}"))
             # Garantir que o pygame seja finalizado adequadamente
             pygame.quit()
             sys.exit()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tarefa de Tempo de Reação em Série (SRTT)")
+    parser.add_argument('--monitor', nargs='?', type=int, const=MONITOR_PORT, default=None, metavar='PORT',
+                        help="Publish trial records to the live monitor (srtt_monitor.py)")
+    parser.add_argument('--timeout-ms', type=int, default=RESPONSE_TIMEOUT,
+                        help="Time without response before a timeout is recorded")
+    parser.add_argument('--iti-ms', type=int, default=INTER_TRIAL_INTERVAL,
+                        help="Blank interval between a correct response and the next stimulus")
+    parser.add_argument('--timing-mode', action='store_true',
+                        help="Disable GC during blocks, raise priority and pin to a CPU where permitted")
+    parser.add_argument('--profile', nargs='?', const='sampling', default=None, choices=PROFILE_MODES,
+                        help="Profile setup, each block, breaks and saving (sampling or cprofile)")
+    parser.add_argument('--adaptive', nargs='?', type=float, const=PRECISION_MS, default=None, metavar='MS',
+                        help="End the session once the learning effect's 95%% CI half-width is at most MS")
+    parser.add_argument('--min-blocks', type=int, default=MIN_BLOCKS,
+                        help="Blocks always run before adaptive stopping can end the session")
+    parser.add_argument('--no-warmup', action='store_true',
+                        help="Skip the warm-up before the first block (to measure the first-trial spike)")
+    args = parser.parse_args()
+    
     try:
-        experiment = SRTTExperiment()
+        experiment = SRTTExperiment(monitor_port=args.monitor, response_timeout=args.timeout_ms,
+                                    inter_trial_interval=args.iti_ms, timing_mode=args.timing_mode,
+                                    profile=args.profile,
+                                    adaptive=AdaptiveStopping(args.adaptive, args.min_blocks) if args.adaptive else None,
+                                    warmup=not args.no_warmup)
         experiment.run()
     except Exception as e:
         print(f"Erro ao iniciar o experimento: {e}")
@@ -0,0 +1,239 @@
+import os
+import json
+import math
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from srtt_archive import ArchiveReader, ARCHIVE_EXTENSION, session_name
+from srtt_streaming import CellAccumulator, CELL_KEYS, SUM_COLUMNS, stream_accumulate
+
+PANEL_DIR = 'analysis/cache/panels'
+CELL_CACHE = 'cells.json'  # Cell sums of every result file, reused while its size and mtime are unchanged
+PANEL_SIZE = (3.0, 3.0)  # Inches; every panel has the same pixel size so they tile exactly
+PANEL_DPI = 100
+MAX_POINTS = 40  # Curves with more blocks than this are averaged into bins
+CI_Z = 1.96  # Normal approximation for the 95% band around the group mean
+LINE_STYLES = {'structured': '-', 'random': '--'}
+
+def cached_cells(paths, panel_dir=PANEL_DIR, clean=True):
+    """Cell sums of all result files; only files that are new or changed since the last run are read
+
+    With clean=True the row-level cleaning rules are applied, as in the other
+    analyses. A session both in an archive and still on disk as a CSV is
+    counted once.
+    """
+    if not os.path.exists(panel_dir):
+        os.makedirs(panel_dir)
+
+    cache_path = os.path.join(panel_dir, CELL_CACHE)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+
+    archived = set()
+    for path in paths:
+        if path.endswith(ARCHIVE_EXTENSION):
+            archived.update(ArchiveReader(path).sessions())
+
+    accumulator = CellAccumulator()
+    files = {}
+    for path in paths:
+        if not path.endswith(ARCHIVE_EXTENSION) and session_name(path) in archived:
+            continue
+        stat = os.stat(path)
+        state = [stat.st_size, stat.st_mtime_ns]
+        entry = cache.get(path)
+        if entry is None or entry['state'] != state or entry.get('clean') != clean \
+                or entry.get('columns') != SUM_COLUMNS:
+            cells = stream_accumulate([path], clean=clean).cells.reset_index()
+            entry = {'state': state, 'clean': clean, 'columns': SUM_COLUMNS,
+                     'cells': json.loads(cells.to_json(orient='records'))}
+        files[path] = entry
+        if entry['cells']:
+            accumulator.merge_cells(pd.DataFrame(entry['cells']).set_index(CELL_KEYS)[SUM_COLUMNS])
+
+    # Rewritten from the current files only, so deleted files leave the cache
+    with open(cache_path, 'w') as f:
+        json.dump(files, f)
+    return accumulator.cells
+
+def block_curves(cells):
+    """Per-participant RT and accuracy by block from accumulator cells"""
+    curves = cells.reset_index()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curves['reaction_time'] = curves['rt_sum'] / curves['n_correct']
+        curves['accuracy'] = curves['n_correct'] / curves['n'] * 100
+    curves = curves[['participant_id', 'block', 'block_type', 'reaction_time', 'accuracy', 'n']]
+    return curves.sort_values(['participant_id', 'block']).reset_index(drop=True)
+
+def downsample(curve, max_points=MAX_POINTS):
+    """Average consecutive blocks of one curve (or band) into at most max_points bins"""
+    if len(curve) <= max_points:
+        return curve
+    bins = np.arange(len(curve)) * max_points // len(curve)
+    return curve.groupby(bins).mean(numeric_only=True)
+
+def curve_hash(curve):
+    """Content hash of a participant's pre-aggregated curve"""
+    values = curve[['block', 'block_type', 'reaction_time', 'accuracy', 'n']]
+    return hashlib.sha256(pd.util.hash_pandas_object(values, index=False).values.tobytes()).hexdigest()[:16]
+
+def _plot_curves(axes_rt, axes_accuracy, curves, band=None):
+    for block_type, style in LINE_STYLES.items():
+        data = downsample(curves[curves['block_type'] == block_type])
+        if data.empty:
+            continue
+        axes_rt.plot(data['block'], data['reaction_time'], marker='o', markersize=3,
+                     linestyle=style, label=block_type.capitalize())
+        axes_accuracy.plot(data['block'], data['accuracy'], marker='o', markersize=3, linestyle=style)
+        if band is not None:
+            # Binned like the line, so both share the same x positions
+            limits = downsample(band[band['block_type'] == block_type])
+            axes_rt.fill_between(limits['block'], limits['rt_low'], limits['rt_high'], alpha=0.2)
+            axes_accuracy.fill_between(limits['block'], limits['accuracy_low'], limits['accuracy_high'], alpha=0.2)
+
+    for axes in (axes_rt, axes_accuracy):
+        axes.grid(True, linestyle='--', alpha=0.7)
+        axes.tick_params(labelsize=7)
+    axes_rt.set_ylabel('TR (ms)', fontsize=8)
+    axes_accuracy.set_ylabel('Precisão (%)', fontsize=8)
+    axes_accuracy.set_xlabel('Bloco', fontsize=8)
+
+def render_panel(curves, title, path, band=None):
+    """Render one small RT/accuracy panel to a PNG file"""
+    figure = Figure(figsize=PANEL_SIZE, dpi=PANEL_DPI)
+    FigureCanvasAgg(figure)
+    axes_rt, axes_accuracy = figure.subplots(2, 1, sharex=True)
+    _plot_curves(axes_rt, axes_accuracy, curves, band)
+    axes_rt.set_title(title, fontsize=9)
+    axes_rt.legend(fontsize=6)
+    figure.subplots_adjust(left=0.22, right=0.96, top=0.9, bottom=0.14, hspace=0.12)
+    figure.savefig(path, dpi=PANEL_DPI)
+
+def group_mean(curves):
+    """Mean of the participants' curves by block and type, with a 95% CI band"""
+    grouped = curves.groupby(['block', 'block_type'])
+    summary = grouped[['reaction_time', 'accuracy']].mean()
+    spread = grouped[['reaction_time', 'accuracy']].std().fillna(0)
+    count = grouped['reaction_time'].count().clip(lower=1)
+
+    half_rt = CI_Z * spread['reaction_time'] / np.sqrt(count)
+    half_accuracy = CI_Z * spread['accuracy'] / np.sqrt(count)
+    summary['rt_low'] = summary['reaction_time'] - half_rt
+    summary['rt_high'] = summary['reaction_time'] + half_rt
+    summary['accuracy_low'] = summary['accuracy'] - half_accuracy
+    summary['accuracy_high'] = summary['accuracy'] + half_accuracy
+    summary['n'] = count
+    return summary.reset_index()
+
+def update_panels(curves, panel_dir=PANEL_DIR):
+    """Render the panels whose data changed; return the panel path of every participant
+
+    Panels and index entries that no longer belong to a current participant are removed.
+    """
+    if not os.path.exists(panel_dir):
+        os.makedirs(panel_dir)
+
+    index_path = os.path.join(panel_dir, 'index.json')
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+
+    paths = {}
+    rendered = 0
+    for participant_id, curve in curves.groupby('participant_id', sort=True):
+        digest = curve_hash(curve)
+        path = os.path.join(panel_dir, f"panel_{digest}.png")
+        if index.get(participant_id) != digest or not os.path.exists(path):
+            render_panel(curve, f"Participante {participant_id}", path)
+            index[participant_id] = digest
+            rendered += 1
+        paths[participant_id] = path
+
+    # Forget participants that are gone and remove panels that were replaced
+    index = {participant_id: index[participant_id] for participant_id in paths}
+    current = {os.path.basename(path) for path in paths.values()}
+    for name in os.listdir(panel_dir):
+        if name.startswith('panel_') and name.endswith('.png') and name not in current:
+            os.remove(os.path.join(panel_dir, name))
+
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    return paths, rendered
+
+def compose_grid(panel_paths, output_path, columns=None):
+    """Tile equally sized panel images into one composite PNG"""
+    # Imported here so that building panels does not pull in pyplot
+    import matplotlib.pyplot as plt
+
+    images = [plt.imread(path) for path in panel_paths]
+    columns = columns or math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    height, width, channels = images[0].shape
+
+    grid = np.ones((rows * height, columns * width, channels), dtype=images[0].dtype)
+    for i, image in enumerate(images):
+        row, column = divmod(i, columns)
+        grid[row * height:(row + 1) * height, column * width:(column + 1) * width] = image
+    plt.imsave(output_path, grid)
+
+def group_figures(paths, output_dir='analysis', panel_dir=PANEL_DIR, clean=True):
+    """Build the per-participant grid and the group mean figure; returns their paths"""
+    curves = block_curves(cached_cells(paths, panel_dir, clean))
+    if curves.empty:
+        return None
+
+    panel_paths, rendered = update_panels(curves, panel_dir)
+
+    # The composite and the group figure only change when some panel did
+    grid_path = os.path.join(output_dir, 'srtt_group_grid.png')
+    mean_path = os.path.join(output_dir, 'srtt_group_mean.png')
+    composite_key = hashlib.sha256(' '.join(sorted(panel_paths.values())).encode('utf-8')).hexdigest()
+    key_path = os.path.join(panel_dir, 'composite.key')
+
+    previous_key = None
+    if os.path.exists(key_path):
+        with open(key_path, 'r') as f:
+            previous_key = f.read().strip()
+
+    if previous_key != composite_key or not (os.path.exists(grid_path) and os.path.exists(mean_path)):
+        compose_grid([panel_paths[participant] for participant in sorted(panel_paths)], grid_path)
+        band = group_mean(curves)
+        render_panel(band, f"Média do grupo (n={curves['participant_id'].nunique()})", mean_path, band=band)
+        with open(key_path, 'w') as f:
+            f.write(composite_key)
+
+    return {'grid': grid_path, 'mean': mean_path, 'panels': len(panel_paths), 'rendered': rendered}
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files
+
+    parser = argparse.ArgumentParser(description="Group-level SRTT figure grid")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--output-dir', default='analysis')
+    parser.add_argument('--no-clean', dest='clean', action='store_false',
+                        help="Skip the row-level cleaning rules (applied by default, as in srtt_analysis)")
+    args = parser.parse_args()
+
+    file_paths = find_result_files(args.results_dir)
+    if not file_paths:
+        print(f"No result files found in: {args.results_dir}")
+        return
+
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    figures = group_figures(file_paths, args.output_dir, clean=args.clean)
+    print(f"{figures['rendered']} of {figures['panels']} panels re-rendered")
+    print(f"Group figures saved to: {figures['grid']} and {figures['mean']}")
+
+if __name__ == "__main__":
+    main()
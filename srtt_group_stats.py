@@ -0,0 +1,227 @@
+import os
+import math
+import argparse
+
+import numpy as np
+import pandas as pd
+
+BLOCK_TYPES = ['structured', 'random']  # Column order of the type factor
+BLOCKS_PER_EPOCH = 2  # run() alternates types, so each pair of blocks holds one block of each type
+MAX_ITERATIONS = 300  # Continued-fraction terms for the incomplete beta function
+EPSILON = 1e-14  # Convergence tolerance of the continued fraction
+TINY = 1e-300  # Guards divisions in Lentz's method
+RESULT_COLUMNS = ['test', 'effect', 'n', 'df1', 'df2', 'statistic', 'p_value', 'gg_epsilon', 'p_gg',
+                  'effect_size', 'mean_difference', 'p_holm']
+
+_lgamma = np.vectorize(math.lgamma, otypes=[np.float64])
+
+def _beta_continued_fraction(a, b, x):
+    """Continued fraction of the incomplete beta function (modified Lentz), element-wise"""
+    qab, qap, qam = a + b, a + 1, a - 1
+    c = np.ones_like(x)
+    d = 1 - qab * x / qap
+    d = 1 / np.where(np.abs(d) < TINY, TINY, d)
+    h = d.copy()
+    for m in range(1, MAX_ITERATIONS + 1):
+        m2 = 2 * m
+        for aa in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+                   -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+            d = 1 + aa * d
+            d = 1 / np.where(np.abs(d) < TINY, TINY, d)
+            c = 1 + aa / c
+            c = np.where(np.abs(c) < TINY, TINY, c)
+            delta = d * c
+            h = h * delta
+        if np.all(np.abs(delta - 1) < EPSILON):
+            break
+    return h
+
+def betainc(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), vectorized over all arguments"""
+    a, b, x = np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (a, b, x)))
+    x = np.clip(x, 0.0, 1.0)
+    result = np.where(x >= 1.0, 1.0, 0.0)
+    inside = (x > 0) & (x < 1)
+    if not inside.any():
+        return result
+
+    a, b, x = a[inside], b[inside], x[inside]
+    log_front = _lgamma(a + b) - _lgamma(a) - _lgamma(b) + a * np.log(x) + b * np.log1p(-x)
+    # The continued fraction converges fast for x < (a + 1) / (a + b + 2); use symmetry otherwise
+    swap = x >= (a + 1) / (a + b + 2)
+    lower_a, lower_b, lower_x = np.where(swap, b, a), np.where(swap, a, b), np.where(swap, 1 - x, x)
+    fraction = np.exp(log_front) * _beta_continued_fraction(lower_a, lower_b, lower_x) / lower_a
+    result[inside] = np.where(swap, 1 - fraction, fraction)
+    return result
+
+def f_sf(f, df1, df2):
+    """Upper-tail probability of the F distribution"""
+    f = np.maximum(np.asarray(f, dtype=np.float64), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(np.isnan(f), np.nan, betainc(df2 / 2, df1 / 2, df2 / (df2 + df1 * f)))
+
+def t_sf_two_sided(t, df):
+    """Two-sided p-value of Student's t"""
+    t = np.asarray(t, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(np.isnan(t), np.nan, betainc(df / 2, 0.5, df / (df + t * t)))
+
+def holm(p_values):
+    """Holm step-down adjustment of a family of p-values"""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    order = np.argsort(p_values)
+    adjusted = np.minimum(np.maximum.accumulate(p_values[order] * (len(p_values) - np.arange(len(p_values)))), 1)
+    result = np.empty_like(adjusted)
+    result[order] = adjusted
+    return result
+
+def cell_means_from_results(results_list):
+    """Long table of per-participant block means from a list of analyze_data results"""
+    frames = [results['rt_by_block'].assign(participant_id=results['participant_id'])
+              for results in results_list]
+    return pd.concat(frames, ignore_index=True)[['participant_id', 'block', 'block_type', 'reaction_time']]
+
+def cell_means_from_accumulator(accumulator):
+    """Long table of per-participant block means from streaming cell sums (as analyze_data computes them)"""
+    cells = accumulator.cells.reset_index()
+    cells = cells[cells['n_correct'] > 0]
+    return cells.assign(reaction_time=cells['rt_sum'] / cells['n_correct'])[
+        ['participant_id', 'block', 'block_type', 'reaction_time']]
+
+def cell_matrix(cell_means, blocks_per_epoch=BLOCKS_PER_EPOCH):
+    """Participant x epoch x type array of mean RTs, keeping participants with every cell
+
+    Block type is fixed by block number in this design (odd blocks are
+    structured), so block and type cannot be crossed directly; consecutive
+    blocks are paired into epochs and the design is epoch x type.
+    Returns (array, participant ids, epoch numbers, participants dropped).
+    """
+    cells = cell_means.assign(epoch=(cell_means['block'].astype(np.int64) - 1) // blocks_per_epoch + 1)
+    wide = cells.pivot_table(index='participant_id', columns=['epoch', 'block_type'],
+                             values='reaction_time', aggfunc='mean')
+    epochs = sorted(wide.columns.get_level_values('epoch').unique())
+    wide = wide.reindex(columns=pd.MultiIndex.from_product([epochs, BLOCK_TYPES]))
+    complete = wide.notna().all(axis=1)
+    values = wide[complete].to_numpy(np.float64).reshape(int(complete.sum()), len(epochs), len(BLOCK_TYPES))
+    return values, list(wide.index[complete]), epochs, int((~complete).sum())
+
+def _gg_epsilon(scores):
+    """Greenhouse-Geisser epsilon for a within factor, from participant x level scores"""
+    k = scores.shape[1]
+    if k < 3:
+        return 1.0
+    # Orthonormal contrasts: the last k - 1 columns of a QR basis whose first column is constant
+    basis, _ = np.linalg.qr(np.column_stack([np.ones(k), np.eye(k)[:, :k - 1]]))
+    contrasts = basis[:, 1:]
+    m = contrasts.T @ np.cov(scores, rowvar=False) @ contrasts
+    return float(np.trace(m) ** 2 / ((k - 1) * np.trace(m @ m)))
+
+def rm_anova(y):
+    """Two-way repeated-measures ANOVA on a participant x epoch x type array
+
+    Every sum of squares is a reduction over the whole array, so the cost is
+    a handful of vectorized passes regardless of the number of participants.
+    """
+    n, e, t = y.shape
+    grand = y.mean()
+    subject = y.mean(axis=(1, 2))
+    epoch = y.mean(axis=(0, 2))
+    block_type = y.mean(axis=(0, 1))
+    cell = y.mean(axis=0)
+    subject_epoch = y.mean(axis=2)
+    subject_type = y.mean(axis=1)
+
+    effects = [
+        ('epoch', n * t * np.sum((epoch - grand) ** 2), e - 1,
+         t * np.sum((subject_epoch - subject[:, None] - epoch[None, :] + grand) ** 2),
+         _gg_epsilon(subject_epoch)),
+        ('block_type', n * e * np.sum((block_type - grand) ** 2), t - 1,
+         e * np.sum((subject_type - subject[:, None] - block_type[None, :] + grand) ** 2),
+         1.0),
+        ('epoch:block_type', n * np.sum((cell - epoch[:, None] - block_type[None, :] + grand) ** 2), (e - 1) * (t - 1),
+         np.sum((y - subject_epoch[:, :, None] - subject_type[:, None, :] - cell[None]
+                 + epoch[None, :, None] + block_type[None, None, :] + subject[:, None, None] - grand) ** 2),
+         _gg_epsilon(y[:, :, 1] - y[:, :, 0]) if t == 2 else np.nan)
+    ]
+
+    rows = []
+    for name, ss, df1, ss_error, epsilon in effects:
+        if df1 == 0:
+            continue  # Factor with a single level (e.g. one epoch)
+        df2 = df1 * (n - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f = (ss / df1) / (ss_error / df2) if df2 > 0 else np.nan
+            partial_eta = ss / (ss + ss_error)
+        rows.append({
+            'test': 'rm_anova', 'effect': name, 'n': n, 'df1': df1, 'df2': df2, 'statistic': f,
+            'p_value': float(f_sf(f, df1, df2)) if df2 > 0 else np.nan,
+            'gg_epsilon': epsilon,
+            'p_gg': float(f_sf(f, df1 * epsilon, df2 * epsilon)) if df2 > 0 else np.nan,
+            'effect_size': partial_eta  # Partial eta squared
+        })
+    return rows
+
+def paired_tests(y, epochs):
+    """Paired t-tests of the learning effect (random - structured) in every epoch and overall
+
+    All epochs are tested at once on the participant x epoch difference
+    matrix; epoch p-values are Holm-adjusted as a family.
+    """
+    n = y.shape[0]
+    differences = y[:, :, BLOCK_TYPES.index('random')] - y[:, :, BLOCK_TYPES.index('structured')]
+    differences = np.column_stack([differences, differences.mean(axis=1)])
+    labels = [f"epoch_{epoch}" for epoch in epochs] + ['overall']
+
+    mean = differences.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sd = differences.std(axis=0, ddof=1) if n > 1 else np.full(len(labels), np.nan)
+        t = mean / (sd / np.sqrt(n))
+        dz = mean / sd
+    p = t_sf_two_sided(t, n - 1) if n > 1 else np.full(len(labels), np.nan)
+    adjusted = np.r_[holm(p[:-1]), p[-1]]
+
+    return [{'test': 'paired_t', 'effect': label, 'n': n, 'df1': n - 1, 'df2': np.nan, 'statistic': t[i],
+             'p_value': p[i], 'effect_size': dz[i], 'mean_difference': mean[i],
+             'p_holm': adjusted[i] if label != 'overall' else np.nan}
+            for i, label in enumerate(labels)]
+
+def group_statistics(cell_means, blocks_per_epoch=BLOCKS_PER_EPOCH):
+    """Repeated-measures ANOVA and paired tests for a study; returns (results table, participants dropped)"""
+    y, participants, epochs, dropped = cell_matrix(cell_means, blocks_per_epoch)
+    if len(participants) == 0:
+        return pd.DataFrame(columns=RESULT_COLUMNS), dropped
+    rows = rm_anova(y) + paired_tests(y, epochs)
+    return pd.DataFrame(rows).reindex(columns=RESULT_COLUMNS), dropped
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files
+    from srtt_streaming import stream_accumulate
+
+    parser = argparse.ArgumentParser(description="Group-level repeated-measures statistics")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--no-clean', dest='clean', action='store_false',
+                        help="Skip the row-level cleaning rules (applied by default, as in srtt_analysis)")
+    parser.add_argument('--output', default='analysis/srtt_group_stats.csv')
+    args = parser.parse_args()
+
+    file_paths = find_result_files(args.results_dir)
+    if not file_paths:
+        print(f"No result files found in: {args.results_dir}")
+        return
+
+    cell_means = cell_means_from_accumulator(stream_accumulate(file_paths, clean=args.clean))
+    table, dropped = group_statistics(cell_means)
+    if dropped:
+        print(f"{dropped} participants without every epoch x block type cell were left out")
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    table.to_csv(args.output, index=False)
+
+    print(table.to_string(index=False))
+    print(f"\nGroup statistics exported to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Learning-curve models, fitted as RT = a + b * f(x; c) with x the trial index (1, 2, ...)
+#   power:       f(x; c) = x ** -c
+#   exponential: f(x; c) = exp(-c * (x - 1))
+MODELS = ('power', 'exponential')
+GRID_SIZE = 120  # Candidate values of the nonlinear parameter c
+REFINE_ITERATIONS = 40  # Golden-section steps around the best grid value
+MAX_CELLS = 4000000  # Maximum points x grid values held in memory at once
+MIN_POINTS = 3  # Fewer correct trials than this leave the curve unfitted
+GROUP_KEYS = ['participant_id', 'block_type']  # Plus 'session' when the data has it
+
+def _basis(model, x, c):
+    """Evaluate the nonlinear basis f(x; c) element-wise"""
+    if model == 'power':
+        return x ** -c
+    return np.exp(-c * (x - 1))
+
+def _grid(model):
+    """Candidate values for the nonlinear parameter of a model"""
+    if model == 'power':
+        return np.logspace(-3, np.log10(3.0), GRID_SIZE)
+    return np.logspace(-5, 0, GRID_SIZE)
+
+def _group_keys(df):
+    """Curve keys: sessions of the same participant are separate curves"""
+    return ['participant_id'] + (['session'] if 'session' in df.columns else []) + ['block_type']
+
+def prepare_curves(df):
+    """Correct responses with their trial index within each participant (session) and block type"""
+    df = pd.DataFrame(df)
+    keys = _group_keys(df)
+    correct = df[df['correct']].sort_values(keys + ['block', 'trial'], kind='stable')
+    correct = correct.assign(trial_index=correct.groupby(keys).cumcount() + 1)
+    return correct[keys + ['trial_index', 'reaction_time']].reset_index(drop=True)
+
+def _segment_sums(values, starts):
+    """Sum consecutive segments of rows (values is points x columns)"""
+    return np.add.reduceat(values, starts, axis=0)
+
+def _linear_fit(n, sum_y, sum_yy, sum_f, sum_ff, sum_fy):
+    """Closed-form least squares for y = a + b * f, returning a, b and the residual sum of squares"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominator = n * sum_ff - sum_f ** 2
+        b = (n * sum_fy - sum_f * sum_y) / denominator
+        a = (sum_y - b * sum_f) / n
+        sse = sum_yy - a * sum_y - b * sum_fy
+    return a, b, np.maximum(sse, 0)
+
+def _fit_model(model, x, y, starts, counts, sum_y, sum_yy):
+    """Fit one model to every curve at once by grid search plus golden-section refinement"""
+    grid = _grid(model)
+    n_groups = len(starts)
+    best_sse = np.full(n_groups, np.inf)
+    best_index = np.zeros(n_groups, dtype=np.intp)
+
+    # Grid search: for each candidate c the linear parameters have a closed form,
+    # so every curve is evaluated together with segment sums over the sorted points
+    step = max(1, MAX_CELLS // max(len(x), 1))
+    for first in range(0, len(grid), step):
+        c = grid[first:first + step]
+        f = _basis(model, x[:, None], c[None, :])
+        sum_f = _segment_sums(f, starts)
+        sum_ff = _segment_sums(f * f, starts)
+        sum_fy = _segment_sums(f * y[:, None], starts)
+        _, _, sse = _linear_fit(counts[:, None], sum_y[:, None], sum_yy[:, None], sum_f, sum_ff, sum_fy)
+        sse = np.where(np.isnan(sse), np.inf, sse)
+
+        chunk_best = sse.argmin(axis=1)
+        chunk_sse = sse[np.arange(n_groups), chunk_best]
+        improved = chunk_sse < best_sse
+        best_sse[improved] = chunk_sse[improved]
+        best_index[improved] = first + chunk_best[improved]
+
+    # Golden-section search in log(c) between the neighbouring grid values
+    log_grid = np.log(grid)
+    low = log_grid[np.maximum(best_index - 1, 0)]
+    high = log_grid[np.minimum(best_index + 1, len(grid) - 1)]
+    group_of_point = np.repeat(np.arange(n_groups), counts.astype(np.intp))
+
+    def evaluate(log_c):
+        f = _basis(model, x, np.exp(log_c)[group_of_point])
+        sum_f = _segment_sums(f, starts)
+        sum_ff = _segment_sums(f * f, starts)
+        sum_fy = _segment_sums(f * y, starts)
+        a, b, sse = _linear_fit(counts, sum_y, sum_yy, sum_f, sum_ff, sum_fy)
+        return a, b, np.where(np.isnan(sse), np.inf, sse)
+
+    ratio = (np.sqrt(5) - 1) / 2
+    left = high - ratio * (high - low)
+    right = low + ratio * (high - low)
+    sse_left = evaluate(left)[2]
+    sse_right = evaluate(right)[2]
+    for _ in range(REFINE_ITERATIONS):
+        move_right = sse_left > sse_right
+        low = np.where(move_right, left, low)
+        high = np.where(move_right, high, right)
+        left = high - ratio * (high - low)
+        right = low + ratio * (high - low)
+        sse_left = evaluate(left)[2]
+        sse_right = evaluate(right)[2]
+
+    log_c = (low + high) / 2
+    a, b, sse = evaluate(log_c)
+    # The best c on the edge of the grid means the optimum lies outside it (e.g. a degenerate linear trend)
+    at_bound = (best_index == 0) | (best_index == len(grid) - 1)
+    return a, b, np.exp(log_c), sse, at_bound
+
+def fit_learning_curves(df):
+    """Fit power-law and exponential learning curves for every participant and block type
+
+    All curves are fitted together: the points are sorted by curve and every
+    quantity is obtained with segment sums, so there is no per-participant loop.
+    Fits whose c ends on the edge of the search grid are flagged at_bound and
+    their parameters are left as NaN.
+    """
+    curves = prepare_curves(df)
+    keys = _group_keys(curves)
+    columns = keys + ['model', 'a', 'b', 'c', 'sse', 'r2', 'n_trials', 'at_bound']
+
+    sizes = curves.groupby(keys, sort=False).size()
+    sizes = sizes[sizes >= MIN_POINTS]
+    if sizes.empty:
+        return pd.DataFrame(columns=columns)
+
+    curves = curves.set_index(keys).loc[sizes.index].reset_index()
+    x = curves['trial_index'].to_numpy(dtype=np.float64)
+    y = curves['reaction_time'].to_numpy(dtype=np.float64)
+    counts = sizes.to_numpy(dtype=np.float64)
+    starts = np.concatenate([[0], np.cumsum(sizes.to_numpy())[:-1]]).astype(np.intp)
+    sum_y = _segment_sums(y, starts)
+    sum_yy = _segment_sums(y * y, starts)
+    total_ss = sum_yy - sum_y ** 2 / counts
+
+    fits = []
+    for model in MODELS:
+        a, b, c, sse, at_bound = _fit_model(model, x, y, starts, counts, sum_y, sum_yy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r2 = 1 - sse / total_ss
+        fit = sizes.index.to_frame(index=False)
+        fit['model'] = model
+        fit['a'] = np.where(at_bound, np.nan, a)
+        fit['b'] = np.where(at_bound, np.nan, b)
+        fit['c'] = np.where(at_bound, np.nan, c)
+        fit['sse'] = sse
+        fit['r2'] = np.where(at_bound, np.nan, r2)
+        fit['n_trials'] = counts.astype(int)
+        fit['at_bound'] = at_bound
+        fits.append(fit)
+
+    return pd.concat(fits, ignore_index=True)[columns]
+
+def learning_curve_columns(fits):
+    """Flatten fitted parameters into one row of summary columns per participant (and session)"""
+    index = [key for key in ['participant_id', 'session'] if key in fits.columns]
+    if fits.empty:
+        return pd.DataFrame(columns=index)
+
+    # unstack keeps curves whose parameters are all NaN (fits at a grid bound)
+    wide = fits.set_index(index + ['block_type', 'model'])[['a', 'b', 'c', 'r2']].unstack(['block_type', 'model'])
+    wide.columns = [f"{block_type}_{model}_{param}" for param, block_type, model in wide.columns]
+    return wide.sort_index(axis=1).reset_index()
+
+def main():
+    # Imported here because srtt_analysis imports this module
+    from srtt_analysis import find_result_files, load_sessions
+
+    results_dir = sys.argv[1] if len(sys.argv) > 1 else 'results'
+    file_paths = find_result_files(results_dir)
+
+    if not file_paths:
+        print(f"No result files found in: {results_dir}")
+        return
+
+    print(f"Fitting learning curves for {len(file_paths)} sessions...")
+    fits = fit_learning_curves(load_sessions(file_paths))
+
+    if not os.path.exists('analysis'):
+        os.makedirs('analysis')
+
+    fits.to_csv('analysis/srtt_learning_curves.csv', index=False)
+    learning_curve_columns(fits).to_csv('analysis/srtt_learning_curves_summary.csv', index=False)
+
+    print(fits.to_string(index=False))
+    print("\nLearning curves exported to: analysis/srtt_learning_curves.csv")
+
+if __name__ == "__main__":
+    main()
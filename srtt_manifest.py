@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+from srtt_archive import session_name
+
+MANIFEST_NAME = 'manifest.jsonl'  # One JSON entry per line, only ever appended to
+FILE_NAME_PATTERN = re.compile(r'^srtt_participant_(?P<participant_id>.*)_(?P<timestamp>\d{8}_\d{6})\.csv$', re.DOTALL)
+HASH_CHUNK = 1 << 20  # Bytes read at a time when hashing a result file
+SETTING_KEYS = ['positions', 'blocks', 'trials_per_block']
+
+def manifest_path(results_dir):
+    return os.path.join(results_dir, MANIFEST_NAME)
+
+def file_hash(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def session_timestamp(path, first_timestamp=None):
+    """Session start as ISO text, from the file name or else the first trial's timestamp"""
+    match = FILE_NAME_PATTERN.match(os.path.basename(path))
+    candidates = []
+    if match is not None:
+        candidates.append((match.group('timestamp'), "%Y%m%d_%H%M%S"))
+    if first_timestamp:
+        candidates.append((first_timestamp, "%Y-%m-%d %H:%M:%S"))
+    for text, fmt in candidates:
+        try:
+            return datetime.strptime(text, fmt).isoformat()
+        except ValueError:
+            continue  # e.g. a hand-renamed file with an impossible date
+    return None
+
+def make_entry(path, participant_id, rows, settings, settings_source):
+    """Manifest entry for one result file; path is stored relative to its results directory"""
+    return {
+        'file': os.path.basename(path),
+        'session': session_name(path),
+        'participant_id': participant_id,
+        'session_timestamp': session_timestamp(path),
+        **{key: settings.get(key) for key in SETTING_KEYS},
+        'settings_source': settings_source,  # 'recorded' by the experiment or 'inferred' from the trials
+        'rows': rows,
+        'size': os.path.getsize(path),
+        'mtime_ns': os.stat(path).st_mtime_ns,
+        'sha256': file_hash(path),
+        'indexed_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+def append_entries(results_dir, entries):
+    """Append entries to the manifest, one line each, and flush them to disk"""
+    if not entries:
+        return
+    with open(manifest_path(results_dir), 'a') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def record_session(results_file, participant_id, rows, positions, blocks, trials_per_block, adaptive_stop=False):
+    """Add a freshly saved session to its results directory's manifest (called by save_results)
+
+    blocks is the number of blocks actually run; adaptive_stop marks sessions
+    ended early by the adaptive stopping rule.
+    """
+    results_dir = os.path.dirname(results_file) or '.'
+    settings = {'positions': positions, 'blocks': blocks, 'trials_per_block': trials_per_block}
+    entry = make_entry(results_file, participant_id, rows, settings, 'recorded')
+    entry['adaptive_stop'] = adaptive_stop
+    append_entries(results_dir, [entry])
+    return entry
+
+def _read_lines(results_dir):
+    """Latest session entry and latest validation line of every file in the manifest"""
+    path = manifest_path(results_dir)
+    entries, validation = {}, {}
+    if not os.path.exists(path):
+        return entries, validation
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by a crash while appending
+            if 'validation' in entry:
+                # Written by srtt_validation; a quarantined file has left the results directory
+                validation[entry['file']] = entry
+                if entry['validation'] == 'quarantined':
+                    entries.pop(entry['file'], None)
+            elif entry.get('removed'):
+                entries.pop(entry['file'], None)
+                validation.pop(entry['file'], None)
+            else:
+                entries[entry['file']] = entry
+    return entries, validation
+
+def read_manifest(results_dir):
+    """Current entries by file name; later lines replace earlier ones and 'removed' lines drop a file"""
+    return _read_lines(results_dir)[0]
+
+def read_validation(results_dir):
+    """Latest 'validated' or 'quarantined' line of every file, by file name"""
+    return _read_lines(results_dir)[1]
+
+def legacy_entry(path):
+    """Entry for a result file saved before the manifest existed; settings are inferred from the trials"""
+    df = pd.read_csv(path, dtype={'participant_id': str})
+    settings = {
+        'positions': int(df['position'].max()) if len(df) else None,  # Highest position used (a lower bound)
+        'blocks': int(df['block'].nunique()),
+        'trials_per_block': int(df['trial'].max()) if len(df) else None
+    }
+    participant_id = df['participant_id'].iloc[0] if len(df) else None
+    entry = make_entry(path, participant_id, len(df), settings, 'inferred')
+    if entry['session_timestamp'] is None and len(df):
+        entry['session_timestamp'] = session_timestamp(path, df['timestamp'].iloc[0])
+    return entry
+
+def rebuild_manifest(results_dir='results'):
+    """Index result files missing from the manifest or changed on disk, and mark deleted ones
+
+    A file whose size or modification time differs from its entry is hashed
+    again: new contents get a fresh (inferred) entry, while a file that was
+    only touched keeps its entry with the new modification time. Only new
+    lines are appended. Returns (added, removed) counts.
+    """
+    entries = read_manifest(results_dir)
+    names = sorted(name for name in os.listdir(results_dir)
+                   if name.startswith('srtt_participant_') and name.endswith('.csv'))
+    now = datetime.now().isoformat(timespec='seconds')
+
+    added, touched = [], []
+    for name in names:
+        path = os.path.join(results_dir, name)
+        stat = os.stat(path)
+        entry = entries.get(name)
+        if entry is not None and entry['size'] == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            continue
+        if entry is not None and entry['size'] == stat.st_size and file_hash(path) == entry['sha256']:
+            touched.append({**entry, 'mtime_ns': stat.st_mtime_ns, 'indexed_at': now})
+        else:
+            added.append(legacy_entry(path))
+    removed = [{'file': name, 'removed': True, 'indexed_at': now}
+               for name in sorted(set(entries) - set(names))]
+    append_entries(results_dir, added + touched + removed)
+    return len(added), len(removed)
+
+def select_sessions(results_dir='results', participant_id=None, since=None, until=None, **settings):
+    """Manifest entries matching the filters, oldest session first, without opening any data file
+
+    since/until compare against the ISO session timestamp (e.g. '2025-05-14'),
+    and settings filter on positions, blocks or trials_per_block.
+    """
+    selected = []
+    for entry in read_manifest(results_dir).values():
+        if participant_id is not None and entry['participant_id'] != participant_id:
+            continue
+        timestamp = entry.get('session_timestamp') or ''
+        if since is not None and timestamp < since:
+            continue
+        if until is not None and timestamp[:len(until)] > until:
+            continue
+        if any(value is not None and entry.get(key) != value for key, value in settings.items()):
+            continue
+        selected.append(entry)
+    return sorted(selected, key=lambda entry: (entry.get('session_timestamp') or '', entry['file']))
+
+def verify_manifest(results_dir='results'):
+    """Files whose contents no longer match their manifest hash (or that are missing)"""
+    problems = []
+    for name, entry in sorted(read_manifest(results_dir).items()):
+        path = os.path.join(results_dir, name)
+        if not os.path.exists(path):
+            problems.append((name, "missing"))
+        elif file_hash(path) != entry['sha256']:
+            problems.append((name, "contents changed"))
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Session manifest of a results directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild_parser = subparsers.add_parser('rebuild', help="Index legacy and changed result files")
+    rebuild_parser.add_argument('results_dir', nargs='?', default='results')
+
+    list_parser = subparsers.add_parser('list', help="List sessions matching the filters")
+    list_parser.add_argument('results_dir', nargs='?', default='results')
+    list_parser.add_argument('--participant')
+    list_parser.add_argument('--since', help="Earliest session date, e.g. 2025-05-01")
+    list_parser.add_argument('--until', help="Latest session date, e.g. 2025-05-31")
+    list_parser.add_argument('--positions', type=int)
+    list_parser.add_argument('--blocks', type=int)
+    list_parser.add_argument('--trials-per-block', type=int)
+    list_parser.add_argument('--paths', action='store_true', help="Print only the file paths")
+
+    verify_parser = subparsers.add_parser('verify', help="Check every indexed file against its hash")
+    verify_parser.add_argument('results_dir', nargs='?', default='results')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.results_dir):
+        print(f"Results directory not found: {args.results_dir}")
+        return
+
+    if args.command == 'rebuild':
+        added, removed = rebuild_manifest(args.results_dir)
+        print(f"{added} files indexed, {removed} deleted files dropped: {manifest_path(args.results_dir)}")
+
+    elif args.command == 'list':
+        entries = select_sessions(args.results_dir, args.participant, args.since, args.until,
+                                  positions=args.positions, blocks=args.blocks,
+                                  trials_per_block=args.trials_per_block)
+        if args.paths:
+            for entry in entries:
+                print(os.path.join(args.results_dir, entry['file']))
+            return
+        validation = read_validation(args.results_dir)
+        table = pd.DataFrame(entries, columns=['participant_id', 'session_timestamp'] + SETTING_KEYS +
+                             ['settings_source', 'rows', 'file'])
+        table['validation'] = [validation.get(entry['file'], {}).get('validation', '') for entry in entries]
+        print(table.to_string(index=False))
+        print(f"\n{len(entries)} sessions")
+
+    elif args.command == 'verify':
+        problems = verify_manifest(args.results_dir)
+        for name, problem in problems:
+            print(f"{name!r}: {problem}")
+        print(f"{len(problems)} problems found")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import sys
+import json
+import time
+import socket
+import argparse
+
+MONITOR_HOST = '127.0.0.1'
+MONITOR_PORT = 50555  # Default local UDP port for the live trial stream
+MAX_DATAGRAM = 65507
+REFRESH_INTERVAL = 0.5  # Seconds between monitor screen updates
+
+class TrialPublisher:
+    """Publish trial records to the local monitor without ever blocking
+
+    Records are sent as single UDP datagrams on localhost. The socket is
+    non-blocking, so if the send buffer is full (or nobody is listening)
+    the record is dropped and counted instead of stalling the trial loop.
+    """
+
+    def __init__(self, port=MONITOR_PORT, host=MONITOR_HOST):
+        self.address = (host, port)
+        self.sent = 0
+        self.dropped = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def publish(self, record):
+        """Send one record, dropping it if it cannot be sent immediately"""
+        try:
+            self.sock.sendto(json.dumps(record, default=str).encode('utf-8'), self.address)
+            self.sent += 1
+        except OSError:
+            # Includes BlockingIOError (buffer full) and ICMP errors when no monitor is running
+            self.dropped += 1
+
+    def close(self):
+        """Close the socket and report the sent and dropped counts, so missed records are noticed"""
+        self.sock.close()
+        message = f"Monitor stream: {self.sent} records sent, {self.dropped} dropped"
+        if self.dropped:
+            message += " (the live monitor missed these records; the results file is complete)"
+        print(message)
+
+class BlockStats:
+    """Running RT and accuracy for one block, updated in O(1) per record"""
+
+    def __init__(self, block, block_type):
+        self.block = block
+        self.block_type = block_type
+        self.responses = 0
+        self.correct = 0
+        self.rt_sum = 0.0
+        self.last_trial = 0
+
+    def update(self, record):
+        self.responses += 1
+        self.last_trial = max(self.last_trial, int(record.get('trial', 0)))
+        if record.get('correct'):
+            self.correct += 1
+            self.rt_sum += float(record['reaction_time'])
+
+    @property
+    def mean_rt(self):
+        return self.rt_sum / self.correct if self.correct else 0.0
+
+    @property
+    def accuracy(self):
+        return self.correct / self.responses * 100 if self.responses else 0.0
+
+class MonitorState:
+    """Per-participant, per-block statistics built from the trial stream"""
+
+    def __init__(self):
+        self.blocks = {}
+        self.participant_id = None
+        self.received = 0
+        self.last_record_time = None
+
+    def update(self, record):
+        self.received += 1
+        self.last_record_time = time.time()
+        self.participant_id = record.get('participant_id', self.participant_id)
+
+        key = (self.participant_id, int(record['block']))
+        if key not in self.blocks:
+            self.blocks[key] = BlockStats(int(record['block']), record.get('block_type', ''))
+        self.blocks[key].update(record)
+
+    def render(self):
+        """Text table of the current participant's blocks"""
+        lines = [
+            "SRTT Live Monitor",
+            "=================",
+            f"Participant: {self.participant_id or '-'}    Records received: {self.received}",
+            ""
+        ]
+
+        if self.last_record_time is not None:
+            lines.append(f"Last record: {time.time() - self.last_record_time:.1f} s ago")
+            lines.append("")
+
+        lines.append(f"{'Block':>5}  {'Type':<10}  {'Trial':>5}  {'Resp.':>5}  {'Mean RT (ms)':>12}  {'Accuracy':>8}")
+        for (participant_id, _), stats in sorted(self.blocks.items(), key=lambda item: item[0][1]):
+            if participant_id != self.participant_id:
+                continue
+            lines.append(f"{stats.block:>5}  {stats.block_type:<10}  {stats.last_trial:>5}  "
+                         f"{stats.responses:>5}  {stats.mean_rt:>12.1f}  {stats.accuracy:>7.1f}%")
+
+        return "\n".join(lines)
+
+def run_monitor(port=MONITOR_PORT, host=MONITOR_HOST):
+    """Receive trial records and redraw the statistics table until interrupted"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    sock.settimeout(REFRESH_INTERVAL)
+
+    state = MonitorState()
+    interactive = sys.stdout.isatty()
+    next_refresh = 0
+    rendered = None
+
+    print(f"Listening for trial records on {host}:{port} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            try:
+                payload, _ = sock.recvfrom(MAX_DATAGRAM)
+                state.update(json.loads(payload.decode('utf-8')))
+            except socket.timeout:
+                pass
+            except (ValueError, KeyError):
+                # Ignore malformed datagrams
+                continue
+
+            # Redraw periodically on a terminal; when logging to a file, only on new data
+            if time.time() >= next_refresh and (interactive or state.received != rendered):
+                if interactive:
+                    # Clear the terminal and redraw in place
+                    sys.stdout.write("\033[2J\033[H")
+                print(state.render(), flush=True)
+                rendered = state.received
+                next_refresh = time.time() + REFRESH_INTERVAL
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Live monitor for a running SRTT session")
+    parser.add_argument('--port', type=int, default=MONITOR_PORT)
+    args = parser.parse_args()
+
+    run_monitor(args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from srtt_sequences import generate_structured_sequence
+
+MAX_POSITIONS = 10  # Positions are encoded in base 10 (one digit per element)
+CLASS_ORDER = ['predictable', 'unpredictable', 'trill', 'unclassifiable']  # Row order of the summary
+FREQUENCY_ORDER = ['high', 'low']
+
+def _session_column(df):
+    return 'session' if 'session' in df.columns else 'participant_id'
+
+def first_responses(df):
+    """One row per trial: the first recorded response (or timeout)"""
+    df = pd.DataFrame(df)
+    session = _session_column(df)
+    ordered = df.sort_values([session, 'block', 'trial'], kind='stable')
+    return ordered.drop_duplicates([session, 'block', 'trial'], keep='first').reset_index(drop=True)
+
+def encode_ngrams(positions, run_starts, n=3):
+    """Integer code of the n-gram ending at each trial (-1 where there is no full n-gram)
+
+    positions holds 0-based positions in trial order; run_starts marks the first
+    trial of each block, so n-grams never span a block boundary.
+    """
+    codes = np.zeros(len(positions), dtype=np.int64)
+    valid = np.ones(len(positions), dtype=bool)
+    run_id = np.cumsum(run_starts)
+
+    for lag in range(n - 1, -1, -1):
+        shifted = np.roll(positions, lag)
+        same_run = np.roll(run_id, lag) == run_id
+        if lag > 0:
+            shifted[:lag] = 0
+            same_run[:lag] = False
+            valid &= same_run
+        codes = codes * MAX_POSITIONS + shifted
+
+    return np.where(valid, codes, -1)
+
+def _cyclic_codes(sequence, n=3):
+    """Codes of the n-grams of a repeating sequence"""
+    length = len(sequence)
+    codes = set()
+    for i in range(length):
+        code = 0
+        for k in range(n):
+            code = code * MAX_POSITIONS + sequence[(i + k) % length]
+        codes.add(code)
+    return codes
+
+def predictable_codes(index, session):
+    """Set of predictable triplet codes for each session (None when it cannot be known)
+
+    Up to 4 positions the structured sequence is fixed, so predictable triplets
+    are those of generate_structured_sequence. With more positions a new
+    random sequence is drawn for every structured block and is not saved, so
+    there is no sequence common to the session to contrast against.
+    """
+    codes = {}
+    for key, n_positions in index.groupby(session)['n_positions'].max().items():
+        if n_positions <= 4:
+            codes[key] = _cyclic_codes(generate_structured_sequence(max(int(n_positions), 2)))
+        else:
+            codes[key] = None
+    return codes
+
+def build_triplet_index(df):
+    """Per-trial triplet codes and classes for every session in one vectorized pass"""
+    trials = first_responses(df)
+    session = _session_column(trials)
+
+    positions = trials['position'].to_numpy(dtype=np.int64) - 1
+    keys = trials[[session, 'block']].to_numpy()
+    run_starts = np.ones(len(trials), dtype=bool)
+    if len(trials) > 1:
+        run_starts[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+
+    trials['triplet'] = encode_ngrams(positions, run_starts, n=3)
+    # The number of positions is not stored in the results; use the largest one seen
+    trials['n_positions'] = trials.groupby(session)['position'].transform('max')
+
+    # Mark triplets that belong to their session's structured sequence
+    codes = predictable_codes(trials, session)
+    pairs = pd.DataFrame([(key, code) for key, key_codes in codes.items() if key_codes is not None
+                          for code in key_codes], columns=[session, 'triplet'])
+    pairs['predictable'] = True
+    trials = trials.merge(pairs, on=[session, 'triplet'], how='left')
+    predictable = trials['predictable'].eq(True).to_numpy()
+
+    first = trials['triplet'].to_numpy() // (MAX_POSITIONS ** 2)
+    last = trials['triplet'].to_numpy() % MAX_POSITIONS
+    trill = first == last
+
+    # Trills need no sequence; other triplets of sessions without a known sequence stay unclassifiable
+    unknown = trials[session].map({key: key_codes is None for key, key_codes in codes.items()}).to_numpy(dtype=bool)
+
+    trials['triplet_class'] = np.where(trials['triplet'] < 0, None,
+                                       np.where(predictable, 'predictable',
+                                                np.where(trill, 'trill',
+                                                         np.where(unknown, 'unclassifiable', 'unpredictable'))))
+    trials['triplet_frequency'] = trials.groupby([session, 'triplet'])['triplet'].transform('size')
+
+    # High-frequency triplets occur more often than the median triplet of their session
+    valid = trials['triplet'] >= 0
+    distinct = trials[valid].drop_duplicates([session, 'triplet'])
+    median = trials[session].map(distinct.groupby(session)['triplet_frequency'].median())
+    trials['frequency_class'] = np.where(~valid, None,
+                                         np.where(trials['triplet_frequency'] > median, 'high', 'low'))
+    return trials.drop(columns='predictable')
+
+def triplet_summary(index):
+    """RT (correct responses) and accuracy by participant, block type, triplet class and frequency"""
+    index = index[index['triplet_class'].notna()]
+    index = index.assign(triplet_class=pd.Categorical(index['triplet_class'], CLASS_ORDER),
+                         frequency_class=pd.Categorical(index['frequency_class'], FREQUENCY_ORDER))
+    keys = ['participant_id', 'block_type', 'triplet_class', 'frequency_class']
+
+    summary = index.groupby(keys, observed=True).agg(
+        n_trials=('correct', 'size'),
+        accuracy=('correct', 'mean')
+    )
+    summary['accuracy'] *= 100
+    summary['reaction_time'] = index[index['correct']].groupby(keys, observed=True)['reaction_time'].mean()
+    return summary.reset_index()
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files, load_sessions
+
+    results_dir = sys.argv[1] if len(sys.argv) > 1 else 'results'
+    file_paths = find_result_files(results_dir)
+
+    if not file_paths:
+        print(f"No result files found in: {results_dir}")
+        return
+
+    index = build_triplet_index(load_sessions(file_paths))
+    summary = triplet_summary(index)
+
+    if not os.path.exists('analysis'):
+        os.makedirs('analysis')
+
+    summary.to_csv('analysis/srtt_triplets.csv', index=False)
+    print(summary.to_string(index=False))
+    print("\nTriplet analysis exported to: analysis/srtt_triplets.csv")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+from itertools import combinations
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+# Permutation test settings
+EXACT_LIMIT = 100000  # Enumerate every arrangement when there are at most this many
+DEFAULT_PERMUTATIONS = 10000  # Monte Carlo draws when exact enumeration is too large
+BATCH_SIZE = 10000  # Arrangements evaluated per vectorized batch
+CACHE_DIR = 'analysis/cache'
+
+def session_hash(df):
+    """Content hash of the columns the permutation test depends on"""
+    digest = hashlib.sha256()
+    if 'participant_id' in df.columns:
+        for participant in sorted(df['participant_id'].astype(str).unique()):
+            digest.update(participant.encode('utf-8'))
+    digest.update(np.ascontiguousarray(df['block'].to_numpy(dtype=np.int64)).tobytes())
+    digest.update('|'.join(df['block_type'].astype(str)).encode('utf-8'))
+    digest.update(np.ascontiguousarray(df['reaction_time'].to_numpy(dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(df['correct'].to_numpy(dtype=bool)).tobytes())
+    return digest.hexdigest()
+
+def block_summaries(df):
+    """Sum and count of correct reaction times for each block, with its block type"""
+    correct = df[df['correct']]
+    sums = correct.groupby('block')['reaction_time'].agg(['sum', 'count'])
+    types = df.groupby('block')['block_type'].first()
+
+    summary = types.to_frame().join(sums)
+    summary[['sum', 'count']] = summary[['sum', 'count']].fillna(0)
+    return summary.reset_index()
+
+def _label_batches(n_blocks, n_structured, n_permutations, rng):
+    """Yield boolean matrices (arrangements x blocks) marking structured blocks"""
+    total = comb(n_blocks, n_structured)
+
+    if total <= EXACT_LIMIT:
+        # Exact enumeration of every way to assign the structured labels
+        combos = combinations(range(n_blocks), n_structured)
+        while True:
+            chunk = np.array(list(_take(combos, BATCH_SIZE)), dtype=np.intp).reshape(-1, n_structured)
+            if len(chunk) == 0:
+                return
+            labels = np.zeros((len(chunk), n_blocks), dtype=bool)
+            labels[np.arange(len(chunk))[:, None], chunk] = True
+            yield labels
+    else:
+        # Monte Carlo: random relabelling keeping the number of structured blocks fixed
+        remaining = n_permutations
+        while remaining > 0:
+            size = min(BATCH_SIZE, remaining)
+            order = rng.random((size, n_blocks)).argsort(axis=1)
+            labels = np.zeros((size, n_blocks), dtype=bool)
+            labels[np.arange(size)[:, None], order[:, :n_structured]] = True
+            yield labels
+            remaining -= size
+
+def _take(iterator, n):
+    """Take up to n items from an iterator"""
+    for _, item in zip(range(n), iterator):
+        yield item
+
+def _effects(labels, sums, counts):
+    """Random minus structured mean RT for each arrangement of labels"""
+    structured_sum = labels @ sums
+    structured_count = labels @ counts
+    random_sum = sums.sum() - structured_sum
+    random_count = counts.sum() - structured_count
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return random_sum / random_count - structured_sum / structured_count
+
+def permutation_test(df, n_permutations=DEFAULT_PERMUTATIONS, alternative='two-sided', seed=None, use_cache=True):
+    """Block-level permutation test of the structured vs random RT difference
+
+    Block-type labels are shuffled between whole blocks (never between trials),
+    keeping the number of structured blocks fixed, and the statistic is the same
+    learning effect that analyze_data reports (random RT - structured RT).
+    """
+    if alternative not in ('two-sided', 'greater', 'less'):
+        raise ValueError(f"Unknown alternative: {alternative}")
+
+    df = pd.DataFrame(df)
+    key = f"{alternative}:{n_permutations}:{seed}"
+    digest = session_hash(df)
+    cache_file = os.path.join(CACHE_DIR, f"permutation_{digest}.json")
+
+    cache = {}
+    if use_cache and os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+        if key in cache:
+            return cache[key]
+
+    summary = block_summaries(df)
+    is_structured = (summary['block_type'] == 'structured').to_numpy()
+    sums = summary['sum'].to_numpy(dtype=np.float64)
+    counts = summary['count'].to_numpy(dtype=np.float64)
+    n_blocks = len(summary)
+    n_structured = int(is_structured.sum())
+
+    observed = float(_effects(is_structured[None, :], sums, counts)[0])
+    result = {
+        'session_hash': digest,
+        'observed_effect': observed,
+        'p_value': float('nan'),
+        'n_blocks': n_blocks,
+        'n_permutations': 0,
+        'exact': False,
+        'alternative': alternative
+    }
+
+    # A test needs at least one block of each type
+    if n_structured == 0 or n_structured == n_blocks or np.isnan(observed):
+        return result
+
+    rng = np.random.default_rng(seed)
+    exact = comb(n_blocks, n_structured) <= EXACT_LIMIT
+    tolerance = 1e-9 * max(1.0, abs(observed))
+    extreme = 0
+    evaluated = 0
+
+    for labels in _label_batches(n_blocks, n_structured, n_permutations, rng):
+        effects = _effects(labels, sums, counts)
+        if alternative == 'two-sided':
+            hits = np.abs(effects) >= abs(observed) - tolerance
+        elif alternative == 'greater':
+            hits = effects >= observed - tolerance
+        else:
+            hits = effects <= observed + tolerance
+        extreme += int(np.count_nonzero(hits & ~np.isnan(effects)))
+        evaluated += len(labels)
+
+    if exact:
+        # The observed arrangement is one of the enumerated ones
+        p_value = extreme / evaluated
+    else:
+        p_value = (extreme + 1) / (evaluated + 1)
+
+    result.update({
+        'p_value': p_value,
+        'n_permutations': evaluated,
+        'exact': exact
+    })
+
+    if use_cache:
+        if not os.path.exists(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        cache[key] = result
+        with open(cache_file, 'w') as f:
+            json.dump(cache, f, indent=2)
+
+    return result
@@ -0,0 +1,228 @@
+import os
+import random
+import argparse
+import itertools
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from srtt_sequences import SEQUENCE_LENGTH, generate_block_sequence
+
+# Simulation defaults (milliseconds unless noted)
+BASE_RT = 450  # Mean first-block RT
+BETWEEN_SD = 60  # Between-participant SD of the baseline RT
+NOISE_SD = 100  # Trial-to-trial RT noise
+EFFECT_MS = 30  # Full learning effect on predictable structured trials
+EFFECT_SD = 15  # Between-participant SD of the learning effect
+LEARNING_RATE = 1.5  # Structured blocks needed to reach ~63% of the full effect
+PRACTICE = 0.05  # General speed-up exponent: RT scales with block ** -PRACTICE
+ERROR_RATE = 0.05  # Probability of an error on the first attempt
+MIN_RT = 150  # Simulated RTs are floored here
+FEEDBACK_ERROR_DURATION = 200  # Matches srtt_experiment: retry RT runs on from the first attempt
+ALPHA = 0.05  # One-sided significance level
+SEQUENCE_SETS = 32  # Distinct sequence sets generated per design and shared across participants
+MAX_CELLS = 4_000_000  # Trials simulated per vectorized batch
+
+def block_is_structured(blocks):
+    """Block types as run() assigns them: blocks 1, 3, 5... are structured"""
+    return np.arange(blocks) % 2 == 0
+
+def sequence_sets(positions, blocks, trials_per_block, n_sets=SEQUENCE_SETS, seed=0):
+    """Position sequences from the experiment's own generator, shape (sets, blocks, trials)"""
+    random.seed(seed)
+    structured = block_is_structured(blocks)
+    return np.array([[generate_block_sequence(positions, trials_per_block, bool(structured[b]))
+                      for b in range(blocks)] for _ in range(n_sets)], dtype=np.int16)
+
+def predictable_mask(sequences, blocks):
+    """Structured-block trials that repeat the sequence position from one cycle earlier
+
+    These are the trials a participant can anticipate once the sequence is
+    learned; the first cycle of each block and trials changed to avoid
+    immediate repetitions are not predictable.
+    """
+    mask = np.zeros(sequences.shape, dtype=bool)
+    if sequences.shape[2] > SEQUENCE_LENGTH:
+        mask[:, :, SEQUENCE_LENGTH:] = sequences[:, :, SEQUENCE_LENGTH:] == sequences[:, :, :-SEQUENCE_LENGTH]
+    mask[:, ~block_is_structured(blocks), :] = False
+    return mask
+
+def t_critical(alpha, df):
+    """One-sided Student t critical value (Cornish-Fisher expansion around the normal)"""
+    z = NormalDist().inv_cdf(1 - alpha)
+    df = np.asarray(df, dtype=np.float64)
+    return (z + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+def draw_trials(design, n_participants, rng, masks):
+    """Simulated RTs for a batch of participants, arrays of shape (participants, blocks, trials)
+
+    Returns the first-attempt RT, whether it was an error and the RT of the
+    correct retry, which runs on from stimulus onset as in the experiment.
+    """
+    blocks, trials = design['blocks'], design['trials_per_block']
+    shape = (n_participants, blocks, trials)
+
+    predictable = masks[rng.integers(0, len(masks), n_participants)]
+    exposure = np.cumsum(block_is_structured(blocks))  # Structured blocks seen so far, including this one
+    learned = 1 - np.exp(-exposure / design['learning_rate'])
+    practice = np.arange(1, blocks + 1) ** -design['practice']
+
+    base = design['base_rt'] + rng.normal(0, design['between_sd'], (n_participants, 1, 1))
+    effect = design['effect_ms'] + rng.normal(0, design['effect_sd'], (n_participants, 1, 1))
+    mean_rt = base * practice[None, :, None] - effect * learned[None, :, None] * predictable
+
+    first = np.maximum(mean_rt + rng.normal(0, design['noise_sd'], shape), MIN_RT)
+    error = rng.random(shape) < design['error_rate']
+    retry = first + FEEDBACK_ERROR_DURATION + np.maximum(mean_rt + rng.normal(0, design['noise_sd'], shape), MIN_RT)
+    return first, error, retry
+
+def participant_statistics(first, error, retry):
+    """Per-participant statistics computed as analyze_data does
+
+    Every trial ends in one correct row (the first attempt, or the retry after
+    an error), and mean RTs by block type are taken over the correct rows.
+    """
+    n_participants, blocks, _ = first.shape
+    structured = block_is_structured(blocks)
+    correct_rt = np.where(error, retry, first)
+
+    type_stats = {}
+    for name, selected in (('structured', structured), ('random', ~structured)):
+        values = correct_rt[:, selected, :].reshape(n_participants, -1)
+        type_stats[name] = (values.mean(axis=1), values.var(axis=1, ddof=1), values.shape[1])
+
+    structured_rt, structured_var, n_structured = type_stats['structured']
+    random_rt, random_var, n_random = type_stats['random']
+    learning_effect = random_rt - structured_rt
+
+    return {
+        'structured_rt': structured_rt,
+        'random_rt': random_rt,
+        'learning_effect': learning_effect,
+        'z': learning_effect / np.sqrt(structured_var / n_structured + random_var / n_random)
+    }
+
+def simulate_design(design, n_studies, seed):
+    """Power of one design: per participant (trial-level test) and per study (group t-test)"""
+    rng = np.random.default_rng(seed)
+    masks = predictable_mask(sequence_sets(design['positions'], design['blocks'],
+                                           design['trials_per_block'], seed=seed), design['blocks'])
+
+    n_total = n_studies * design['n_participants']
+    batch = max(1, MAX_CELLS // (design['blocks'] * design['trials_per_block']))
+    parts = [participant_statistics(*draw_trials(design, min(batch, n_total - start), rng, masks))
+             for start in range(0, n_total, batch)]
+    effects = np.concatenate([part['learning_effect'] for part in parts])
+    z = np.concatenate([part['z'] for part in parts])
+
+    # Group test: one-sample t-test of the learning effects within each simulated study
+    studies = effects.reshape(n_studies, design['n_participants'])
+    df = design['n_participants'] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = studies.mean(axis=1) / (studies.std(axis=1, ddof=1) / np.sqrt(design['n_participants']))
+
+    row = dict(design)
+    row.update({
+        'mean_learning_effect': effects.mean(),
+        'sd_learning_effect': effects.std(ddof=1),
+        'participant_power': np.mean(z > NormalDist().inv_cdf(1 - ALPHA)),
+        'study_power': np.mean(t > t_critical(ALPHA, df)) if df > 0 else np.nan,
+        'n_studies': n_studies
+    })
+    return row
+
+def design_grid(positions, blocks, trials_per_block, n_participants, effect_ms, noise_sd, error_rate, **fixed):
+    """Every combination of the design and effect parameters"""
+    keys = ['positions', 'blocks', 'trials_per_block', 'n_participants', 'effect_ms', 'noise_sd', 'error_rate']
+    values = [positions, blocks, trials_per_block, n_participants, effect_ms, noise_sd, error_rate]
+    defaults = {
+        'base_rt': BASE_RT,
+        'between_sd': BETWEEN_SD,
+        'effect_sd': EFFECT_SD,
+        'learning_rate': LEARNING_RATE,
+        'practice': PRACTICE
+    }
+    defaults.update(fixed)
+    return [dict(defaults, **dict(zip(keys, combination))) for combination in itertools.product(*values)]
+
+def run_grid(designs, n_studies=1000, workers=None, seed=0):
+    """Simulate every design, one process per design"""
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(len(designs))]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(designs) == 1:
+        rows = [simulate_design(design, n_studies, design_seed) for design, design_seed in zip(designs, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(simulate_design, designs, [n_studies] * len(designs), seeds))
+    return pd.DataFrame(rows)
+
+def check_against_analysis(design, n_participants=3, seed=0):
+    """Largest learning-effect difference between the vectorized statistics and analyze_data"""
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import analyze_data
+
+    masks = predictable_mask(sequence_sets(design['positions'], design['blocks'],
+                                           design['trials_per_block'], seed=seed), design['blocks'])
+    first, error, retry = draw_trials(design, n_participants, np.random.default_rng(seed), masks)
+    expected = participant_statistics(first, error, retry)['learning_effect']
+    structured = block_is_structured(design['blocks'])
+
+    differences = []
+    for p, b, t in itertools.product(range(n_participants), range(design['blocks']), range(design['trials_per_block'])):
+        if b == 0 and t == 0:
+            rows = []
+        row = {'participant_id': f"sim{p}", 'block': b + 1, 'trial': t + 1,
+               'block_type': 'structured' if structured[b] else 'random'}
+        if error[p, b, t]:
+            rows.append(dict(row, reaction_time=first[p, b, t], correct=False, attempt=1))
+            rows.append(dict(row, reaction_time=retry[p, b, t], correct=True, attempt=2))
+        else:
+            rows.append(dict(row, reaction_time=first[p, b, t], correct=True, attempt=1))
+        if b == design['blocks'] - 1 and t == design['trials_per_block'] - 1:
+            differences.append(abs(analyze_data(rows)['learning_effect'] - expected[p]))
+    return max(differences)
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo power analysis for the SRTT design")
+    parser.add_argument('--positions', type=int, nargs='+', default=[4])
+    parser.add_argument('--blocks', type=int, nargs='+', default=[8])
+    parser.add_argument('--trials-per-block', type=int, nargs='+', default=[60])
+    parser.add_argument('--participants', type=int, nargs='+', default=[20],
+                        help="Participants per simulated study")
+    parser.add_argument('--effect-ms', type=float, nargs='+', default=[EFFECT_MS])
+    parser.add_argument('--noise-sd', type=float, nargs='+', default=[NOISE_SD])
+    parser.add_argument('--error-rate', type=float, nargs='+', default=[ERROR_RATE])
+    parser.add_argument('--studies', type=int, default=1000, help="Simulated studies per design")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true',
+                        help="Verify the vectorized statistics against analyze_data first")
+    parser.add_argument('--output', default='analysis/srtt_power.csv')
+    args = parser.parse_args()
+
+    designs = design_grid(args.positions, args.blocks, args.trials_per_block, args.participants,
+                          args.effect_ms, args.noise_sd, args.error_rate)
+
+    if args.check:
+        print(f"Largest difference from analyze_data: {check_against_analysis(designs[0]):.2e} ms")
+
+    print(f"Simulating {len(designs)} designs x {args.studies} studies...")
+    power = run_grid(designs, args.studies, args.workers, args.seed)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    power.to_csv(args.output, index=False)
+
+    columns = ['positions', 'blocks', 'trials_per_block', 'n_participants', 'effect_ms',
+               'mean_learning_effect', 'participant_power', 'study_power']
+    print(power[columns].to_string(index=False))
+    print(f"\nPower analysis exported to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import io
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+from collections import Counter, OrderedDict
+
+PROFILE_MODES = ['sampling', 'cprofile']
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+REPORT_LINES = 25  # Functions listed in each per-phase text report
+
+# Returned by phase() when profiling is off, so a disabled profiler costs one call
+_DISABLED = contextlib.nullcontext()
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class _Sampler(threading.Thread):
+    """Background thread that samples one thread's Python stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.phase = None
+        self.stacks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            phase = self.phase
+            if phase is None:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks.setdefault(phase, Counter())[';'.join(reversed(stack))] += 1
+
+class PhaseProfiler:
+    """Per-phase profiling for the experiment and the analysis
+
+    mode is None (off), 'sampling' (periodic stack samples, written as
+    collapsed stacks for flamegraph.pl / speedscope) or 'cprofile'
+    (deterministic, written as .prof files plus text reports). Wall time of
+    every phase is recorded in both modes.
+    """
+
+    def __init__(self, mode=None, interval=SAMPLE_INTERVAL):
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.wall_times = OrderedDict()
+        self.profiles = {}
+        self.sampler = None
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def phase(self, name):
+        """Context manager that profiles the enclosed code as phase `name`"""
+        if self.mode is None:
+            return _DISABLED
+        return self._profile_phase(name)
+
+    @contextlib.contextmanager
+    def _profile_phase(self, name):
+        profile = None
+        if self.mode == 'cprofile':
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+        else:
+            if self.sampler is None:
+                self.sampler = _Sampler(threading.get_ident(), self.interval)
+                self.sampler.start()
+            previous = self.sampler.phase
+            self.sampler.phase = name
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.wall_times[name] = self.wall_times.get(name, 0.0) + time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            else:
+                self.sampler.phase = previous
+
+    def report(self, output_dir):
+        """Write the per-phase reports to output_dir and print the phase times"""
+        if self.mode is None:
+            return None
+        if self.sampler is not None:
+            self.sampler.stopped.set()
+            self.sampler.join()
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        with open(os.path.join(output_dir, 'phases.csv'), 'w') as f:
+            f.write("phase,wall_ms\n")
+            for name, seconds in self.wall_times.items():
+                f.write(f"{name},{seconds * 1000:.3f}\n")
+
+        if self.mode == 'cprofile':
+            for name, profile in self.profiles.items():
+                profile.dump_stats(os.path.join(output_dir, f"{name}.prof"))
+                text = io.StringIO()
+                pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(REPORT_LINES)
+                with open(os.path.join(output_dir, f"{name}.txt"), 'w') as f:
+                    f.write(text.getvalue())
+        else:
+            stacks = self.sampler.stacks if self.sampler else {}
+            # One file per phase, plus one with the phase as the root frame
+            with open(os.path.join(output_dir, 'all_phases.collapsed'), 'w') as combined:
+                for name, counter in stacks.items():
+                    with open(os.path.join(output_dir, f"{name}.collapsed"), 'w') as f:
+                        for stack, count in counter.most_common():
+                            f.write(f"{stack} {count}\n")
+                            combined.write(f"{name};{stack} {count}\n")
+
+        print(f"\nProfile ({self.mode}) written to: {output_dir}")
+        for name, seconds in self.wall_times.items():
+            print(f"  {name:<20} {seconds * 1000:>12.1f} ms")
+        return output_dir
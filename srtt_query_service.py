@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import threading
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from srtt_streaming import CellAccumulator
+from srtt_archive import ArchiveReader, ARCHIVE_EXTENSION, session_name
+
+SERVICE_HOST = '127.0.0.1'  # Only reachable from this machine
+SERVICE_PORT = 8765
+RESCAN_INTERVAL = 5.0  # Seconds between scans of the results directory
+FILTER_KEYS = ['participant_id', 'group', 'block', 'block_type']
+
+class AggregateStore:
+    """In-memory per-session cell aggregates, refreshed incrementally from the results directory
+
+    Each session is reduced once to its (participant, block, block_type) sums.
+    Queries read an immutable snapshot of the combined table, so they never
+    wait on a rescan.
+    """
+
+    def __init__(self, results_dir='results', groups=None):
+        self.results_dir = results_dir
+        self.groups = groups or {}
+        self.session_cells = {}
+        self.file_states = {}
+        self.file_sessions = {}
+        self.failed_states = {}  # State of files that could not be read, so each failure is reported once
+        self.cells = self._combine()
+        self.last_scan = None
+        self.lock = threading.Lock()
+
+    def _combine(self):
+        if not self.session_cells:
+            return pd.DataFrame(columns=['participant_id', 'block', 'block_type', 'group',
+                                         'n', 'n_correct', 'rt_sum', 'rt_sumsq', 'n_rows', 'n_trials'])
+        cells = pd.concat(self.session_cells.values()).groupby(level=[0, 1, 2]).sum().reset_index()
+        cells['group'] = cells['participant_id'].map(self.groups)
+        return cells
+
+    @staticmethod
+    def _reduce(df):
+        accumulator = CellAccumulator()
+        accumulator.update(df)
+        return accumulator.cells
+
+    def refresh(self):
+        """Load new or changed result files and drop deleted ones; returns the number of sessions (re)loaded"""
+        # Imported here because srtt_analysis pulls in the plotting stack
+        from srtt_analysis import find_result_files
+
+        with self.lock:
+            loaded = 0
+            paths = find_result_files(self.results_dir)
+
+            # Forget files that disappeared since the last scan, with the sessions they provided
+            gone = set(self.file_states) - set(paths)
+            dropped = set()
+            for path in gone:
+                del self.file_states[path]
+                dropped |= self.file_sessions.pop(path, set())
+            for name in dropped:
+                self.session_cells.pop(name, None)
+            for path in set(self.failed_states) - set(paths):
+                del self.failed_states[path]
+            if dropped:
+                # A dropped session may still be on disk in another form (e.g. a CSV packed into an
+                # archive); rescan the archives and those CSVs so it is loaded again below
+                for path in list(self.file_states):
+                    if path.endswith(ARCHIVE_EXTENSION) or session_name(path) in dropped:
+                        del self.file_states[path]
+
+            # Archives first, so a session that was packed and is still on disk is counted once
+            for path in sorted(paths, key=lambda path: not path.endswith(ARCHIVE_EXTENSION)):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                state = (stat.st_mtime_ns, stat.st_size)
+                if self.file_states.get(path) == state:
+                    continue
+
+                # A file still being written (e.g. by save_results) may be empty or cut short;
+                # it is skipped without recording its state, so the next scan retries it
+                try:
+                    if path.endswith(ARCHIVE_EXTENSION):
+                        reader = ArchiveReader(path)
+                        names = [name for name in reader.sessions() if name not in self.session_cells]
+                        cells = {session['session'].iloc[0]: self._reduce(session)
+                                 for session in reader.iter_sessions(names)}
+                        self.session_cells.update(cells)
+                        self.file_sessions[path] = set(self.file_sessions.get(path, set())) | set(names)
+                        loaded += len(names)
+                    else:
+                        name = session_name(path)
+                        owned_by_archive = any(name in sessions for other, sessions in self.file_sessions.items()
+                                               if other != path)
+                        if not owned_by_archive:
+                            df = pd.read_csv(path, dtype={'participant_id': str})
+                            self.session_cells[name] = self._reduce(df)
+                            self.file_sessions[path] = {name}
+                            loaded += 1
+                except (pd.errors.EmptyDataError, pd.errors.ParserError, KeyError, ValueError, OSError) as e:
+                    if self.failed_states.get(path) != state:
+                        print(f"Could not read {path} (retried on every scan): {e}")
+                    self.failed_states[path] = state
+                    continue
+                self.failed_states.pop(path, None)
+                self.file_states[path] = state
+
+            if loaded or gone:
+                self.cells = self._combine()
+            self.last_scan = time.time()
+            return loaded
+
+    def query(self, filters, group_by=None):
+        """Pooled RT and accuracy for the cells matching filters
+
+        filters maps FILTER_KEYS to lists of accepted values. mean_rt pools
+        all correct trials; participant_mean_rt averages per-participant means.
+        """
+        cells = self.cells
+        for key, values in filters.items():
+            if key == 'block':
+                values = [int(value) for value in values]
+            cells = cells[cells[key].isin(values)]
+
+        if group_by:
+            return [dict(zip(group_by, key if isinstance(key, tuple) else (key,)), **self._summarize(part))
+                    for key, part in cells.groupby(group_by, sort=True)]
+        return self._summarize(cells)
+
+    @staticmethod
+    def _summarize(cells):
+        n = cells['n'].sum()
+        n_correct = cells['n_correct'].sum()
+        if n_correct:
+            mean_rt = cells['rt_sum'].sum() / n_correct
+            variance = max(cells['rt_sumsq'].sum() / n_correct - mean_rt ** 2, 0.0)
+        else:
+            mean_rt, variance = np.nan, np.nan
+
+        by_participant = cells.groupby('participant_id')[['rt_sum', 'n_correct']].sum()
+        by_participant = by_participant[by_participant['n_correct'] > 0]
+        participant_means = by_participant['rt_sum'] / by_participant['n_correct']
+
+        def number(value):
+            return None if pd.isna(value) else round(float(value), 3)
+
+        return {
+            'n_participants': int(cells['participant_id'].nunique()),
+            'n_trials': int(n),
+            'n_correct': int(n_correct),
+            'mean_rt': number(mean_rt),
+            'sd_rt': number(np.sqrt(variance)),
+            'participant_mean_rt': number(participant_means.mean()),
+            'accuracy': number(n_correct / n * 100) if n else None
+        }
+
+    def status(self):
+        return {
+            'sessions': len(self.session_cells),
+            'participants': int(self.cells['participant_id'].nunique()),
+            'cells': len(self.cells),
+            'last_scan': self.last_scan
+        }
+
+def load_groups(path):
+    """Participant-to-group mapping from a CSV with participant_id and group columns"""
+    groups = pd.read_csv(path, dtype=str)
+    return dict(zip(groups['participant_id'], groups['group']))
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET /query, /participants and /status, answered as JSON"""
+
+    store = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        start = time.perf_counter()
+
+        try:
+            if url.path == '/query':
+                filters = {key: ','.join(params[key]).split(',') for key in FILTER_KEYS if key in params}
+                group_by = ','.join(params['group_by']).split(',') if 'group_by' in params else None
+                unknown = [key for key in group_by or [] if key not in FILTER_KEYS]
+                if unknown:
+                    raise ValueError(f"Cannot group by: {', '.join(unknown)}")
+                body = {'filters': filters, 'result': self.store.query(filters, group_by)}
+            elif url.path == '/participants':
+                body = {'participants': sorted(self.store.cells['participant_id'].unique().tolist())}
+            elif url.path == '/status':
+                body = self.store.status()
+            else:
+                self._send(404, {'error': f"Unknown path: {url.path}"})
+                return
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+            return
+
+        body['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Keep the console for scan messages
+        pass
+
+def watch(store, interval, stop):
+    """Rescan the results directory until stop is set"""
+    while not stop.wait(interval):
+        try:
+            loaded = store.refresh()
+        except Exception as e:
+            # One failed scan must not end the thread and leave the aggregates stale
+            print(f"Rescan failed: {e}")
+            continue
+        if loaded:
+            print(f"{loaded} new or updated sessions loaded ({store.status()['sessions']} total)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local JSON query service over SRTT aggregates")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--groups', help="CSV with participant_id and group columns")
+    parser.add_argument('--rescan', type=float, default=RESCAN_INTERVAL,
+                        help="Seconds between scans for new sessions")
+    args = parser.parse_args()
+
+    store = AggregateStore(args.results_dir, load_groups(args.groups) if args.groups else None)
+    loaded = store.refresh()
+    print(f"{loaded} sessions loaded from {args.results_dir}")
+
+    stop = threading.Event()
+    threading.Thread(target=watch, args=(store, args.rescan, stop), daemon=True).start()
+
+    QueryHandler.store = store
+    server = ThreadingHTTPServer((SERVICE_HOST, args.port), QueryHandler)
+    print(f"Serving on http://{SERVICE_HOST}:{args.port} (e.g. /query?block_type=structured&block=6&group=A)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import os
+import html
+import json
+import hashlib
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from srtt_archive import ArchiveReader, ARCHIVE_EXTENSION, session_name
+from srtt_cleaning import clean_trials
+from srtt_group_figures import render_panel, group_mean
+from srtt_group_stats import group_statistics
+from srtt_manifest import file_hash, FILE_NAME_PATTERN
+from srtt_permutation import permutation_test
+from srtt_trials import reconstruct_trials, trial_statistics
+
+REPORT_DIR = 'analysis/report'
+STATE_NAME = 'state.json'  # Input hash and cached aggregates of every section, plus file hashes
+SECTION_DIR = 'sections'  # HTML fragments, one per section
+ASSET_DIR = 'assets'  # Small PNG figures referenced by the report
+SUMMARY_COLUMNS = ['participant_id', 'sessions', 'trials', 'structured_rt', 'random_rt', 'learning_effect',
+                   'learning_effect_p', 'accuracy', 'structured_errors_per_trial', 'random_errors_per_trial',
+                   'structured_timeout_rate', 'random_timeout_rate']
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Relatório do estudo SRTT</title>
+<style>
+body {{ font-family: sans-serif; max-width: 1100px; margin: 2em auto; color: #222; }}
+table {{ border-collapse: collapse; font-size: 0.85em; margin: 1em 0; }}
+th, td {{ border: 1px solid #ccc; padding: 0.25em 0.6em; text-align: right; }}
+th {{ background: #f0f0f0; }}
+section {{ border-top: 1px solid #ddd; padding-top: 0.5em; }}
+nav a {{ margin-right: 0.8em; }}
+</style>
+</head>
+<body>
+<h1>Relatório do estudo SRTT</h1>
+<p>Gerado em {generated} a partir de {sessions} sessões de {participants} participantes.</p>
+{body}
+</body>
+</html>
+"""
+
+def _digest(values):
+    return hashlib.sha256('\n'.join(values).encode('utf-8')).hexdigest()
+
+def _csv_participant(path):
+    match = FILE_NAME_PATTERN.match(os.path.basename(path))
+    if match is not None:
+        return match.group('participant_id')
+    return str(pd.read_csv(path, usecols=['participant_id'], dtype=str, nrows=1)['participant_id'].iloc[0])
+
+def study_sessions(results_dir, files=None):
+    """Every session of a results directory with its participant, source and content hash
+
+    CSV files are hashed directly; files is the cache of earlier hashes by
+    name ([size, mtime_ns, participant, sha256]) and is updated in place, so
+    only new or modified files are read. Archive chunks are never rewritten,
+    so their index entry identifies them. A session present in both forms is
+    counted once.
+    """
+    files = {} if files is None else files
+    sessions = {}
+    names = sorted(name for name in os.listdir(results_dir)
+                   if name.startswith('srtt_participant_') and name.endswith('.csv'))
+    for name in names:
+        path = os.path.join(results_dir, name)
+        stat = os.stat(path)
+        cached = files.get(name)
+        if cached is None or cached[:2] != [stat.st_size, stat.st_mtime_ns]:
+            cached = files[name] = [stat.st_size, stat.st_mtime_ns, _csv_participant(path), file_hash(path)]
+        sessions[session_name(path)] = {'participant_id': cached[2], 'path': path, 'hash': cached[3]}
+    for name in set(files) - set(names):
+        del files[name]
+
+    for name in sorted(os.listdir(results_dir)):
+        if not name.endswith(ARCHIVE_EXTENSION):
+            continue
+        path = os.path.join(results_dir, name)
+        for session, meta in ArchiveReader(path).index['sessions'].items():
+            if session not in sessions:
+                sessions[session] = {'participant_id': str(meta['participant_id']), 'path': path,
+                                     'hash': _digest([json.dumps(meta, sort_keys=True)])}
+    return sessions
+
+def load_participant(sessions):
+    """Trial rows of one participant's sessions (CSV files and archive chunks)"""
+    frames = []
+    archives = {}
+    for session, info in sorted(sessions.items()):
+        if info['path'].endswith(ARCHIVE_EXTENSION):
+            archives.setdefault(info['path'], []).append(session)
+            continue
+        df = pd.read_csv(info['path'], dtype={'participant_id': str})
+        df['correct'] = df['correct'].astype(str).str.lower() == 'true'
+        frames.append(df.assign(session=session))
+    for path, names in archives.items():
+        frames.extend(ArchiveReader(path).iter_sessions(names))
+    return pd.concat(frames, ignore_index=True)
+
+def analyze_participant(participant_id, sessions):
+    """Cached aggregates of one participant: summary numbers and block curves"""
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import analyze_data, attempt_statistics
+
+    data = load_participant(sessions)
+    raw = attempt_statistics(data)
+    raw.update(trial_statistics(reconstruct_trials(data)))
+    cleaned, _ = clean_trials(data)
+    results = analyze_data(cleaned) if len(cleaned) else None
+
+    summary = {'participant_id': participant_id, 'sessions': len(sessions), 'trials': len(data)}
+    for key in ['structured_errors_per_trial', 'random_errors_per_trial',
+                'structured_timeout_rate', 'random_timeout_rate']:
+        summary[key] = raw[key]
+    curves = pd.DataFrame(columns=['block', 'block_type', 'reaction_time', 'accuracy', 'n'])
+    if results is not None:
+        summary.update({key: results[key] for key in ['structured_rt', 'random_rt', 'learning_effect']})
+        summary['learning_effect_p'] = permutation_test(cleaned)['p_value']
+        summary['accuracy'] = cleaned['correct'].mean() * 100
+        curves = results['rt_by_block'].merge(results['accuracy_by_block'][['block', 'block_type', 'accuracy']],
+                                              on=['block', 'block_type'], how='outer')
+        curves['n'] = curves['block'].map(cleaned.groupby('block').size())
+
+    # NaN is not valid JSON; missing values are stored as null
+    summary = {key: (None if isinstance(value, float) and np.isnan(value) else value)
+               for key, value in summary.items()}
+    return {'summary': summary, 'curves': json.loads(curves.to_json(orient='records'))}
+
+def _table(df, float_format='{:.2f}'.format):
+    return df.to_html(index=False, border=0, na_rep='', float_format=float_format, escape=True)
+
+def participant_section(participant_id, cached, asset_name):
+    summary = pd.DataFrame([cached['summary']]).reindex(columns=SUMMARY_COLUMNS).drop(columns='participant_id')
+    # No figure is rendered for a participant without curves (e.g. every trial removed by cleaning)
+    figure = (f'<img src="{ASSET_DIR}/{asset_name}.png" alt="TR e precisão por bloco" loading="lazy">\n'
+              if cached['curves'] else '')
+    return (f'<section id="p-{html.escape(asset_name)}">\n'
+            f'<h3>Participante {html.escape(participant_id)}</h3>\n'
+            f'{figure}{_table(summary)}\n</section>\n')
+
+def group_section(participants, report_dir):
+    """Group tables and figure, built from the cached per-participant aggregates only"""
+    summary = pd.DataFrame([entry['summary'] for entry in participants.values()]).reindex(columns=SUMMARY_COLUMNS)
+    frames = [pd.DataFrame(entry['curves']).assign(participant_id=participant_id)
+              for participant_id, entry in participants.items() if entry['curves']]
+
+    parts = ['<section id="grupo">\n<h2>Grupo</h2>\n']
+    if frames:
+        curves = pd.concat(frames, ignore_index=True)
+        band = group_mean(curves)
+        render_panel(band, f"Média do grupo (n={curves['participant_id'].nunique()})",
+                     os.path.join(report_dir, ASSET_DIR, 'group_mean.png'), band=band)
+        parts.append(f'<img src="{ASSET_DIR}/group_mean.png" alt="Média do grupo">\n')
+
+        stats, dropped = group_statistics(curves[['participant_id', 'block', 'block_type', 'reaction_time']])
+        parts.append('<h3>ANOVA de medidas repetidas e testes pareados</h3>\n')
+        if dropped:
+            parts.append(f'<p>{dropped} participantes sem todas as células época × tipo ficaram de fora.</p>\n')
+        parts.append(_table(stats, '{:.4g}'.format))
+
+    parts.append('<h3>Resumo por participante</h3>\n')
+    parts.append(_table(summary.sort_values('participant_id')))
+    parts.append('</section>\n')
+    return ''.join(parts)
+
+def build_report(results_dir='results', report_dir=REPORT_DIR, rebuild=False):
+    """Update the study report; only sections whose input sessions changed are rebuilt
+
+    Returns the report path and the number of participant sections rebuilt.
+    """
+    for directory in (report_dir, os.path.join(report_dir, SECTION_DIR), os.path.join(report_dir, ASSET_DIR)):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    state_path = os.path.join(report_dir, STATE_NAME)
+    state = {'participants': {}, 'group_hash': None, 'files': {}}
+    if os.path.exists(state_path) and not rebuild:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+
+    files = state.get('files', {})
+    sessions = study_sessions(results_dir, files)
+    by_participant = {}
+    for session, info in sessions.items():
+        by_participant.setdefault(info['participant_id'], {})[session] = info
+
+    rebuilt = 0
+    participants = {}
+    for participant_id, participant_sessions in sorted(by_participant.items()):
+        digest = _digest(sorted(info['hash'] for info in participant_sessions.values()))
+        asset_name = f"participant_{digest[:16]}"
+        section_path = os.path.join(report_dir, SECTION_DIR, f"{asset_name}.html")
+        cached = state['participants'].get(participant_id)
+
+        if cached is None or cached['hash'] != digest or not os.path.exists(section_path):
+            cached = analyze_participant(participant_id, participant_sessions)
+            cached['hash'] = digest
+            curves = pd.DataFrame(cached['curves'])
+            if len(curves):
+                render_panel(curves, f"Participante {participant_id}",
+                             os.path.join(report_dir, ASSET_DIR, f"{asset_name}.png"))
+            with open(section_path, 'w', encoding='utf-8') as f:
+                f.write(participant_section(participant_id, cached, asset_name))
+            rebuilt += 1
+        participants[participant_id] = cached
+
+    # Remove the fragments and figures of sections that were replaced or whose sessions are gone
+    current = {f"participant_{entry['hash'][:16]}" for entry in participants.values()}
+    for directory in (SECTION_DIR, ASSET_DIR):
+        for name in os.listdir(os.path.join(report_dir, directory)):
+            if name.startswith('participant_') and os.path.splitext(name)[0] not in current:
+                os.remove(os.path.join(report_dir, directory, name))
+
+    group_hash = _digest(sorted(entry['hash'] for entry in participants.values()))
+    group_path = os.path.join(report_dir, SECTION_DIR, 'group.html')
+    if group_hash != state['group_hash'] or not os.path.exists(group_path):
+        with open(group_path, 'w', encoding='utf-8') as f:
+            f.write(group_section(participants, report_dir))
+    state = {'participants': participants, 'group_hash': group_hash, 'files': files}
+
+    with open(state_path, 'w') as f:
+        json.dump(state, f)
+
+    # Assembling the page only concatenates the stored fragments
+    body = ['<nav>' + ''.join(f'<a href="#p-participant_{entry["hash"][:16]}">{html.escape(participant_id)}</a>'
+                              for participant_id, entry in participants.items()) + '</nav>\n']
+    with open(group_path, 'r', encoding='utf-8') as f:
+        body.append(f.read())
+    body.append('<h2>Participantes</h2>\n')
+    for entry in participants.values():
+        with open(os.path.join(report_dir, SECTION_DIR, f"participant_{entry['hash'][:16]}.html"), 'r',
+                  encoding='utf-8') as f:
+            body.append(f.read())
+
+    report_path = os.path.join(report_dir, 'index.html')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(PAGE_TEMPLATE.format(generated=datetime.now().strftime("%Y-%m-%d %H:%M"),
+                                     sessions=len(sessions), participants=len(participants), body=''.join(body)))
+    return report_path, rebuilt
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the static HTML study report")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--output-dir', default=REPORT_DIR)
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild every section")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.results_dir):
+        print(f"Results directory not found: {args.results_dir}")
+        return
+
+    report_path, rebuilt = build_report(args.results_dir, args.output_dir, args.rebuild)
+    print(f"{rebuilt} participant sections rebuilt")
+    print(f"Study report saved to: {report_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from srtt_ngrams import first_responses
+
+DEFAULT_WINDOWS = [10, 20]  # Sliding-window sizes in trials
+
+def _window_sums(values, group_starts, window):
+    """Sum of the last `window` values at each row, restricted to the row's group
+
+    Uses one global cumulative sum: the sum over rows lower..i is
+    cs[i + 1] - cs[lower], where lower never goes back past the group start.
+    """
+    cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    rows = np.arange(len(values))
+    lower = np.maximum(rows + 1 - window, group_starts)
+    return cumulative[rows + 1] - cumulative[lower], rows + 1 - lower
+
+def rolling_metrics(df, windows=DEFAULT_WINDOWS):
+    """Sliding-window RT and accuracy for every session and block type
+
+    Windows run over each session's trials of one block type in order
+    (across blocks), indexed by type_index. Only full windows are reported.
+    """
+    trials = first_responses(df)
+    # Sessions of the same participant are separate curves; files without a session column hold one each
+    groups = ['participant_id'] + (['session'] if 'session' in trials.columns else []) + ['block_type']
+    trials = trials.sort_values(groups + ['block', 'trial'], kind='stable').reset_index(drop=True)
+    trials['type_index'] = trials.groupby(groups).cumcount() + 1
+
+    keys = trials[groups].to_numpy()
+    new_group = np.ones(len(trials), dtype=bool)
+    if len(trials) > 1:
+        new_group[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    group_starts = np.maximum.accumulate(np.where(new_group, np.arange(len(trials)), 0))
+
+    correct = trials['correct'].to_numpy(dtype=np.float64)
+    correct_rt = np.where(correct > 0, trials['reaction_time'].to_numpy(dtype=np.float64), 0.0)
+
+    curves = []
+    for window in windows:
+        rt_sum, count = _window_sums(correct_rt, group_starts, window)
+        correct_sum, _ = _window_sums(correct, group_starts, window)
+        full = count == window
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rolling_rt = np.where(full & (correct_sum > 0), rt_sum / correct_sum, np.nan)
+        rolling_accuracy = np.where(full, correct_sum / window * 100, np.nan)
+
+        curve = trials[groups + ['block', 'trial', 'type_index']].copy()
+        curve['window'] = window
+        curve['rolling_rt'] = rolling_rt
+        curve['rolling_accuracy'] = rolling_accuracy
+        curves.append(curve[full])
+
+    return pd.concat(curves, ignore_index=True)
+
+def difference_curves(curves):
+    """Structured-minus-random rolling RT and accuracy at each type_index"""
+    keys = [column for column in ['participant_id', 'session'] if column in curves.columns] + ['window', 'type_index']
+    structured = curves[curves['block_type'] == 'structured'].set_index(keys)[['rolling_rt', 'rolling_accuracy']]
+    random_curves = curves[curves['block_type'] == 'random'].set_index(keys)[['rolling_rt', 'rolling_accuracy']]
+
+    merged = structured.join(random_curves, lsuffix='_structured', rsuffix='_random', how='inner')
+    merged['rt_difference'] = merged['rolling_rt_structured'] - merged['rolling_rt_random']
+    merged['accuracy_difference'] = merged['rolling_accuracy_structured'] - merged['rolling_accuracy_random']
+    return merged.reset_index()
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files, load_sessions
+
+    parser = argparse.ArgumentParser(description="Rolling-window SRTT learning curves")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--windows', type=int, nargs='+', default=DEFAULT_WINDOWS,
+                        help="Window sizes in trials")
+    args = parser.parse_args()
+
+    file_paths = find_result_files(args.results_dir)
+    if not file_paths:
+        print(f"No result files found in: {args.results_dir}")
+        return
+
+    curves = rolling_metrics(load_sessions(file_paths), args.windows)
+    differences = difference_curves(curves)
+
+    if not os.path.exists('analysis'):
+        os.makedirs('analysis')
+
+    curves.to_csv('analysis/srtt_rolling.csv', index=False)
+    differences.to_csv('analysis/srtt_rolling_difference.csv', index=False)
+
+    print(f"Rolling curves for {curves['participant_id'].nunique()} participants exported to: "
+          "analysis/srtt_rolling.csv and analysis/srtt_rolling_difference.csv")
+
+if __name__ == "__main__":
+    main()
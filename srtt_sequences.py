@@ -0,0 +1,83 @@
+import random
+
+SEQUENCE_LENGTH = 10  # Length of the structured sequence
+
+# Create structured sequence (with second-order dependencies)
+# This is a 10-item sequence with balanced transitions
+DEFAULT_STRUCTURED_SEQUENCE = [0, 2, 1, 0, 3, 1, 2, 3, 0, 1]
+
+def generate_structured_sequence(positions):
+    """Generate a structured sequence for the given number of positions"""
+    if positions <= 4:
+        # Para posições <= 4, adaptar a sequência padrão
+        if positions == 2:
+            # Para 2 posições, usar apenas valores 0 e 1
+            return [0, 1, 0, 1, 0, 1, 0, 1, 0, 1]
+        elif positions == 3:
+            # Para 3 posições, usar apenas valores 0, 1 e 2
+            return [0, 2, 1, 0, 2, 1, 2, 0, 1, 2]
+        else:
+            # Para 4 posições, usar a sequência padrão
+            return DEFAULT_STRUCTURED_SEQUENCE
+    else:
+        # For more positions, create a new balanced sequence
+        seq = []
+        for i in range(SEQUENCE_LENGTH):
+            # Avoid consecutive repetitions
+            if i > 0:
+                options = list(range(positions))
+                if seq:
+                    options.remove(seq[-1])  # Don't repeat last position
+                pos = random.choice(options)
+            else:
+                pos = random.randint(0, positions - 1)
+            seq.append(pos)
+        return seq
+
+def generate_block_sequence(positions, trials_per_block, structured):
+    """Generate the position sequence for one block"""
+    if structured:
+        # For structured blocks, repeat the predefined sequence as needed
+        structured_sequence = generate_structured_sequence(positions)
+        repetitions = trials_per_block // SEQUENCE_LENGTH
+        remainder = trials_per_block % SEQUENCE_LENGTH
+        sequence = (structured_sequence * repetitions) + structured_sequence[:remainder]
+
+        # Garantir que todas as posições na sequência são válidas
+        for i in range(len(sequence)):
+            if sequence[i] >= positions:
+                sequence[i] = sequence[i] % positions
+
+        # Modify the sequence to ensure no immediate repetitions
+        for i in range(1, len(sequence)):
+            if sequence[i] == sequence[i-1]:
+                # Find a non-repeating value
+                options = list(range(positions))  # Usar apenas posições válidas
+                if len(options) > 1:  # Garantir que temos opções
+                    options.remove(sequence[i-1])
+                    sequence[i] = random.choice(options)
+
+        return sequence
+    else:
+        # For random blocks, generate a pseudo-random sequence
+        random_sequence = []
+        last_position = None
+
+        for _ in range(trials_per_block):
+            # Generate new positions ensuring no immediate repetitions
+            available_positions = list(range(positions))  # Garantir apenas posições válidas
+
+            if last_position is not None and last_position in available_positions:
+                if len(available_positions) > 1:  # Se houver mais de uma opção
+                    available_positions.remove(last_position)
+
+            if available_positions:  # Make sure we have options
+                new_position = random.choice(available_positions)
+            else:
+                # Fallback para quando há apenas uma posição
+                new_position = 0
+
+            random_sequence.append(new_position)
+            last_position = new_position
+
+        return random_sequence
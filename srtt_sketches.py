@@ -0,0 +1,229 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from srtt_archive import ArchiveReader, ARCHIVE_EXTENSION, session_name
+
+# Log-bucket quantile sketch settings
+RELATIVE_ACCURACY = 0.01  # Every quantile is within 1% of a true sample value at that rank
+MIN_RT = 1.0  # RTs below this (ms) share the first bucket
+MAX_RT = 60000.0  # RTs above this (ms) share the last bucket
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+N_BINS = int(np.ceil(np.log(MAX_RT / MIN_RT) / np.log(GAMMA))) + 1
+CELL_KEYS = ['participant_id', 'block', 'block_type']
+DEFAULT_QUANTILES = [0.5, 0.9, 0.99]
+SKETCH_DIR = 'sketches'  # Sketch files are kept in this folder inside the results directory
+
+def bin_index(values):
+    """Bucket of each RT; bucket i covers (MIN_RT * GAMMA^(i-1), MIN_RT * GAMMA^i]"""
+    values = np.clip(np.asarray(values, dtype=np.float64), MIN_RT, MAX_RT)
+    return np.clip(np.ceil(np.log(values / MIN_RT) / np.log(GAMMA)), 0, N_BINS - 1).astype(np.int64)
+
+def bin_value(indices):
+    """Representative RT of each bucket (relative error at most RELATIVE_ACCURACY)"""
+    upper = MIN_RT * GAMMA ** np.asarray(indices, dtype=np.float64)
+    return np.where(np.asarray(indices) == 0, MIN_RT, 2 * upper / (GAMMA + 1))
+
+def _group_rows(keys, counts):
+    """Sum the count rows that share the same key"""
+    if len(keys) == 0:
+        return keys.reset_index(drop=True), counts
+    codes = keys.groupby(list(keys.columns), sort=True, observed=True).ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    merged = np.add.reduceat(counts[order], starts, axis=0)
+    return keys.iloc[order[starts]].reset_index(drop=True), merged
+
+class SketchTable:
+    """Mergeable log-bucket RT sketches (DDSketch style), one row of bucket counts per cell
+
+    Buckets have a fixed geometric layout, so every sketch uses the same
+    N_BINS counters no matter how many trials it holds, merging is exact
+    (counts add up) and a quantile is within RELATIVE_ACCURACY of the RT at
+    that rank.
+    """
+
+    def __init__(self, keys, counts):
+        self.keys = keys.reset_index(drop=True)
+        self.counts = counts
+
+    @classmethod
+    def empty(cls, key_columns=CELL_KEYS):
+        return cls(pd.DataFrame(columns=key_columns), np.zeros((0, N_BINS), dtype=np.int64))
+
+    @classmethod
+    def from_trials(cls, df, key_columns=CELL_KEYS):
+        """Sketch the correct-response RTs of each cell, as analyze_data uses them"""
+        correct = df['correct']
+        if correct.dtype != bool:
+            correct = correct.astype(str).str.lower() == 'true'
+        df = df[correct.to_numpy()]
+        if len(df) == 0:
+            return cls.empty(key_columns)
+
+        keys = pd.DataFrame({
+            'participant_id': df['participant_id'].astype(str).to_numpy(),
+            'block': df['block'].astype(np.int64).to_numpy(),
+            'block_type': df['block_type'].astype(str).to_numpy()
+        })[key_columns]
+        codes = keys.groupby(key_columns, sort=True).ngroup().to_numpy()
+        first = pd.Series(np.arange(len(codes))).groupby(codes).first().to_numpy()
+
+        flat = codes * N_BINS + bin_index(df['reaction_time'].to_numpy())
+        counts = np.bincount(flat, minlength=(codes.max() + 1) * N_BINS).reshape(-1, N_BINS)
+        return cls(keys.iloc[first], counts.astype(np.int64))
+
+    def merge(self, other):
+        """Combine with another table; cells present in both are added together"""
+        return SketchTable.concat([self, other])
+
+    @staticmethod
+    def concat(tables):
+        """Merge many tables in one pass"""
+        tables = [table for table in tables if len(table.keys)]
+        if not tables:
+            return SketchTable.empty()
+        keys = pd.concat([table.keys for table in tables], ignore_index=True)
+        keys['block'] = keys['block'].astype(np.int64)
+        merged_keys, counts = _group_rows(keys, np.vstack([table.counts for table in tables]))
+        return SketchTable(merged_keys, counts)
+
+    def group(self, by):
+        """Merge cells into coarser group sketches, e.g. by=['block_type'] or by=[] for everything"""
+        if not by:
+            return SketchTable(pd.DataFrame(index=[0]), self.counts.sum(axis=0, keepdims=True))
+        merged_keys, counts = _group_rows(self.keys[by], self.counts)
+        return SketchTable(merged_keys, counts)
+
+    def filter(self, **criteria):
+        keep = np.ones(len(self.keys), dtype=bool)
+        for column, value in criteria.items():
+            if value is not None:
+                keep &= (self.keys[column].astype(str) == str(value)).to_numpy()
+        return SketchTable(self.keys[keep], self.counts[keep])
+
+    def quantiles(self, qs=DEFAULT_QUANTILES):
+        """Quantile estimates (and trial counts) for every row of the table"""
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1]
+        result = self.keys.copy()
+        result['n'] = total
+
+        for q in qs:
+            # Lower-quantile rank, matching numpy's 'lower' interpolation
+            rank = np.floor(q * np.maximum(total - 1, 0))
+            bins = (cumulative <= rank[:, None]).sum(axis=1)
+            values = bin_value(np.minimum(bins, N_BINS - 1))
+            result[f"p{q * 100:g}"] = np.where(total > 0, values, np.nan)
+        return result
+
+    def save(self, path):
+        """Write the table as a compressed .npz holding only the non-empty buckets"""
+        rows, bins = np.nonzero(self.counts)
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        np.savez_compressed(path,
+                            relative_accuracy=RELATIVE_ACCURACY, min_rt=MIN_RT, n_bins=N_BINS,
+                            participant_id=np.asarray(self.keys['participant_id'], dtype=str),
+                            block=self.keys['block'].astype(np.int64).to_numpy(),
+                            block_type=np.asarray(self.keys['block_type'], dtype=str),
+                            rows=rows.astype(np.int32), bins=bins.astype(np.int16),
+                            values=self.counts[rows, bins])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['n_bins']) != N_BINS or float(data['relative_accuracy']) != RELATIVE_ACCURACY:
+                raise ValueError(f"Sketch file uses a different bucket layout: {path}")
+            keys = pd.DataFrame({column: data[column].astype(object if column != 'block' else np.int64)
+                                 for column in CELL_KEYS})
+            counts = np.zeros((len(keys), N_BINS), dtype=np.int64)
+            counts[data['rows'], data['bins']] = data['values']
+        return cls(keys, counts)
+
+def sketch_path(results_dir, session):
+    return os.path.join(results_dir, SKETCH_DIR, f"{session}.npz")
+
+def save_session_sketch(df, results_file):
+    """Write the sketch of one session next to its result file"""
+    results_dir = os.path.dirname(results_file) or '.'
+    path = sketch_path(results_dir, session_name(results_file))
+    SketchTable.from_trials(pd.DataFrame(df)).save(path)
+    return path
+
+def build_sketches(file_paths, rebuild=False):
+    """Create missing (or outdated) session sketches; returns the number written"""
+    written = 0
+    for path in file_paths:
+        results_dir = os.path.dirname(path) or '.'
+        if path.endswith(ARCHIVE_EXTENSION):
+            reader = ArchiveReader(path)
+            pending = [name for name in reader.sessions()
+                       if rebuild or not os.path.exists(sketch_path(results_dir, name))]
+            for session in reader.iter_sessions(pending):
+                SketchTable.from_trials(session).save(sketch_path(results_dir, session['session'].iloc[0]))
+                written += 1
+            continue
+
+        target = sketch_path(results_dir, session_name(path))
+        if not rebuild and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            continue
+        save_session_sketch(pd.read_csv(path, dtype={'participant_id': str}), path)
+        written += 1
+    return written
+
+def load_sketches(file_paths):
+    """Merge the stored sketches of the given sessions (each session counted once)"""
+    tables = []
+    loaded = set()
+    for path in file_paths:
+        results_dir = os.path.dirname(path) or '.'
+        names = ArchiveReader(path).sessions() if path.endswith(ARCHIVE_EXTENSION) else [session_name(path)]
+        for name in names:
+            if name in loaded:
+                continue
+            tables.append(SketchTable.load(sketch_path(results_dir, name)))
+            loaded.add(name)
+    return SketchTable.concat(tables)
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files
+
+    parser = argparse.ArgumentParser(description="Mergeable RT quantile sketches")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--by', nargs='*', default=['participant_id', 'block_type'],
+                        choices=CELL_KEYS, help="Cell keys to group by (none for the whole study)")
+    parser.add_argument('--participant', help="Only this participant")
+    parser.add_argument('--block-type', choices=['structured', 'random'])
+    parser.add_argument('--quantiles', type=float, nargs='+', default=DEFAULT_QUANTILES)
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild every session sketch")
+    parser.add_argument('--output', default='analysis/srtt_quantiles.csv')
+    args = parser.parse_args()
+
+    file_paths = find_result_files(args.results_dir)
+    if not file_paths:
+        print(f"No result files found in: {args.results_dir}")
+        return
+
+    written = build_sketches(file_paths, args.rebuild)
+    if written:
+        print(f"{written} session sketches written to {os.path.join(args.results_dir, SKETCH_DIR)}")
+
+    table = load_sketches(file_paths).filter(participant_id=args.participant, block_type=args.block_type)
+    summary = table.group(args.by).quantiles(args.quantiles)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    summary.to_csv(args.output, index=False)
+
+    print(summary.to_string(index=False))
+    print(f"\nQuantiles (within {RELATIVE_ACCURACY:.0%} relative error) exported to: {args.output}")
+
+if __name__ == "__main__":
+    main()
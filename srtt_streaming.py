@@ -0,0 +1,223 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from srtt_cleaning import clean_trials
+from srtt_archive import ArchiveReader, ARCHIVE_EXTENSION, session_name
+
+CELL_KEYS = ['participant_id', 'block', 'block_type']
+SUM_COLUMNS = ['n', 'n_correct', 'rt_sum', 'rt_sumsq', 'n_rows', 'n_trials']
+RAW_COLUMNS = ['n_rows', 'n_trials']  # Counted before cleaning, so attempts per trial survive it
+READ_COLUMNS = ['participant_id', 'block', 'block_type', 'trial', 'reaction_time', 'correct', 'attempt',
+                'timed_out']
+BYTES_PER_ROW = 400  # Rough in-memory cost of one parsed row, including pandas overhead
+DEFAULT_MEMORY_LIMIT_MB = 256
+
+def chunk_rows_for(memory_limit_mb):
+    """Number of rows per batch that keeps a parsed batch under the memory ceiling"""
+    # Half of the budget goes to the batch being parsed, the rest to grouping and accumulators
+    return max(1000, int(memory_limit_mb * 1024 * 1024 / 2 / BYTES_PER_ROW))
+
+def iter_batches(paths, chunk_rows):
+    """Yield DataFrames of at most chunk_rows rows from CSV, Parquet or archive files
+
+    A session found both in an archive and as a CSV file is read once.
+    """
+    loaded = set()
+
+    for path in paths:
+        if path.endswith(ARCHIVE_EXTENSION):
+            reader = ArchiveReader(path)
+            names = [name for name in reader.sessions() if name not in loaded]
+            loaded.update(names)
+            # Archive chunks are whole sessions; split them to respect the batch size
+            for session in reader.iter_sessions(names):
+                for start in range(0, len(session), chunk_rows):
+                    yield session.iloc[start:start + chunk_rows]
+            continue
+
+        if session_name(path) in loaded:
+            continue
+        loaded.add(session_name(path))
+
+        if path.endswith('.parquet'):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Reading Parquet files requires pyarrow (pip install pyarrow)")
+
+            parquet_file = pq.ParquetFile(path)
+            columns = [column for column in READ_COLUMNS if column in parquet_file.schema_arrow.names]
+            for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+                yield batch.to_pandas()
+        else:
+            reader = pd.read_csv(path, chunksize=chunk_rows,
+                                 usecols=lambda column: column in READ_COLUMNS,
+                                 dtype={'participant_id': str, 'block_type': 'category', 'correct': str})
+            for chunk in reader:
+                yield chunk
+
+class CellAccumulator:
+    """Mergeable per-(participant, block, block_type) counts and sums"""
+
+    def __init__(self):
+        self.cells = pd.DataFrame(columns=SUM_COLUMNS,
+                                  index=pd.MultiIndex.from_arrays([[], [], []], names=CELL_KEYS),
+                                  dtype=np.float64)
+
+    def update(self, chunk, raw=None):
+        """Fold a batch of trial rows into the accumulators
+
+        raw holds the same batch before cleaning; rows and first attempts
+        (attempts per trial) are counted on it, since cleaning keeps only first
+        attempts. Without it they are counted on chunk.
+        """
+        raw = chunk if raw is None else raw
+        if len(raw) == 0:
+            return
+
+        correct = chunk['correct']
+        if correct.dtype != bool:
+            correct = correct.astype(str).str.lower() == 'true'
+
+        rt = chunk['reaction_time'].astype(np.float64)
+        correct_rt = rt.where(correct, 0.0)
+        sums = pd.DataFrame({
+            'participant_id': chunk['participant_id'].astype(str),
+            'block': chunk['block'].astype(np.int64),
+            'block_type': chunk['block_type'].astype(str),
+            'n': 1.0,
+            'n_correct': correct.astype(np.float64),
+            'rt_sum': correct_rt,
+            'rt_sumsq': correct_rt * correct_rt  # Pooled RT variance (srtt_query_service)
+        }).groupby(CELL_KEYS, sort=False).sum()
+
+        # First attempts count trials; rows per trial is the mean number of attempts (attempt_statistics)
+        if 'attempt' in raw.columns:
+            first_attempt = pd.to_numeric(raw['attempt']) == 1
+        else:
+            first_attempt = pd.Series(True, index=raw.index)
+        counts = pd.DataFrame({
+            'participant_id': raw['participant_id'].astype(str),
+            'block': raw['block'].astype(np.int64),
+            'block_type': raw['block_type'].astype(str),
+            'n_rows': 1.0,
+            'n_trials': first_attempt.astype(np.float64)
+        }).groupby(CELL_KEYS, sort=False).sum()
+
+        self.merge_cells(sums.join(counts, how='outer').fillna(0.0)[SUM_COLUMNS])
+
+    def merge_cells(self, cells):
+        """Add another table of cell sums into this one"""
+        if self.cells.empty:
+            self.cells = cells.astype(np.float64)
+        else:
+            self.cells = self.cells.add(cells, fill_value=0)
+
+    def merge(self, other):
+        """Merge the accumulators of another CellAccumulator"""
+        self.merge_cells(other.cells)
+        return self
+
+    def participants(self):
+        """Participants present in the accumulators"""
+        return sorted(self.cells.index.get_level_values('participant_id').unique())
+
+    def results(self, participant_id):
+        """Results for one participant, in the same form as analyze_data"""
+        cells = self.cells.xs(participant_id, level='participant_id').sort_index().reset_index()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cells['reaction_time'] = cells['rt_sum'] / cells['n_correct']
+            cells['correct'] = cells['n_correct'] / cells['n']
+            cells['attempts'] = cells['n_rows'] / cells['n_trials']
+        cells['accuracy'] = cells['correct'] * 100
+
+        rt_by_block = cells[cells['n_correct'] > 0][['block', 'block_type', 'reaction_time']].reset_index(drop=True)
+        accuracy_by_block = cells[['block', 'block_type', 'correct', 'accuracy']]
+        attempts_by_block = cells[['block', 'block_type', 'attempts']]
+
+        by_type = cells.groupby('block_type')[SUM_COLUMNS].sum()
+
+        def type_mean(block_type, numerator, denominator):
+            if block_type not in by_type.index or by_type.loc[block_type, denominator] == 0:
+                return np.nan
+            return by_type.loc[block_type, numerator] / by_type.loc[block_type, denominator]
+
+        structured_rt = type_mean('structured', 'rt_sum', 'n_correct')
+        random_rt = type_mean('random', 'rt_sum', 'n_correct')
+
+        return {
+            'rt_by_block': rt_by_block,
+            'accuracy_by_block': accuracy_by_block,
+            'attempts_by_block': attempts_by_block,
+            'structured_rt': structured_rt,
+            'random_rt': random_rt,
+            'structured_attempts': type_mean('structured', 'n_rows', 'n_trials'),
+            'random_attempts': type_mean('random', 'n_rows', 'n_trials'),
+            'learning_effect': random_rt - structured_rt,
+            'participant_id': participant_id
+        }
+
+def stream_accumulate(paths, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, clean=False):
+    """Read result files in bounded batches and fold them into a CellAccumulator
+
+    With clean=True the row-level cleaning rules (timeouts, retries, absolute
+    cutoffs) are applied to each batch; group trimming needs whole-group
+    statistics and is not available in streaming mode. Attempts are counted
+    on the raw rows, as in srtt_analysis.
+    """
+    accumulator = CellAccumulator()
+
+    for raw in iter_batches(paths, chunk_rows_for(memory_limit_mb)):
+        chunk = raw
+        if clean:
+            chunk = raw.assign(correct=raw['correct'].astype(str).str.lower() == 'true')
+            chunk, _ = clean_trials(chunk, {'trim_method': None})
+        accumulator.update(chunk, raw)
+
+    return accumulator
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files, summary_row
+
+    parser = argparse.ArgumentParser(description="Streaming SRTT analysis over large result archives")
+    parser.add_argument('paths', nargs='*', default=['results'],
+                        help="Result files (CSV, Parquet or archives) or directories containing them")
+    parser.add_argument('--memory-limit-mb', type=float, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help="Approximate memory ceiling for each batch")
+    parser.add_argument('--clean', action='store_true', help="Apply the row-level cleaning rules")
+    parser.add_argument('--output', default='analysis/srtt_streaming_summary.csv')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths += find_result_files(path)
+            paths += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.parquet'))
+        else:
+            paths.append(path)
+
+    if not paths:
+        print("No result files found.")
+        return
+
+    print(f"Streaming {len(paths)} files in batches of {chunk_rows_for(args.memory_limit_mb)} rows...")
+    accumulator = stream_accumulate(paths, args.memory_limit_mb, args.clean)
+
+    rows = [pd.DataFrame(summary_row(accumulator.results(participant_id)))
+            for participant_id in accumulator.participants()]
+    summary = pd.concat(rows, ignore_index=True)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    summary.to_csv(args.output, index=False)
+
+    print(f"{len(rows)} participants summarized to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import os
+import gc
+import sys
+import time
+import argparse
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; context switches are then not reported
+    resource = None
+
+TIMING_PRIORITY = -10  # Nice value requested in timing mode (lower is higher priority)
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+BENCHMARK_FRAMES = 2000
+BENCHMARK_REPEATS = 4  # Timed passes per mode; the order of the modes alternates between repeats
+
+class TimingMode:
+    """Opt-in process tuning for the trial loop
+
+    During blocks the cyclic garbage collector is frozen and disabled, and is
+    run explicitly between blocks. At setup the process priority is raised,
+    the process is pinned to one CPU and its memory is locked, each only
+    where the platform and permissions allow. GC pauses and context switches
+    are measured per block either way, so the same object (with tuning=False)
+    gives the baseline for comparison.
+    """
+
+    def __init__(self, tuning=True, priority=TIMING_PRIORITY, cpu=None, lock_memory=True):
+        self.tuning = tuning
+        self.priority = priority
+        self.cpu = cpu
+        self.lock_memory = lock_memory
+        self.status = {}
+        self.block_reports = []
+        self.gc_pauses = []
+        self._gc_start = None
+        self._block_start = None
+        self._block_switches = None
+
+    def _gc_callback(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            self.gc_pauses.append((time.perf_counter() - self._gc_start) * 1000)
+            self._gc_start = None
+
+    def _context_switches(self):
+        if resource is None:
+            return None
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_nvcsw, usage.ru_nivcsw
+
+    def setup(self):
+        """Install the GC timer and apply the process-level tuning"""
+        gc.callbacks.append(self._gc_callback)
+
+        if not self.tuning:
+            return self.status
+
+        # Raise the scheduling priority
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, self.priority)
+            self.status['priority'] = self.priority
+        except (AttributeError, OSError) as e:
+            self.status['priority'] = f"unchanged ({e.__class__.__name__})"
+
+        # Pin the process to a single core (the last one, away from interrupt-heavy CPU 0)
+        try:
+            cpus = sorted(os.sched_getaffinity(0))
+            cpu = self.cpu if self.cpu is not None else cpus[-1]
+            os.sched_setaffinity(0, {cpu})
+            self.status['cpu'] = cpu
+        except (AttributeError, OSError) as e:
+            self.status['cpu'] = f"unpinned ({e.__class__.__name__})"
+
+        # Lock current and future pages in memory
+        if self.lock_memory and sys.platform.startswith('linux'):
+            try:
+                import ctypes
+                libc = ctypes.CDLL(None, use_errno=True)
+                if libc.mlockall(MCL_CURRENT | MCL_FUTURE) == 0:
+                    self.status['mlock'] = True
+                else:
+                    self.status['mlock'] = f"failed (errno {ctypes.get_errno()})"
+            except OSError as e:
+                self.status['mlock'] = f"failed ({e})"
+        else:
+            self.status['mlock'] = False
+
+        print(f"Timing mode: {self.status}")
+        return self.status
+
+    def start_block(self):
+        """Freeze and disable the garbage collector for the coming block"""
+        if self.tuning:
+            gc.collect()
+            gc.freeze()
+            gc.disable()
+
+        self.gc_pauses = []
+        self._block_switches = self._context_switches()
+        self._block_start = time.perf_counter()
+
+    def end_block(self, block):
+        """Record GC pauses and context switches for the block that just ended"""
+        duration = (time.perf_counter() - self._block_start) * 1000
+        switches = self._context_switches()
+
+        report = {
+            "block": block,
+            "duration_ms": round(duration, 1),
+            "gc_pauses": len(self.gc_pauses),
+            "gc_pause_total_ms": round(sum(self.gc_pauses), 3),
+            "gc_pause_max_ms": round(max(self.gc_pauses), 3) if self.gc_pauses else 0,
+            "voluntary_switches": None,
+            "involuntary_switches": None
+        }
+        if switches is not None and self._block_switches is not None:
+            report["voluntary_switches"] = switches[0] - self._block_switches[0]
+            report["involuntary_switches"] = switches[1] - self._block_switches[1]
+
+        self.block_reports.append(report)
+        return report
+
+    def collect(self):
+        """Run the deferred garbage collection (called during the break screen)"""
+        if not self.tuning:
+            return 0
+
+        start = time.perf_counter()
+        gc.unfreeze()
+        gc.enable()
+        gc.collect()
+        return (time.perf_counter() - start) * 1000
+
+    def restore(self):
+        """Re-enable the garbage collector and remove the GC timer"""
+        gc.unfreeze()
+        gc.enable()
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def _benchmark_pass(experiment, frames, tuning=None):
+    """Run frames of the trial loop's per-frame work; returns the timing report and frame times
+
+    With tuning=None the pass is an untimed warm-up and no timing mode is set up.
+    """
+    # Imported here so the SDL driver can be chosen before pygame opens the display
+    import pygame
+
+    timing = None
+    if tuning is not None:
+        timing = TimingMode(tuning=tuning)
+        timing.setup()
+        timing.start_block()
+    frame_times = []
+
+    for frame in range(frames):
+        start = time.perf_counter()
+        experiment.current_position = frame % experiment.positions
+        experiment.draw_trial_screen()
+        pygame.display.flip()
+        pygame.event.pump()
+        experiment.results.append(experiment.make_result(400.0, True, 1))
+        frame_times.append((time.perf_counter() - start) * 1000)
+
+    report = None
+    if timing is not None:
+        report = timing.end_block(1)
+        timing.collect()
+        timing.restore()
+    experiment.results = []
+    return report, frame_times
+
+def benchmark(frames=BENCHMARK_FRAMES, repeats=BENCHMARK_REPEATS):
+    """Time the trial loop's per-frame work with and without timing mode
+
+    Each frame draws the trial screen, flips it and builds a response record,
+    which is the allocation pattern of present_trial. An untimed warm-up pass
+    runs first, and the two modes swap order on every repeat, so neither one
+    consistently gets the warmer caches and allocator.
+    """
+    from srtt_experiment import SRTTExperiment
+
+    experiment = SRTTExperiment()
+    experiment.participant_id = 'benchmark'
+    _benchmark_pass(experiment, frames)
+
+    rows = []
+    modes = [("before", False), ("after", True)]
+    for repeat in range(repeats):
+        for label, tuning in (modes if repeat % 2 == 0 else modes[::-1]):
+            report, frame_times = _benchmark_pass(experiment, frames, tuning)
+            report.update({
+                "mode": label,
+                "repeat": repeat + 1,
+                "frame_p50_ms": round(_percentile(frame_times, 0.5), 4),
+                "frame_p99_ms": round(_percentile(frame_times, 0.99), 4),
+                "frame_max_ms": round(max(frame_times), 4)
+            })
+            rows.append(report)
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Before/after benchmark of the SRTT timing mode")
+    parser.add_argument('--frames', type=int, default=BENCHMARK_FRAMES)
+    parser.add_argument('--repeats', type=int, default=BENCHMARK_REPEATS,
+                        help="Timed passes per mode, alternating which mode runs first")
+    parser.add_argument('--display', action='store_true',
+                        help="Use the real display instead of the SDL dummy driver")
+    args = parser.parse_args()
+
+    if not args.display:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    for row in benchmark(args.frames, args.repeats):
+        print(row)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from srtt_cleaning import TIMEOUT_RT, timeout_rows
+
+TRIAL_KEYS = ['block', 'trial']  # Rows of one trial share these (within a session)
+CARRIED_COLUMNS = ['participant_id', 'session', 'block_type', 'position', 'onset_time', 'frame_dropped']
+
+def _bool_column(values):
+    if values.dtype == bool:
+        return values.to_numpy()
+    return (values.astype(str).str.lower() == 'true').to_numpy()
+
+def reconstruct_trials(data, timeout_rt=TIMEOUT_RT):
+    """Collapse the attempt rows written by present_trial into one record per trial
+
+    present_trial writes a row for every key press and a synthetic row
+    (timed_out, with the timeout as RT) when the first attempt times out;
+    timeout_rt only identifies timeouts in files saved without that column. After an error the RT
+    clock keeps running from stimulus onset; after a timeout it restarts at
+    the timeout, so the timeout is added back to get times from onset.
+    Rows are sorted once and every trial is a contiguous segment, reduced
+    with numpy segment operations (no per-trial Python loop).
+
+    Each record holds:
+      n_attempts      rows recorded for the trial (timeout row included)
+      timed_out       the first attempt was a timeout
+      n_errors        wrong key presses (the timeout row is not counted)
+      first_rt        RT of the first key press from stimulus onset (NaN if none)
+      first_correct   the first key press was the correct key
+      time_to_correct time from stimulus onset to the correct response (NaN if never given)
+      completed       the trial ended with a correct response
+    """
+    df = pd.DataFrame(data)
+    if len(df) == 0:
+        return pd.DataFrame(columns=[column for column in CARRIED_COLUMNS if column in df.columns] + TRIAL_KEYS + [
+            'n_attempts', 'timed_out', 'n_errors', 'first_rt', 'first_correct', 'time_to_correct', 'completed'])
+
+    session_column = 'session' if 'session' in df.columns else 'participant_id'
+    session = pd.factorize(df[session_column].astype(str))[0]
+    block = pd.to_numeric(df['block']).to_numpy(np.int64)
+    trial = pd.to_numeric(df['trial']).to_numpy(np.int64)
+    if 'attempt' in df.columns:
+        attempt = pd.to_numeric(df['attempt']).to_numpy(np.int64)
+    else:
+        attempt = np.arange(len(df))  # Without attempt numbers the file order is the attempt order
+
+    order = np.lexsort((attempt, trial, block, session))
+    session, block, trial = session[order], block[order], trial[order]
+    rt = pd.to_numeric(df['reaction_time']).to_numpy(np.float64)[order]
+    correct = _bool_column(df['correct'])[order]
+    timeout = timeout_rows(df.assign(correct=_bool_column(df['correct'])), timeout_rt)[order]
+
+    # Segment boundaries: a new trial starts wherever the key changes
+    new_trial = np.r_[True, (session[1:] != session[:-1]) | (block[1:] != block[:-1]) | (trial[1:] != trial[:-1])]
+    starts = np.flatnonzero(new_trial)
+    ends = np.r_[starts[1:], len(rt)] - 1
+    n_attempts = ends - starts + 1
+
+    # Timeouts are only recorded on the first attempt
+    timeout_row = new_trial & timeout
+    timed_out = timeout_row[starts]
+    errors = np.add.reduceat((~correct & ~timeout_row).astype(np.int64), starts)
+
+    # First key press: the row after the timeout row when the trial timed out
+    offset = np.where(timed_out, rt[starts], 0.0)
+    has_response = ~timed_out | (n_attempts > 1)
+    first_index = np.minimum(starts + timed_out, ends)
+    first_rt = np.where(has_response, rt[first_index] + offset, np.nan)
+    first_correct = has_response & correct[first_index]
+
+    completed = correct[ends]
+    time_to_correct = np.where(completed, rt[ends] + offset, np.nan)
+
+    source_rows = order[starts]
+    records = {column: df[column].to_numpy()[source_rows]
+               for column in CARRIED_COLUMNS if column in df.columns}
+    records.update({
+        'block': block[starts],
+        'trial': trial[starts],
+        'n_attempts': n_attempts,
+        'timed_out': timed_out,
+        'n_errors': errors,
+        'first_rt': first_rt,
+        'first_correct': first_correct,
+        'time_to_correct': time_to_correct,
+        'completed': completed
+    })
+    return pd.DataFrame(records)
+
+def trial_statistics(trials):
+    """Per block type summary of the reconstructed trials, as used by the analysis summary"""
+    summary = {}
+    for block_type in ['structured', 'random']:
+        selected = trials[trials['block_type'] == block_type]
+        summary[f'{block_type}_errors_per_trial'] = selected['n_errors'].mean()
+        summary[f'{block_type}_timeout_rate'] = selected['timed_out'].mean()
+        summary[f'{block_type}_time_to_correct'] = selected['time_to_correct'].mean()
+    summary['trials_by_block'] = trials.groupby(['block', 'block_type']).agg(
+        errors_per_trial=('n_errors', 'mean'),
+        timeout_rate=('timed_out', 'mean'),
+        time_to_correct=('time_to_correct', 'mean')
+    ).reset_index()
+    return summary
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files, load_sessions
+
+    parser = argparse.ArgumentParser(description="Rebuild one record per trial from the attempt rows")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--timeout-ms', type=float, default=TIMEOUT_RT,
+                        help="Timeout RT of files saved without a timed_out column (the experiment's --timeout-ms)")
+    parser.add_argument('--output', default='analysis/srtt_trials.csv')
+    args = parser.parse_args()
+
+    file_paths = find_result_files(args.results_dir)
+    if not file_paths:
+        print(f"No result files found in: {args.results_dir}")
+        return
+
+    # The whole archive is reconstructed in one pass; sessions are told apart by the 'session' column
+    trials = reconstruct_trials(load_sessions(file_paths), args.timeout_ms)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    trials.to_csv(args.output, index=False)
+
+    print(trials.groupby('block_type')[['n_errors', 'timed_out', 'first_rt', 'time_to_correct']].mean().to_string())
+    print(f"\n{len(trials)} trials exported to: {args.output}")
+
+if __name__ == "__main__":
+    main()
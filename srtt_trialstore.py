@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+STORE_EXTENSION = '.srttm'
+MAGIC = b'SRTTMAP1'
+HEADER_LENGTH = struct.Struct('<Q')
+ALIGNMENT = 64  # Column start offsets are aligned to cache lines
+BLOCK_TYPES = ['structured', 'random']
+
+# Fixed-width columns of the consolidated trial file
+COLUMN_DTYPES = {
+    'participant': '<u4',  # index into the header's participant list
+    'session': '<u4',  # index into the header's session list
+    'block': '<u2',
+    'block_type': 'u1',  # index into BLOCK_TYPES
+    'trial': '<u4',
+    'position': 'u1',
+    'attempt': '<u2',
+    'correct': '?',
+    'reaction_time': '<f8'
+}
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def build_store(df, store_path):
+    """Write pooled trials (e.g. from load_sessions) as one fixed-width columnar file"""
+    df = pd.DataFrame(df)
+    if 'session' not in df.columns:
+        df['session'] = df['participant_id']
+
+    participant_codes, participants = pd.factorize(df['participant_id'].astype(str), sort=True)
+    session_codes, sessions = pd.factorize(df['session'].astype(str), sort=True)
+    block_type_codes = df['block_type'].map({name: code for code, name in enumerate(BLOCK_TYPES)})
+    if block_type_codes.isna().any():
+        raise ValueError("Unknown block_type values")
+
+    correct = df['correct']
+    if correct.dtype != bool:
+        correct = correct.astype(str).str.lower() == 'true'
+
+    columns = {
+        'participant': participant_codes,
+        'session': session_codes,
+        'block': df['block'].to_numpy(),
+        'block_type': block_type_codes.to_numpy(),
+        'trial': df['trial'].to_numpy(),
+        'position': df['position'].to_numpy(),
+        'attempt': df['attempt'].to_numpy() if 'attempt' in df.columns else np.ones(len(df)),
+        'correct': correct.to_numpy(),
+        'reaction_time': df['reaction_time'].to_numpy()
+    }
+
+    header = {
+        'n_rows': len(df),
+        'participants': list(participants),
+        'sessions': list(sessions),
+        'block_types': BLOCK_TYPES,
+        'columns': {}
+    }
+    header_size = 0
+    header_bytes = b''
+    # Column offsets depend on the header size and vice versa; grow until the header fits
+    while len(MAGIC) + HEADER_LENGTH.size + len(header_bytes) > header_size:
+        header_size = _aligned(len(MAGIC) + HEADER_LENGTH.size + len(header_bytes) + ALIGNMENT)
+        offset = header_size
+        for name, dtype in COLUMN_DTYPES.items():
+            header['columns'][name] = {'dtype': dtype, 'offset': offset}
+            offset = _aligned(offset + np.dtype(dtype).itemsize * len(df))
+        header_bytes = json.dumps(header).encode('utf-8')
+
+    _write(store_path, header_bytes, columns, header)
+    return store_path
+
+def _write(store_path, header_bytes, columns, header):
+    directory = os.path.dirname(store_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(store_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for name, dtype in COLUMN_DTYPES.items():
+            f.seek(header['columns'][name]['offset'])
+            f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        f.truncate(_aligned(f.tell()))
+
+class TrialStore:
+    """Read-only memory-mapped view of a consolidated trial file
+
+    Each column is a NumPy view onto the file's pages, so nothing is copied
+    on open and several analysis processes share the same page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not an SRTT trial store: {path}")
+            (length,) = HEADER_LENGTH.unpack(f.read(HEADER_LENGTH.size))
+            self.header = json.loads(f.read(length).decode('utf-8'))
+
+        self.n_rows = self.header['n_rows']
+        self.participants = self.header['participants']
+        self.sessions = self.header['sessions']
+        self._buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        self.columns = {}
+        for name, spec in self.header['columns'].items():
+            dtype = np.dtype(spec['dtype'])
+            self.columns[name] = np.frombuffer(self._buffer, dtype=dtype, count=self.n_rows, offset=spec['offset'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.n_rows
+
+    def participant_code(self, participant_id):
+        try:
+            return self.participants.index(str(participant_id))
+        except ValueError:
+            raise KeyError(f"Unknown participant: {participant_id}")
+
+    def mask(self, participant_id=None, block_type=None, block=None, correct=None):
+        """Boolean row filter built directly on the column views"""
+        keep = np.ones(self.n_rows, dtype=bool)
+        if participant_id is not None:
+            keep &= self['participant'] == self.participant_code(participant_id)
+        if block_type is not None:
+            keep &= self['block_type'] == BLOCK_TYPES.index(block_type)
+        if block is not None:
+            keep &= self['block'] == block
+        if correct is not None:
+            keep &= self['correct'] == correct
+        return keep
+
+def cell_aggregates(store, mask=None):
+    """Per-(participant, block, block_type) counts and sums for the whole store
+
+    Cells are combined into one integer key and reduced with np.bincount.
+    """
+    participant = store['participant'].astype(np.int64)
+    block = store['block'].astype(np.int64)
+    block_type = store['block_type'].astype(np.int64)
+    correct = store['correct']
+    rt = store['reaction_time']
+    first_attempt = store['attempt'] == 1
+
+    if mask is not None:
+        participant, block, block_type = participant[mask], block[mask], block_type[mask]
+        correct, rt, first_attempt = correct[mask], rt[mask], first_attempt[mask]
+
+    if len(participant) == 0:
+        return pd.DataFrame(columns=['participant_id', 'block', 'block_type', 'n', 'n_correct', 'rt_sum', 'n_trials'])
+
+    n_blocks = int(block.max()) + 1
+    key = (participant * n_blocks + block) * len(BLOCK_TYPES) + block_type
+    size = int(key.max()) + 1
+
+    n = np.bincount(key, minlength=size)
+    n_correct = np.bincount(key, weights=correct, minlength=size)
+    rt_sum = np.bincount(key, weights=np.where(correct, rt, 0.0), minlength=size)
+    n_trials = np.bincount(key, weights=first_attempt, minlength=size)
+
+    cells = np.flatnonzero(n)
+    return pd.DataFrame({
+        'participant_id': np.asarray(store.participants, dtype=object)[cells // (n_blocks * len(BLOCK_TYPES))],
+        'block': (cells // len(BLOCK_TYPES)) % n_blocks,
+        'block_type': np.asarray(BLOCK_TYPES, dtype=object)[cells % len(BLOCK_TYPES)],
+        'n': n[cells],
+        'n_correct': n_correct[cells],
+        'rt_sum': rt_sum[cells],
+        'n_trials': n_trials[cells]
+    })
+
+def analyze_store(store, participant_id, mask=None):
+    """Results for one participant, in the same form as analyze_data"""
+    keep = store.mask(participant_id=participant_id)
+    if mask is not None:
+        keep &= mask
+    cells = cell_aggregates(store, keep)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cells['reaction_time'] = cells['rt_sum'] / cells['n_correct']
+        cells['correct'] = cells['n_correct'] / cells['n']
+        # Rows per trial is the mean number of attempts (see attempt_statistics)
+        cells['attempts'] = cells['n'] / cells['n_trials']
+    cells['accuracy'] = cells['correct'] * 100
+
+    by_type = cells.groupby('block_type')[['n', 'n_correct', 'rt_sum', 'n_trials']].sum()
+
+    def type_rt(block_type):
+        if block_type not in by_type.index or by_type.loc[block_type, 'n_correct'] == 0:
+            return np.nan
+        return by_type.loc[block_type, 'rt_sum'] / by_type.loc[block_type, 'n_correct']
+
+    def type_attempts(block_type):
+        if block_type not in by_type.index or by_type.loc[block_type, 'n_trials'] == 0:
+            return np.nan
+        return by_type.loc[block_type, 'n'] / by_type.loc[block_type, 'n_trials']
+
+    structured_rt = type_rt('structured')
+    random_rt = type_rt('random')
+
+    return {
+        'rt_by_block': cells[cells['n_correct'] > 0][['block', 'block_type', 'reaction_time']].reset_index(drop=True),
+        'accuracy_by_block': cells[['block', 'block_type', 'correct', 'accuracy']].reset_index(drop=True),
+        'attempts_by_block': cells[['block', 'block_type', 'attempts']].reset_index(drop=True),
+        'structured_rt': structured_rt,
+        'random_rt': random_rt,
+        'structured_attempts': type_attempts('structured'),
+        'random_attempts': type_attempts('random'),
+        'learning_effect': random_rt - structured_rt,
+        'participant_id': str(participant_id)
+    }
+
+def main():
+    # Imported here because srtt_analysis pulls in the plotting stack
+    from srtt_analysis import find_result_files, load_sessions
+
+    results_dir = sys.argv[1] if len(sys.argv) > 1 else 'results'
+    store_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join('analysis', 'srtt_trials' + STORE_EXTENSION)
+
+    file_paths = find_result_files(results_dir)
+    if not file_paths:
+        print(f"No result files found in: {results_dir}")
+        return
+
+    build_store(load_sessions(file_paths), store_path)
+    store = TrialStore(store_path)
+    print(f"{len(store)} trials from {len(store.sessions)} sessions written to {store_path}")
+
+if __name__ == "__main__":
+    main()
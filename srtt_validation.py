@@ -0,0 +1,223 @@
+import os
+import re
+import csv
+import shutil
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from srtt_manifest import FILE_NAME_PATTERN, append_entries, manifest_path, read_validation
+
+REQUIRED_COLUMNS = ['participant_id', 'block', 'block_type', 'trial', 'position',
+                    'reaction_time', 'correct', 'attempt', 'timestamp']
+OPTIONAL_COLUMNS = ['onset_time', 'onset_interval', 'frame_dropped', 'timed_out']
+INTEGER_COLUMNS = ['block', 'trial', 'position', 'attempt']
+BLOCK_TYPES = ['structured', 'random']
+BOOLEAN_VALUES = ['True', 'False']
+MAX_POSITIONS = 10  # One key per position (1-9, 0)
+MAX_RT = 600000  # Anything above 10 minutes is not a real response (ms)
+PARTICIPANT_ID_PATTERN = re.compile(r'^[\w-]+$')
+QUARANTINE_DIR = 'quarantine'  # Inside the results directory, so result scans no longer see these files
+
+def valid_participant_id(text):
+    """True for IDs that are safe to use in file names (letters, digits, '-' and '_')"""
+    return bool(text) and PARTICIPANT_ID_PATTERN.match(text) is not None
+
+def validate_frame(df):
+    """Vectorized schema, range and ordering checks; returns a list of problems"""
+    errors = []
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        return [f"missing columns: {', '.join(missing)}"]
+    if len(df) == 0:
+        return ["no trials"]
+
+    numbers = {}
+    for column in INTEGER_COLUMNS:
+        values = pd.to_numeric(df[column], errors='coerce')
+        bad = values.isna() | (values != values.round())
+        if bad.any():
+            errors.append(f"{column}: {int(bad.sum())} non-integer values (first at row {int(np.argmax(bad)) + 2})")
+        numbers[column] = values
+
+    rt = pd.to_numeric(df['reaction_time'], errors='coerce')
+    if rt.isna().any():
+        errors.append(f"reaction_time: {int(rt.isna().sum())} non-numeric values")
+    elif ((rt < 0) | (rt > MAX_RT)).any():
+        errors.append(f"reaction_time: {int(((rt < 0) | (rt > MAX_RT)).sum())} values outside 0-{MAX_RT} ms")
+
+    for column in ['correct'] + [column for column in ['frame_dropped', 'timed_out'] if column in df.columns]:
+        bad = ~df[column].isin(BOOLEAN_VALUES)
+        if bad.any():
+            errors.append(f"{column}: {int(bad.sum())} values other than True/False")
+
+    bad = ~df['block_type'].isin(BLOCK_TYPES)
+    if bad.any():
+        errors.append(f"block_type: {int(bad.sum())} unknown values")
+
+    if pd.to_datetime(df['timestamp'], format="%Y-%m-%d %H:%M:%S", errors='coerce').isna().any():
+        errors.append("timestamp: unparseable values")
+
+    participants = df['participant_id'].unique()
+    if len(participants) != 1:
+        errors.append(f"participant_id: {len(participants)} different values")
+    elif not valid_participant_id(participants[0]):
+        errors.append(f"participant_id: unsafe value {participants[0]!r}")
+
+    if errors:
+        return errors
+
+    block, trial, attempt = (numbers[column].to_numpy(np.int64) for column in ['block', 'trial', 'attempt'])
+    position = numbers['position'].to_numpy(np.int64)
+
+    if (block < 1).any() or (trial < 1).any() or (attempt < 1).any():
+        errors.append("block, trial and attempt must start at 1")
+    if ((position < 1) | (position > MAX_POSITIONS)).any():
+        errors.append(f"position: values outside 1-{MAX_POSITIONS}")
+
+    # Rows must follow (block, trial) order, and attempts count up from 1 within a trial
+    same_trial = (block[1:] == block[:-1]) & (trial[1:] == trial[:-1])
+    forward = (block[1:] > block[:-1]) | ((block[1:] == block[:-1]) & (trial[1:] > trial[:-1]))
+    if (~same_trial & ~forward).any():
+        errors.append(f"trial order: goes backwards at row {int(np.argmax(~same_trial & ~forward)) + 3}")
+    expected_attempt = np.where(np.r_[False, same_trial], np.r_[0, attempt[:-1]] + 1, 1)
+    if (attempt != expected_attempt).any():
+        errors.append(f"attempt: out of sequence at row {int(np.argmax(attempt != expected_attempt)) + 2}")
+    if (np.r_[False, same_trial] & (np.r_[0, position[:-1]] != position)).any():
+        errors.append("position: changes between attempts of the same trial")
+    if 'timed_out' in df.columns:
+        timed_out = (df['timed_out'] == 'True').to_numpy()
+        if (timed_out & ((attempt != 1) | (df['correct'] == 'True').to_numpy())).any():
+            errors.append("timed_out: timeouts must be the incorrect first attempt of a trial")
+
+    types_per_block = df.groupby(block)['block_type'].nunique()
+    if (types_per_block > 1).any():
+        errors.append(f"block_type: mixed within block {int(types_per_block[types_per_block > 1].index[0])}")
+
+    return errors
+
+def validate_file(path):
+    """Validate one result file; returns a dict with its status and problems"""
+    name = os.path.basename(path)
+    report = {'file': path, 'errors': [], 'participant_id': None, 'rows': 0, 'blocks': 0}
+
+    match = FILE_NAME_PATTERN.match(name)
+    if match is None:
+        report['errors'].append("file name does not follow srtt_participant_<id>_<YYYYmmdd_HHMMSS>.csv")
+    elif not valid_participant_id(match.group('participant_id')):
+        report['errors'].append(f"file name: unsafe participant id {match.group('participant_id')!r}")
+
+    try:
+        # Everything is read as text so the checks see exactly what was written
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        report['errors'].append(f"unreadable: {e}")
+        return report
+
+    report['errors'] += validate_frame(df)
+    report['rows'] = len(df)
+    if 'participant_id' in df.columns and len(df):
+        report['participant_id'] = df['participant_id'].iloc[0]
+    if 'block' in df.columns:
+        report['blocks'] = int(df['block'].nunique())
+    if match is not None and report['participant_id'] is not None \
+            and match.group('participant_id') != report['participant_id']:
+        report['errors'].append("participant_id does not match the file name")
+    return report
+
+def validate_results(results_dir='results', workers=None, quarantine=True):
+    """Validate every result CSV in parallel, quarantine bad files and record the outcome in the manifest
+
+    Each checked file gets a 'validated' or 'quarantined' line in the session
+    manifest (results/manifest.jsonl). Files whose last 'validated' line
+    matches their size and modification time are not read again.
+    Returns (clean reports, bad reports).
+    """
+    validation = read_validation(results_dir)
+
+    paths = sorted(os.path.join(results_dir, name) for name in os.listdir(results_dir)
+                   if name.startswith('srtt_participant_') and name.endswith('.csv'))
+
+    pending = []
+    for path in paths:
+        stat = os.stat(path)
+        entry = validation.get(os.path.basename(path))
+        if entry is None or entry['validation'] != 'validated' \
+                or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            pending.append(path)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reports = list(executor.map(validate_file, pending, chunksize=max(1, len(pending) // 64)))
+
+    clean = [report for report in reports if not report['errors']]
+    bad = [report for report in reports if report['errors']]
+    now = datetime.now().isoformat(timespec='seconds')
+
+    lines = []
+    for report in clean:
+        stat = os.stat(report['file'])
+        lines.append({
+            'file': os.path.basename(report['file']),
+            'validation': 'validated',
+            'participant_id': report['participant_id'],
+            'rows': report['rows'],
+            'blocks': report['blocks'],
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'validated_at': now
+        })
+
+    if quarantine and bad:
+        quarantine_files(bad, results_dir)
+        lines += [{'file': os.path.basename(report['file']), 'validation': 'quarantined',
+                   'errors': report['errors'], 'validated_at': now} for report in bad]
+
+    append_entries(results_dir, lines)
+    return clean, bad
+
+def quarantine_files(bad, results_dir='results'):
+    """Move bad files out of the results directory and log why"""
+    quarantine_dir = os.path.join(results_dir, QUARANTINE_DIR)
+    if not os.path.exists(quarantine_dir):
+        os.makedirs(quarantine_dir)
+
+    log_path = os.path.join(quarantine_dir, 'quarantine_log.csv')
+    new_log = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new_log:
+            writer.writerow(['file', 'quarantined_at', 'errors'])
+        for report in bad:
+            shutil.move(report['file'], os.path.join(quarantine_dir, os.path.basename(report['file'])))
+            writer.writerow([os.path.basename(report['file']), datetime.now().isoformat(timespec='seconds'),
+                             '; '.join(report['errors'])])
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate SRTT result files and quarantine bad ones")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', help="Report problems without moving any file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.results_dir):
+        print(f"Results directory not found: {args.results_dir}")
+        return
+
+    clean, bad = validate_results(args.results_dir, args.workers, quarantine=not args.dry_run)
+
+    for report in bad:
+        print(f"{os.path.basename(report['file'])!r}:")
+        for error in report['errors']:
+            print(f"  - {error}")
+
+    action = "reported" if args.dry_run else f"moved to {os.path.join(args.results_dir, QUARANTINE_DIR)}"
+    validated = [name for name, entry in read_validation(args.results_dir).items()
+                 if entry['validation'] == 'validated' and os.path.exists(os.path.join(args.results_dir, name))]
+    print(f"\n{len(clean) + len(bad)} new or changed files checked: {len(clean)} clean, {len(bad)} bad files {action}")
+    print(f"Validated files ({len(validated)}): {manifest_path(args.results_dir)}")
+
+if __name__ == "__main__":
+    main()